@@ -0,0 +1,157 @@
+"""
+Parsing angka dan satuan dari kolom teks bebas (format Indonesia).
+
+rencana_investasi, luas_lahan_usaha dan kapasitas diisi bebas di form /
+file import ("Rp 1.500.000.000", "Rp 1,5 M", "2 Ha", "500 ton/tahun").
+Hasil parsing disimpan di kolom pendamping <field>_nilai (REAL) dan
+<field>_satuan (TEXT) supaya bisa dijumlah / diagregasi langsung di SQL:
+
+- investasi dalam rupiah (satuan 'IDR'; 'USD' jika ditulis dalam dolar)
+- luas lahan dalam m2 (satuan 'm2'; Ha / are / km2 dikonversi)
+- kapasitas apa adanya dengan satuan ternormalisasi ('ton/tahun')
+
+Nilai yang tidak bisa dibaca menghasilkan (None, None).
+"""
+import re
+from functools import lru_cache
+
+# Angka dengan pemisah ribuan / desimal ('.' atau ',')
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)*')
+
+# Pengali dalam kata; singkatan (M, T) hanya untuk investasi karena di kolom
+# lain bisa berarti meter / ton
+MULTIPLIER_WORDS = {
+    'ribu': 1e3, 'rb': 1e3,
+    'juta': 1e6, 'jt': 1e6,
+    'miliar': 1e9, 'milyar': 1e9, 'milliar': 1e9, 'm': 1e9,
+    'triliun': 1e12, 't': 1e12,
+}
+WORD_MULTIPLIERS = {
+    word: value for word, value in MULTIPLIER_WORDS.items() if word not in ('m', 't')
+}
+
+# Satuan yang lebih panjang dari ini (kalimat keterangan) dipotong
+MAX_UNIT_LENGTH = 50
+
+# Satuan luas -> faktor ke m2 (dicocokkan dari nama terpanjang)
+LUAS_UNITS = {
+    'm2': 1, 'm²': 1, 'meter persegi': 1, 'meter2': 1, 'mtr2': 1,
+    'are': 100,
+    'ha': 1e4, 'hektar': 1e4, 'hektare': 1e4,
+    'km2': 1e6, 'km²': 1e6,
+}
+LUAS_UNITS_ORDERED = sorted(LUAS_UNITS.items(), key=lambda item: -len(item[0]))
+
+MULTIPLIER_PATTERN = re.compile(r'([a-zA-Z]+)\.?(?![a-zA-Z0-9²])')
+# Ukuran panjang x lebar ("20 x 30 m")
+DIMENSION_PATTERN = re.compile(
+    r'[x×*]\s*(' + NUMBER_PATTERN.pattern + r')\s*(m\b|meter\b)?', re.IGNORECASE
+)
+
+SLASH_PATTERN = re.compile(r'\s*/\s*')
+SPACE_PATTERN = re.compile(r'\s+')
+
+# Nilai teks di data perizinan banyak yang berulang ("1 Ha", "Rp 1 M")
+PARSE_CACHE_SIZE = 4096
+
+
+def parse_number(token):
+    """
+    Angka format Indonesia ke float: '.' ribuan dan ',' desimal
+    ("1.500.000,50"); format Inggris ("1,500,000.50") juga dikenali.
+    """
+    if '.' in token and ',' in token:
+        # Pemisah yang muncul terakhir adalah desimal
+        decimal = '.' if token.rfind('.') > token.rfind(',') else ','
+        thousands = ',' if decimal == '.' else '.'
+        token = token.replace(thousands, '').replace(decimal, '.')
+    elif ',' in token:
+        parts = token.split(',')
+        token = ''.join(parts) if len(parts) > 2 else token.replace(',', '.')
+    elif '.' in token:
+        parts = token.split('.')
+        # "1.500" = 1500, "2.5" = 2.5
+        if len(parts) > 2 or len(parts[1]) == 3:
+            token = ''.join(parts)
+    return float(token)
+
+
+def _split_value(text, multipliers):
+    """(nilai, sisa teks setelah angka / pengali) dari angka pertama di teks"""
+    match = NUMBER_PATTERN.search(text or '')
+    if not match:
+        return None, ''
+    value = parse_number(match.group())
+    rest = text[match.end():].strip()
+
+    word = MULTIPLIER_PATTERN.match(rest)
+    if word and word.group(1).lower() in multipliers:
+        value *= multipliers[word.group(1).lower()]
+        rest = rest[word.end():].strip()
+    return value, rest
+
+
+def _normalize_unit(rest):
+    """Satuan lowercase tanpa spasi ganda / tanda baca di ujung ("Ton / Tahun" -> "ton/tahun")"""
+    unit = SLASH_PATTERN.sub('/', rest.lower())
+    unit = SPACE_PATTERN.sub(' ', unit)
+    return unit.strip(' .,;:-()')
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_investasi(text):
+    """Rencana investasi -> (nilai, 'IDR' / 'USD')"""
+    value, _ = _split_value(text, MULTIPLIER_WORDS)
+    if value is None:
+        return None, None
+    lowered = (text or '').lower()
+    currency = 'USD' if ('usd' in lowered or '$' in lowered) else 'IDR'
+    return value, currency
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_luas(text):
+    """Luas lahan -> (nilai m2, 'm2'); satuan tidak dikenal disimpan apa adanya"""
+    value, rest = _split_value(text, WORD_MULTIPLIERS)
+    if value is None:
+        return None, None
+    dimension = DIMENSION_PATTERN.match(rest)
+    if dimension:
+        value *= parse_number(dimension.group(1))
+        if dimension.group(2):
+            return value, 'm2'
+        rest = rest[dimension.end():]
+    unit = _normalize_unit(rest)
+    for name, factor in LUAS_UNITS_ORDERED:
+        if unit == name or unit.startswith(name + ' ') or unit.replace(' ', '') == name:
+            return value * factor, 'm2'
+    return value, unit[:MAX_UNIT_LENGTH]
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_kapasitas(text):
+    """Kapasitas -> (nilai, satuan ternormalisasi)"""
+    value, rest = _split_value(text, WORD_MULTIPLIERS)
+    if value is None:
+        return None, None
+    return value, _normalize_unit(rest)[:MAX_UNIT_LENGTH]
+
+
+# Field teks -> parser; kolom pendamping <field>_nilai / <field>_satuan
+NUMERIC_FIELDS = {
+    'rencana_investasi': parse_investasi,
+    'luas_lahan_usaha': parse_luas,
+    'kapasitas': parse_kapasitas,
+}
+
+NUMERIC_COLUMNS = [
+    f'{field}_{suffix}' for field in NUMERIC_FIELDS for suffix in ('nilai', 'satuan')
+]
+
+
+def numeric_values(data):
+    """Nilai kolom pendamping (urutan NUMERIC_COLUMNS) untuk satu dict data"""
+    values = []
+    for field, parser in NUMERIC_FIELDS.items():
+        values.extend(parser(str(data.get(field) or '')))
+    return values
@@ -1,8 +1,13 @@
 import streamlit as st
-from database import init_database
+from database import ensure_database
+import metrics
+import profiling
 
 # Inisialisasi database
-init_database()
+ensure_database()
+
+# Metrik Prometheus (hanya jika PERIZINAN_METRICS_FILE / PERIZINAN_METRICS_PORT diset)
+metrics.start()
 
 # Konfigurasi page global
 st.set_page_config(
@@ -19,12 +24,15 @@ pages = [
     st.Page("pages/6_SLA_Monitoring.py", title="SLA Monitoring"),
     st.Page("pages/4_Tabel_Data.py", title="Tabel Data"),
     st.Page("pages/5_Import_Data.py", title="Import Data"),
+    st.Page("pages/7_Duplikat_Pelaku.py", title="Duplikat Pelaku Usaha"),
     st.Page("pages/3_Analytics.py", title="Dashboard"),
 ]
 
 # Setup Navigation
 pg = st.navigation(pages)
 
-# Jalankan Halaman
-pg.run()
+metrics.count_rerun(pg.title)
+
+# Jalankan Halaman (dengan panel profiling jika PERIZINAN_PROFILE=1 / ?profile=1)
+profiling.run_page(pg)
 
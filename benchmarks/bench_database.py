@@ -0,0 +1,271 @@
+"""
+Benchmark fungsi publik database.py terhadap dataset sintetis (datagen.py).
+
+Dataset dibuat sekali per (ukuran, seed) di benchmarks/data/ lalu dipakai
+ulang; benchmark tulis (insert / update / delete / dedup) berjalan di salinan
+supaya dataset tetap sama antar run. Hasil disimpan sebagai JSON
+(benchmarks/results/) dan bisa dibandingkan dengan run sebelumnya.
+
+Contoh:
+    python benchmarks/bench_database.py                       # 10k dan 100k
+    python benchmarks/bench_database.py --sizes 10000 100000 1000000
+    python benchmarks/bench_database.py --only analytics --repeat 10
+    python benchmarks/bench_database.py --compare benchmarks/results/sebelum.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+# Salinan snapshot.py dibangun di thread latar dan mengganggu pengukuran
+# (efeknya diukur load_test.py); harus diset sebelum database diimpor
+os.environ.setdefault('PERIZINAN_SNAPSHOT', '0')
+
+from datagen import DEFAULT_SEED, PerizinanGenerator, ROOT, build_database
+
+import database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_REPEAT = 5
+
+# Versi format data datagen; naikkan jika generator berubah supaya dataset dibuat ulang
+DATASET_VERSION = 1
+
+SUGGESTION_TERMS = ['maj', 'sum', 'lam', 'ber', 'jay', 'sej', 'kar', 'mak', 'abd', 'sin']
+
+
+def reset_caches():
+    """Kosongkan cache per-proses database.py (seperti proses aplikasi baru), tutup koneksi penulis dan pool baca"""
+    database.close_connections()
+    with database._suggestion_lock:
+        database._suggestion_indexes.clear()
+    with database._suggestion_memo_lock:
+        database._suggestion_memo.clear()
+    database._dedup_cache = None
+    database._reset_reference_cache()
+
+
+def dataset_path(size, seed, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"perizinan_{size}_s{seed}_v{DATASET_VERSION}.db")
+
+
+def ensure_dataset(size, seed, data_dir=DATA_DIR):
+    """Path dataset (ukuran, seed); dibuat dulu jika belum ada. Return (path, detik build / None)"""
+    path = dataset_path(size, seed, data_dir)
+    if os.path.exists(path):
+        return path, None
+    os.makedirs(data_dir, exist_ok=True)
+    print(f"Membuat dataset {size:,} baris (seed {seed}) ...", flush=True)
+    tmp_path = path + '.tmp'
+    seconds = build_database(tmp_path, size, seed)
+    os.replace(tmp_path, path)
+    return path, seconds
+
+
+def _consume(rows):
+    count = 0
+    for _ in rows:
+        count += 1
+    return count
+
+
+def _sample(path):
+    """Nilai contoh dari dataset untuk argumen benchmark"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM perizinan")
+        min_id, max_id = cursor.fetchone()
+        cursor.execute("""
+            SELECT sektor, COUNT(*) FROM v_perizinan GROUP BY sektor ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        top_sektor = cursor.fetchone()[0]
+        cursor.execute("SELECT nib FROM perizinan WHERE nib != '' AND id >= ? LIMIT 1", ((min_id + max_id) // 2,))
+        nib = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(substr(tanggal_permohonan, 1, 4)) FROM perizinan")
+        year = int(cursor.fetchone()[0])
+    finally:
+        conn.close()
+    return {'min_id': min_id, 'max_id': max_id, 'sektor': top_sektor, 'nib': nib, 'year': year}
+
+
+def read_benchmarks(sample):
+    """[(nama, fungsi, cold)] benchmark baca; cold=True mengosongkan cache sebelum tiap run"""
+    terms = iter(SUGGESTION_TERMS * 1000)
+    mid_id = (sample['min_id'] + sample['max_id']) // 2
+    year = sample['year']
+    return [
+        ('init_database', database.init_database, True),
+        ('get_reference_options', lambda: database.get_reference_options('sektor'), True),
+        ('get_all_perizinan', database.get_all_perizinan, False),
+        ('get_all_perizinan[sektor]', lambda: database.get_all_perizinan(sample['sektor']), False),
+        ('iter_perizinan', lambda: _consume(database.iter_perizinan()), False),
+        ('iter_perizinan[order=sektor]', lambda: _consume(database.iter_perizinan(order='sektor')), False),
+        ('search_perizinan', lambda: database.search_perizinan('maju jaya'), False),
+        ('get_perizinan_by_id', lambda: database.get_perizinan_by_id(mid_id), False),
+        ('get_pelaku_by_nib', lambda: database.get_pelaku_by_nib(sample['nib']), False),
+        ('search_field_suggestions[cold]',
+         lambda: database.search_field_suggestions('nama_pengguna_layanan', 'maj'), True),
+        ('search_field_suggestions[warm]',
+         lambda: database.search_field_suggestions('nama_pengguna_layanan', next(terms)), False),
+        ('search_suggestions_batch[cold]',
+         lambda: database.search_suggestions_batch({f: 'sa' for f in database.SUGGESTION_FIELDS}), True),
+        ('get_analytics_metrics', database.get_analytics_metrics, False),
+        ('get_analytics_metrics[yearly]',
+         lambda: database.get_analytics_metrics({'type': 'yearly', 'year': year}), False),
+        ('get_analytics_metrics[monthly]',
+         lambda: database.get_analytics_metrics({'type': 'monthly', 'year': year, 'month': 6}), False),
+        ('get_available_years', database.get_available_years, False),
+        ('get_kbli_rollup', database.get_kbli_rollup, False),
+        ('count_pelaku_usaha', database.count_pelaku_usaha, False),
+        ('get_pelaku_clusters', database.get_pelaku_clusters, False),
+        ('iter_perizinan_changes',
+         lambda: _consume(database.iter_perizinan_changes(database.get_export_watermark('bench'))), False),
+    ]
+
+
+def write_benchmarks(sample, seed):
+    """[(nama, fungsi, cold)] benchmark tulis; tiap run memakai record / id berbeda"""
+    generator = iter(PerizinanGenerator(10 ** 9, seed + 1))
+    ids = iter(range(sample['min_id'], sample['max_id'] + 1))
+    ids_to_delete = iter(range(sample['max_id'], sample['min_id'] - 1, -1))
+    return [
+        ('insert_perizinan', lambda: database.insert_perizinan(next(generator)), False),
+        ('insert_perizinan_many[1000]',
+         lambda: database.insert_perizinan_many(next(generator) for _ in range(1000)), False),
+        ('update_perizinan', lambda: database.update_perizinan(next(ids), next(generator)), False),
+        ('delete_perizinan', lambda: database.delete_perizinan(next(ids_to_delete)), False),
+        ('run_pelaku_dedup[incremental]', database.run_pelaku_dedup, False),
+    ]
+
+
+def time_call(fn, repeat, cold):
+    """Jalankan fn repeat kali, return statistik detik"""
+    runs = []
+    for _ in range(repeat):
+        if cold:
+            reset_caches()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {
+        'runs': runs,
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.fmean(runs),
+        'max': max(runs),
+    }
+
+
+def run_size(size, seed, repeat, only=None, data_dir=DATA_DIR):
+    """Jalankan semua benchmark untuk satu ukuran dataset"""
+    path, build_seconds = ensure_dataset(size, seed, data_dir)
+    sample = _sample(path)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_path = os.path.join(tmp, 'perizinan.db')
+        shutil.copyfile(path, work_path)
+        database.DB_PATH = work_path
+        reset_caches()
+
+        for name, fn, cold in read_benchmarks(sample) + write_benchmarks(sample, seed):
+            if only and not any(word in name for word in only):
+                continue
+            results[name] = time_call(fn, repeat, cold)
+            print(f"  {name:<36} median {results[name]['median'] * 1000:10.2f} ms", flush=True)
+        reset_caches()
+
+    return {'build_seconds': build_seconds, 'benchmarks': results}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_meta(**extra):
+    """Metadata run (waktu, commit, versi Python / SQLite) untuk file hasil JSON"""
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def save_report(report, output=None, prefix=''):
+    """Tulis hasil JSON (default benchmarks/results/<prefix><waktu>.json), return path"""
+    output = output or os.path.join(RESULTS_DIR, f"{prefix}{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def compare(current, previous):
+    """Cetak median run sekarang vs run sebelumnya per benchmark"""
+    print(f"\n{'dataset':>9}  {'benchmark':<36} {'sebelum ms':>12} {'sekarang ms':>12} {'rasio':>7}")
+    for size, dataset in current['datasets'].items():
+        old_benchmarks = previous.get('datasets', {}).get(size, {}).get('benchmarks', {})
+        for name, result in dataset['benchmarks'].items():
+            old = old_benchmarks.get(name)
+            new_ms = result['median'] * 1000
+            if old is None:
+                print(f"{size:>9}  {name:<36} {'-':>12} {new_ms:12.2f} {'-':>7}")
+                continue
+            old_ms = old['median'] * 1000
+            ratio = new_ms / old_ms if old_ms else float('inf')
+            print(f"{size:>9}  {name:<36} {old_ms:12.2f} {new_ms:12.2f} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fungsi database.py")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="ukuran dataset (baris), mis. 10000 100000 1000000")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--only', nargs='+', help="hanya benchmark yang namanya memuat kata ini")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="lokasi cache dataset")
+    parser.add_argument('--output', help="file hasil JSON (default benchmarks/results/<waktu>.json)")
+    parser.add_argument('--compare', help="file hasil JSON run sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    report = {
+        'meta': run_meta(seed=args.seed, repeat=args.repeat, dataset_version=DATASET_VERSION),
+        'datasets': {},
+    }
+
+    for size in args.sizes:
+        print(f"Dataset {size:,} baris", flush=True)
+        report['datasets'][str(size)] = run_size(size, args.seed, args.repeat, args.only, args.data_dir)
+
+    output = save_report(report, args.output)
+    print(f"\nHasil disimpan di {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
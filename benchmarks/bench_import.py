@@ -0,0 +1,166 @@
+"""
+Benchmark pipeline import Excel PKL di luar Streamlit.
+
+Tahap yang diukur sama dengan halaman Import Data:
+- parse: baca workbook (pd.read_excel header=None) + split_pkl_sheet
+- transform: auto_match_columns + build_records
+- insert: insert_perizinan per baris (jalur Excel halaman) atau
+  insert_perizinan_many (--insert many, jalur CSV / JSON Lines)
+- dedup: run_pelaku_dedup setelah import
+
+Untuk tiap tahap dicatat detik, baris/detik dan puncak memori Python
+(tracemalloc, di pass terpisah supaya tidak memperlambat pengukuran waktu).
+Workbook fixture (pkl_fixtures.py) di-cache di benchmarks/data/.
+
+Contoh:
+    python benchmarks/bench_import.py --rows 10000 --dirty 0.2
+    python benchmarks/bench_import.py --rows 100000 --insert many --no-memory
+    python benchmarks/bench_import.py --workbook contoh_pkl.xlsx --sektor "DINAS SOSIAL PROVINSI LAMPUNG"
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench_database import DATA_DIR, DATASET_VERSION, run_meta, save_report
+from datagen import DEFAULT_SEED
+from pkl_fixtures import write_pkl_workbook
+
+import database
+from importer import (
+    LIFETIME_VALUE, auto_match_columns, build_records, default_pkl_sheet, split_pkl_sheet
+)
+from referensi import read_sektor_file
+
+DEFAULT_ROWS = 10_000
+DEFAULT_DIRTY = 0.1
+DEFAULT_KATEGORI = 'Perizinan Berusaha'
+
+
+def ensure_workbook(rows, dirty, seed, data_dir=DATA_DIR):
+    """Path workbook fixture (rows, dirty, seed); dibuat dulu jika belum ada"""
+    path = os.path.join(data_dir, f"pkl_{rows}_d{dirty:g}_s{seed}_v{DATASET_VERSION}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Membuat workbook PKL {rows:,} baris (dirty {dirty:g}) ...", flush=True)
+        tmp_path = path + '.tmp.xlsx'
+        write_pkl_workbook(tmp_path, rows, dirty, seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def parse(path):
+    """Baca sheet PKL seperti halaman Import Data, return (headers, df_data)"""
+    sheet = default_pkl_sheet(pd.ExcelFile(path).sheet_names)
+    df_raw = pd.read_excel(path, sheet_name=sheet, header=None)
+    return split_pkl_sheet(df_raw)
+
+
+def transform(headers, df_data, sektor, kategori):
+    return build_records(df_data, auto_match_columns(headers), sektor, kategori)
+
+
+def insert(records, mode):
+    if mode == 'many':
+        return database.insert_perizinan_many(records)
+    for record in records:
+        database.insert_perizinan(record)
+    return len(records)
+
+
+def run_pipeline(path, sektor, kategori, mode, trace_memory=False):
+    """
+    Jalankan parse -> transform -> insert -> dedup ke database baru (temporary).
+    Return ({tahap: {seconds, peak_mb}}, records).
+    """
+    phases = {}
+
+    def measure(name, fn, *args):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args)
+        phases[name] = {'seconds': time.perf_counter() - start}
+        if trace_memory:
+            phases[name]['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'perizinan.db')
+        database.init_database()
+
+        headers, df_data = measure('parse', parse, path)
+        records = measure('transform', transform, headers, df_data, sektor, kategori)
+        measure('insert', insert, records, mode)
+        measure('dedup', database.run_pelaku_dedup)
+        database.close_connections()
+
+    return phases, records
+
+
+def check_records(records):
+    """Ringkasan hasil transform untuk memastikan data kotor tetap terbaca"""
+    return {
+        'records': len(records),
+        'tanggal_permohonan_terbaca': sum(1 for r in records if r.get('tanggal_permohonan', '')[:2] in ('19', '20')),
+        'masa_berlaku_seumur_hidup': sum(1 for r in records if r.get('masa_berlaku') == LIFETIME_VALUE),
+        'tanggal_izin_bukan_iso': sum(1 for r in records if r.get('tanggal_izin') and len(r['tanggal_izin']) != 10),
+        'nib_berprefix': sum(1 for r in records if str(r.get('nib', '')).upper().startswith('NIB')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline import Excel PKL")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--dirty', type=float, default=DEFAULT_DIRTY, help="porsi baris kotor (0-1)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workbook', help="pakai workbook PKL ini, bukan fixture sintetis")
+    parser.add_argument('--sektor', help="sektor batch (default sektor pertama a.txt)")
+    parser.add_argument('--kategori', default=DEFAULT_KATEGORI)
+    parser.add_argument('--insert', choices=['single', 'many'], default='single',
+                        help="single = insert_perizinan per baris (jalur Excel), many = satu transaksi")
+    parser.add_argument('--no-memory', action='store_true', help="lewati pass pengukuran memori")
+    parser.add_argument('--output', help="file hasil JSON (default benchmarks/results/import_<waktu>.json)")
+    args = parser.parse_args()
+
+    path = args.workbook or ensure_workbook(args.rows, args.dirty, args.seed)
+    sektor = args.sektor or read_sektor_file()[0]
+
+    phases, records = run_pipeline(path, sektor, args.kategori, args.insert)
+    rows = len(records)
+    if not args.no_memory:
+        memory_phases, _ = run_pipeline(path, sektor, args.kategori, args.insert, trace_memory=True)
+        for name, result in memory_phases.items():
+            phases[name]['peak_mb'] = result['peak_mb']
+
+    print(f"{rows:,} baris dari {path} (insert={args.insert})")
+    for name, result in phases.items():
+        result['rows_per_second'] = rows / result['seconds'] if result['seconds'] else None
+        peak = f"{result['peak_mb']:8.1f} MB" if 'peak_mb' in result else ''
+        print(f"  {name:<10} {result['seconds']:9.2f} s {result['rows_per_second']:12,.0f} baris/s {peak}")
+
+    report = {
+        'meta': run_meta(
+            seed=args.seed, workbook=os.path.basename(path), rows=args.rows, dirty=args.dirty,
+            insert=args.insert, dataset_version=DATASET_VERSION,
+        ),
+        'phases': phases,
+        'checks': check_records(records),
+        # ru_maxrss dalam KB di Linux
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+    }
+    output = save_report(report, args.output, prefix='import_')
+    print(f"\nHasil disimpan di {output}")
+
+
+if __name__ == '__main__':
+    main()
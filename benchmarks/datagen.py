@@ -0,0 +1,443 @@
+"""
+Generator data perizinan sintetis (seeded) untuk benchmark dan uji skala.
+
+Data dibuat mirip registry produksi: nama badan usaha / orang Indonesia,
+format NIB (13 digit) dan NPWP (15 / 16 digit), tanggal permohonan yang
+makin ramai ke tahun terakhir (hari kerja), SLA izin, masa berlaku seumur
+hidup, sebaran sektor a.txt yang miring, serta pelaku usaha yang mengajukan
+beberapa izin (dengan variasi penulisan nama).
+
+Seed yang sama selalu menghasilkan data yang sama.
+
+Contoh:
+    python benchmarks/datagen.py perizinan_100k.db --rows 100000
+    python benchmarks/datagen.py bench.db --rows 1000000 --seed 7
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import database  # noqa: E402
+from importer import LIFETIME_VALUE, MONTHS  # noqa: E402
+from referensi import (  # noqa: E402
+    JENIS_DOKUMEN_BY_KATEGORI, JENIS_PERMOHONAN_OPTIONS, KATEGORI_OPTIONS,
+    RESIKO_OPTIONS, read_sektor_file
+)
+from wilayah import WILAYAH_FILE  # noqa: E402
+
+DEFAULT_SEED = 42
+DATASET_SIZES = [10_000, 100_000, 1_000_000]
+BATCH_SIZE = 5000
+
+# Periode data: END_DATE tetap supaya dataset tidak bergantung tanggal hari ini
+END_DATE = date(2025, 12, 31)
+YEARS = 6
+
+BULAN = {int(nomor): nama.capitalize() for nama, nomor in MONTHS.items()}
+
+BADAN_USAHA = [('PT', 40), ('CV', 30), ('UD', 10), ('Koperasi', 5), ('KUD', 3), ('PO', 2), ('', 10)]
+
+NAMA_USAHA = [
+    'Maju', 'Jaya', 'Sumber', 'Rejeki', 'Makmur', 'Sejahtera', 'Abadi', 'Berkah',
+    'Mandiri', 'Sentosa', 'Karya', 'Mulia', 'Agung', 'Lestari', 'Sinar', 'Harapan',
+    'Bumi', 'Lampung', 'Sakti', 'Utama', 'Prima', 'Cahaya', 'Mitra', 'Tani',
+    'Nusantara', 'Perkasa', 'Indah', 'Putra', 'Putri', 'Anugerah', 'Gemilang', 'Baru',
+    'Bersama', 'Terang', 'Alam', 'Raya', 'Ruwa', 'Jurai', 'Sai', 'Way', 'Krakatau',
+    'Siger', 'Tapis', 'Kopi', 'Lada', 'Sawit', 'Tebu', 'Samudra', 'Pesisir', 'Gunung',
+]
+
+NAMA_DEPAN = [
+    'Budi', 'Siti', 'Agus', 'Dewi', 'Hendra', 'Sri', 'Rahmat', 'Nur', 'Joko', 'Ahmad',
+    'Yuni', 'Eko', 'Rina', 'Andi', 'Fitri', 'Dedi', 'Wahyu', 'Lina', 'Rudi', 'Ika',
+    'Muhammad', 'Fajar', 'Indah', 'Hadi', 'Ratna', 'Bambang', 'Suryani', 'Taufik',
+    'Novi', 'Irwan', 'Mega', 'Arif', 'Yusuf', 'Desi', 'Herman', 'Putu', 'Made', 'Wayan',
+]
+
+NAMA_BELAKANG = [
+    'Santoso', 'Saputra', 'Wijaya', 'Hidayat', 'Lestari', 'Susanto', 'Kurniawan',
+    'Pratama', 'Setiawan', 'Rahayu', 'Handayani', 'Gunawan', 'Nugroho', 'Siregar',
+    'Harahap', 'Sembiring', 'Hasibuan', 'Marpaung', 'Putri', 'Sari', 'Utami',
+    'Firmansyah', 'Ramadhan', 'Syahputra', 'Effendi', 'Purnama', 'Aminah', 'Yulianti',
+]
+
+JALAN = [
+    'Jl. Jend. Sudirman', 'Jl. Ahmad Yani', 'Jl. Diponegoro', 'Jl. Teuku Umar',
+    'Jl. Raden Intan', 'Jl. Kartini', 'Jl. Imam Bonjol', 'Jl. Pangeran Antasari',
+    'Jl. Soekarno-Hatta', 'Jl. Lintas Sumatera', 'Jl. Raya Natar', 'Jl. Zainal Abidin Pagar Alam',
+    'Jl. Gatot Subroto', 'Jl. Hayam Wuruk', 'Jl. Way Sekampung', 'Jl. Ryacudu',
+]
+
+EMAIL_DOMAIN = ['gmail.com', 'gmail.com', 'gmail.com', 'yahoo.co.id', 'yahoo.com', 'outlook.com']
+
+OPERATOR_SELULER = ['11', '12', '13', '21', '22', '23', '52', '53', '77', '78', '81', '82', '95', '96']
+
+# Golongan pokok KBLI yang lazim per sektor (dicocokkan dari kata di nama sektor)
+KBLI_SEKTOR = [
+    ('PERHUBUNGAN', [49, 50, 52]),
+    ('PERKEBUNAN', [1, 10]),
+    ('PETERNAKAN', [1, 10, 75]),
+    ('ENERGI', [5, 6, 8, 35]),
+    ('PANGAN', [1, 10, 46]),
+    ('KEHUTANAN', [2, 16]),
+    ('BINA MARGA', [42, 43]),
+    ('KELAUTAN', [3, 10]),
+    ('TENAGA KERJA', [78]),
+    ('PERUMAHAN', [41, 68]),
+    ('SUMBER DAYA AIR', [36, 37]),
+    ('PARIWISATA', [55, 56, 79, 93]),
+    ('KESEHATAN', [21, 47, 86]),
+    ('LINGKUNGAN', [38, 39]),
+    ('KOPERASI', [47, 64]),
+    ('PERINDUSTRIAN', [10, 13, 16, 22, 25, 46, 47]),
+    ('SOSIAL', [87, 88]),
+    ('PENDIDIKAN', [85]),
+    ('KESATUAN BANGSA', [94]),
+]
+KBLI_UMUM = [46, 47, 56]
+
+JENIS_USAHA = {
+    1: 'Perkebunan', 2: 'Pengusahaan Hutan', 3: 'Perikanan Budidaya', 5: 'Pertambangan Batu Bara',
+    6: 'Pertambangan Minyak dan Gas Bumi', 8: 'Penggalian Batu, Pasir dan Tanah Liat',
+    10: 'Industri Makanan', 13: 'Industri Tekstil', 16: 'Industri Kayu', 21: 'Industri Farmasi',
+    22: 'Industri Karet dan Plastik', 25: 'Industri Barang Logam', 35: 'Pengadaan Listrik',
+    36: 'Pengelolaan Air', 37: 'Pengelolaan Air Limbah', 38: 'Pengelolaan Sampah',
+    39: 'Remediasi', 41: 'Konstruksi Gedung', 42: 'Konstruksi Jalan', 43: 'Konstruksi Khusus',
+    46: 'Perdagangan Besar', 47: 'Perdagangan Eceran', 49: 'Angkutan Darat', 50: 'Angkutan Perairan',
+    52: 'Pergudangan', 55: 'Penyediaan Akomodasi', 56: 'Penyediaan Makan Minum',
+    64: 'Jasa Keuangan', 68: 'Real Estat', 75: 'Aktivitas Kesehatan Hewan', 78: 'Penempatan Tenaga Kerja',
+    79: 'Agen Perjalanan', 85: 'Pendidikan', 86: 'Aktivitas Kesehatan', 87: 'Aktivitas Sosial',
+    88: 'Aktivitas Sosial Tanpa Akomodasi', 93: 'Olahraga dan Rekreasi', 94: 'Aktivitas Organisasi',
+}
+
+SATUAN_KAPASITAS = ['ton/tahun', 'ton/bulan', 'unit', 'kamar', 'kursi', 'orang', 'liter/hari', 'MW', 'kg/hari']
+
+
+def _weighted(pairs):
+    """[(nilai, bobot)] -> ([nilai], [bobot]) untuk rng.choices"""
+    values = [value for value, _ in pairs]
+    weights = [weight for _, weight in pairs]
+    return values, weights
+
+
+def _read_wilayah():
+    """[(nama kab/kota, alias, [kecamatan])] dari wilayah.csv"""
+    with open(WILAYAH_FILE, 'r', encoding='utf-8', newline='') as f:
+        return [
+            (row['nama'], row['alias'].split('|'), row['kecamatan'].split('|'))
+            for row in csv.DictReader(f)
+        ]
+
+
+class PerizinanGenerator:
+    """Generator record perizinan (dict siap insert_perizinan) dengan rng seeded"""
+
+    def __init__(self, rows, seed=DEFAULT_SEED):
+        self.rows = rows
+        self.rng = random.Random(seed)
+        rng = self.rng
+
+        # Sebaran sektor miring (Zipf) dengan urutan acak per seed
+        self.sektor = read_sektor_file()
+        rng.shuffle(self.sektor)
+        self.sektor_weights = [1 / (rank + 1) ** 1.2 for rank in range(len(self.sektor))]
+
+        # Bandar Lampung dan Lampung Selatan paling ramai
+        self.wilayah = _read_wilayah()
+        self.wilayah_weights = [
+            6 if 'Bandar Lampung' in nama else 4 if 'Lampung Selatan' in nama else 1
+            for nama, _, _ in self.wilayah
+        ]
+
+        # Sepertiga permohonan dari pelaku usaha yang sudah pernah mengajukan
+        self.pelaku = []
+        self.pelaku_target = max(1, rows * 2 // 3)
+        self.nib_used = set()
+
+        # Jumlah permohonan tumbuh ~25% per tahun
+        self.start_date = date(END_DATE.year - YEARS + 1, 1, 1)
+        self.days = (END_DATE - self.start_date).days + 1
+        self.growth = math.log(1.25) / 365
+
+    # --- identitas -------------------------------------------------------
+
+    def nib(self):
+        while True:
+            nib = self.rng.choice(['91', '81', '12']) + ''.join(self.rng.choices('0123456789', k=11))
+            if nib not in self.nib_used:
+                self.nib_used.add(nib)
+                return nib
+
+    def npwp(self):
+        rng = self.rng
+        if rng.random() < 0.2:
+            # NPWP 16 digit (NIK)
+            return '18' + ''.join(rng.choices('0123456789', k=14))
+        d = ''.join(rng.choices('0123456789', k=15))
+        return f"{d[:2]}.{d[2:5]}.{d[5:8]}.{d[8]}-{d[9:12]}.{d[12:]}"
+
+    def telepon(self):
+        rng = self.rng
+        if rng.random() < 0.15:
+            return f"(0721) {rng.randint(700000, 799999)}"
+        nomor = f"08{rng.choice(OPERATOR_SELULER)}{rng.randint(10 ** 6, 10 ** 8 - 1)}"
+        return nomor if rng.random() < 0.7 else f"{nomor[:4]}-{nomor[4:8]}-{nomor[8:]}"
+
+    def orang(self):
+        rng = self.rng
+        nama = f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}"
+        return nama.upper() if rng.random() < 0.3 else nama
+
+    def lokasi(self):
+        """(alamat, lokasi_usaha) di kabupaten / kota acak"""
+        rng = self.rng
+        nama, alias, kecamatan = rng.choices(self.wilayah, self.wilayah_weights)[0]
+        kec = rng.choice(kecamatan)
+        alamat = f"{rng.choice(JALAN)} No. {rng.randint(1, 250)}, {kec}, {nama}"
+        style = rng.random()
+        if style < 0.4:
+            lokasi = nama
+        elif style < 0.6:
+            lokasi = rng.choice(alias).upper()
+        elif style < 0.85:
+            lokasi = f"{kec}, {rng.choice(alias)}"
+        else:
+            lokasi = f"Kec. {kec}"
+        return alamat, lokasi
+
+    def new_pelaku(self):
+        rng = self.rng
+        badan = rng.choices(*_weighted(BADAN_USAHA))[0]
+        inti = ' '.join(rng.sample(NAMA_USAHA, rng.choice([2, 2, 3])))
+        pemilik = self.orang()
+        if badan in ('', 'UD') and rng.random() < 0.5:
+            # Usaha perorangan sering memakai nama pemilik
+            inti = pemilik.title()
+        nama = f"{badan} {inti}".strip().upper() if rng.random() < 0.6 else f"{badan} {inti}".strip()
+        alamat, lokasi = self.lokasi()
+        slug = ''.join(ch for ch in inti.lower() if ch.isalnum())[:20]
+        return {
+            'nama_pengguna_layanan': nama,
+            'nib': self.nib() if rng.random() < 0.95 else '',
+            'alamat': alamat,
+            'pemilik_pengurus': pemilik,
+            'lokasi_usaha': lokasi,
+            'npwp': self.npwp() if rng.random() < 0.85 else '',
+            'telepon': self.telepon() if rng.random() < 0.9 else '',
+            'email': f"{slug}{rng.randint(1, 99)}@{rng.choice(EMAIL_DOMAIN)}" if rng.random() < 0.7 else '',
+        }
+
+    def variant(self, nama):
+        """Variasi penulisan nama pelaku usaha yang sama (untuk deteksi duplikat)"""
+        rng = self.rng
+        if nama.upper().startswith('PT ') and rng.random() < 0.5:
+            return 'PT. ' + nama[3:]
+        if ' ' in nama and rng.random() < 0.3:
+            badan, inti = nama.split(' ', 1)
+            return f"{inti}, {badan}"
+        return nama.title() if nama.isupper() else nama.upper()
+
+    def pelaku_usaha(self):
+        rng = self.rng
+        if self.pelaku and (len(self.pelaku) >= self.pelaku_target or rng.random() < 0.33):
+            # Pelaku lama lebih sering dipilih ulang yang baru-baru ini
+            pelaku = dict(self.pelaku[-1 - min(int(rng.expovariate(1 / 200)), len(self.pelaku) - 1)])
+            if rng.random() < 0.1:
+                pelaku['nama_pengguna_layanan'] = self.variant(pelaku['nama_pengguna_layanan'])
+            return pelaku
+        pelaku = self.new_pelaku()
+        self.pelaku.append(pelaku)
+        return pelaku
+
+    # --- tanggal ---------------------------------------------------------
+
+    def tanggal_permohonan(self):
+        """Tanggal hari kerja; kepadatan tumbuh eksponensial ke END_DATE"""
+        rng = self.rng
+        # Inverse CDF dari kepadatan exp(growth * hari)
+        u = rng.random()
+        total = math.expm1(self.growth * self.days)
+        offset = int(math.log1p(u * total) / self.growth)
+        tanggal = self.start_date + timedelta(days=min(offset, self.days - 1))
+        if tanggal.weekday() >= 5 and rng.random() < 0.95:
+            tanggal -= timedelta(days=tanggal.weekday() - 4)
+        return tanggal
+
+    def tanggal_indonesia(self, tanggal):
+        return f"{tanggal.day:02d} {BULAN[tanggal.month]} {tanggal.year}"
+
+    # --- nilai teks bebas ------------------------------------------------
+
+    def kbli(self, sektor):
+        rng = self.rng
+        divisions = next((d for kata, d in KBLI_SEKTOR if kata in sektor), KBLI_UMUM)
+        division = rng.choice(divisions)
+        kode = f"{division:02d}{rng.randint(0, 999):03d}"
+        jenis_usaha = JENIS_USAHA.get(division, 'Aktivitas Usaha Lainnya')
+        style = rng.random()
+        if style < 0.7:
+            kbli = kode
+        elif style < 0.85:
+            kbli = f"{kode[:2]}.{kode[2:]}"
+        else:
+            kbli = f"KBLI {kode} - {jenis_usaha}"
+        return kbli, jenis_usaha
+
+    def rencana_investasi(self):
+        rng = self.rng
+        if rng.random() < 0.15:
+            return ''
+        nilai = int(math.exp(rng.gauss(math.log(5e8), 1.8)) // 1e6 * 1e6) or 1_000_000
+        style = rng.random()
+        if style < 0.05:
+            return f"USD {nilai // 15000:,}".replace(',', '.')
+        if style < 0.55:
+            return f"Rp {nilai:,}".replace(',', '.')
+        if style < 0.8:
+            if nilai >= 1e9:
+                return f"Rp {nilai / 1e9:.1f} M".replace('.', ',').replace(',0 ', ' ')
+            return f"Rp {nilai // 10 ** 6} Juta"
+        return str(nilai)
+
+    def luas_lahan(self):
+        rng = self.rng
+        style = rng.random()
+        if style < 0.2:
+            return ''
+        if style < 0.5:
+            return f"{rng.randint(1, 500)} Ha"
+        if style < 0.85:
+            return f"{rng.randint(50, 5000)} m2"
+        return f"{rng.randint(5, 50)} x {rng.randint(5, 80)} m"
+
+    def kapasitas(self):
+        rng = self.rng
+        if rng.random() < 0.3:
+            return ''
+        return f"{rng.randint(1, 2000)} {rng.choice(SATUAN_KAPASITAS)}"
+
+    # --- record ----------------------------------------------------------
+
+    def record(self):
+        rng = self.rng
+        sektor = rng.choices(self.sektor, self.sektor_weights)[0]
+        kategori = rng.choices(KATEGORI_OPTIONS, [25, 60, 15])[0]
+        tanggal = self.tanggal_permohonan()
+
+        # SLA lognormal (median ~5 hari); permohonan terbaru sebagian belum terbit
+        tanggal_izin = ''
+        if (END_DATE - tanggal).days > 30 or rng.random() < 0.5:
+            sla = int(rng.lognormvariate(math.log(5), 0.8))
+            terbit = tanggal + timedelta(days=sla)
+            if terbit <= END_DATE and rng.random() < 0.97:
+                tanggal_izin = terbit.isoformat()
+
+        masa_berlaku = ''
+        if tanggal_izin:
+            if rng.random() < 0.65:
+                masa_berlaku = LIFETIME_VALUE
+            else:
+                tahun = rng.choice([1, 2, 3, 5, 5, 5])
+                masa_berlaku = (date.fromisoformat(tanggal_izin) + timedelta(days=365 * tahun)).isoformat()
+
+        kbli, jenis_usaha = self.kbli(sektor)
+        nomor_permohonan = f"I-{tanggal:%Y%m%d}{rng.randint(0, 10 ** 9 - 1):09d}"
+
+        rekomendasi = ''
+        permohonan_rekomendasi = ''
+        if kategori != 'Non-Perizinan' and rng.random() < 0.4:
+            rek_tanggal = tanggal + timedelta(days=rng.randint(0, 14))
+            permohonan_rekomendasi = f"{rng.randint(100, 999)}/REK/{tanggal.year} ({self.tanggal_indonesia(tanggal)})"
+            rekomendasi = (
+                f"{rng.randint(500, 570)}/{rng.randint(1, 9999)}/V.{rng.randint(1, 30):02d}/{rek_tanggal.year}"
+                f" ({self.tanggal_indonesia(rek_tanggal)})"
+            )
+
+        data = {
+            'sektor': sektor,
+            'kategori_perizinan': kategori,
+            'kbli': kbli,
+            'jenis_usaha': jenis_usaha,
+            'luas_lahan_usaha': self.luas_lahan(),
+            'resiko': rng.choices(RESIKO_OPTIONS + [''], [35, 25, 20, 10, 5, 5])[0],
+            'kapasitas': self.kapasitas(),
+            'rencana_investasi': self.rencana_investasi(),
+            'jenis_permohonan': rng.choices(JENIS_PERMOHONAN_OPTIONS, [70, 15, 15])[0],
+            'nomor_permohonan': nomor_permohonan,
+            'tanggal_permohonan': tanggal.isoformat(),
+            'nomor_tanggal_permohonan_rekomendasi': permohonan_rekomendasi,
+            'nomor_tanggal_rekomendasi': rekomendasi,
+            'nomor_izin': f"503/{rng.randint(1, 99999):05d}/IV.{rng.randint(1, 40):02d}/{tanggal.year}" if tanggal_izin else '',
+            'tanggal_izin': tanggal_izin,
+            'masa_berlaku': masa_berlaku,
+            'keterangan': rng.choices(['', 'Selesai', 'Proses', 'Menunggu rekomendasi teknis'], [70, 15, 10, 5])[0],
+            'jenis_dokumen': rng.choice(JENIS_DOKUMEN_BY_KATEGORI[kategori]) if rng.random() < 0.8 else '',
+        }
+        data.update(self.pelaku_usaha())
+        return data
+
+    def __iter__(self):
+        for _ in range(self.rows):
+            yield self.record()
+
+
+def generate_records(rows, seed=DEFAULT_SEED):
+    """Iterator record perizinan sintetis (dict), deterministik untuk seed yang sama"""
+    return iter(PerizinanGenerator(rows, seed))
+
+
+def build_database(path, rows, seed=DEFAULT_SEED, batch_size=BATCH_SIZE, progress=None):
+    """
+    Buat database perizinan baru di path berisi rows record sintetis
+    lewat jalur tulis aplikasi (insert_perizinan_many), lalu jalankan
+    deteksi duplikat seperti setelah import. Return detik yang dipakai.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    database.DB_PATH = path
+    database.init_database()
+
+    start = time.perf_counter()
+    batch = []
+    done = 0
+    for record in generate_records(rows, seed):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            done += database.insert_perizinan_many(batch)
+            batch = []
+            if progress:
+                progress(done, rows)
+    if batch:
+        done += database.insert_perizinan_many(batch)
+    database.run_pelaku_dedup()
+    seconds = time.perf_counter() - start
+    # Tutup koneksi penulis supaya WAL di-checkpoint ke file utama
+    # (file boleh langsung dipindah / disalin setelah ini)
+    database.close_connections()
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator data perizinan sintetis")
+    parser.add_argument('path', help="file database SQLite tujuan (ditimpa)")
+    parser.add_argument('--rows', type=int, default=DATASET_SIZES[0])
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f"\r{done:,}/{total:,} baris", end='', flush=True)
+
+    seconds = build_database(args.path, args.rows, args.seed, progress=progress)
+    print(f"\n{args.rows:,} baris ditulis ke {args.path} dalam {seconds:.1f} detik")
+
+
+if __name__ == '__main__':
+    main()
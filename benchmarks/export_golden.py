@@ -0,0 +1,82 @@
+"""
+Golden-file check untuk format export (exporter.export_records dan
+create_export_dataframe).
+
+golden/export_input.json berisi data Tabel Data kecil yang sengaja kotor
+(tanggal non-ISO / tidak valid, masa berlaku "Selama ...", NaN / string
+kosong, nomor permohonan tanpa tanggal, index DataFrame tidak mulai dari 0).
+Output export_records (jalur yang dipakai Tabel Data dan transfer.py),
+versi vektor dan versi per baris (export_record) harus sama persis (dtype
+termasuk) dengan golden/export_expected.json; harness gagal (exit code 1)
+jika berbeda.
+
+Contoh:
+    python benchmarks/export_golden.py
+    python benchmarks/export_golden.py --update   # tulis ulang expected dari versi per baris
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from exporter import create_export_dataframe, export_record, export_records  # noqa: E402
+
+GOLDEN_DIR = os.path.join(BENCH_DIR, 'golden')
+INPUT_FILE = os.path.join(GOLDEN_DIR, 'export_input.json')
+EXPECTED_FILE = os.path.join(GOLDEN_DIR, 'export_expected.json')
+
+
+def read_frame(path):
+    """DataFrame dari JSON orient='split' tanpa konversi dtype / tanggal"""
+    return pd.read_json(path, orient='split', dtype=False, convert_dates=False)
+
+
+def row_wise_export(df_source):
+    """Referensi: versi per baris sebelum create_export_dataframe divektorkan"""
+    return pd.DataFrame([export_record(idx + 1, row) for idx, row in df_source.iterrows()])
+
+
+def streamed_export(df_source, batch_size=5):
+    """
+    Jalur produksi: baris database (tuple) lewat export_records. Batch kecil
+    supaya batas batch ikut teruji; No dinomori ulang dari 1 sesuai urutan stream.
+    """
+    records = export_records(df_source.itertuples(index=False, name=None), batch_size)
+    return pd.DataFrame(list(records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-file check export Tabel Data")
+    parser.add_argument('--update', action='store_true', help="tulis ulang export_expected.json dari versi per baris")
+    args = parser.parse_args()
+
+    df_source = read_frame(INPUT_FILE)
+    if args.update:
+        row_wise_export(df_source).to_json(EXPECTED_FILE, orient='split', indent=1, force_ascii=False)
+        print(f"Expected ditulis ke {EXPECTED_FILE}")
+        return 0
+
+    expected = read_frame(EXPECTED_FILE)
+    failed = False
+    checks = [
+        ('export_records', streamed_export, expected.assign(No=range(1, len(expected) + 1))),
+        ('create_export_dataframe', create_export_dataframe, expected),
+        ('per baris', row_wise_export, expected),
+    ]
+    for name, build, target in checks:
+        try:
+            pd.testing.assert_frame_equal(build(df_source), target)
+        except AssertionError as e:
+            failed = True
+            print(f"GAGAL {name}:\n{e}\n")
+        else:
+            print(f"OK    {name} ({len(expected)} baris)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
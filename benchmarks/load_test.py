@@ -0,0 +1,305 @@
+"""
+Load test sesi bersamaan terhadap API database.py (tanpa Streamlit).
+
+Setiap "user" adalah satu thread yang menjalankan campuran aksi loket:
+- input: cek NIB terdaftar (get_pelaku_by_nib) + insert_perizinan
+- autocomplete: search_suggestions_batch dengan prefix 2-4 huruf
+- edit: get_perizinan_by_id + update_perizinan (edit Tabel Data)
+- tabel: search_perizinan (pencarian Tabel Data)
+- import: insert_perizinan_many satu batch + run_pelaku_dedup
+- dashboard: get_available_years + get_analytics_metrics + get_kbli_rollup
+
+User dibagi ke beberapa proses (--processes) supaya cache per proses dan
+penguncian file SQLite antar proses ikut teruji; thread dalam satu proses
+berbagi cache seperti sesi Streamlit dalam satu server. Database kerja
+adalah salinan dataset datagen.py di direktori sementara.
+
+Dilaporkan per aksi: throughput, latensi p50 / p99 dan rasio error lock
+(sqlite3.OperationalError "database is locked" / busy) dan error lain.
+
+Contoh:
+    python benchmarks/load_test.py --users 16 --duration 30
+    python benchmarks/load_test.py --users 32 --processes 4 --mix input=5 edit=5 import=1
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Dashboard membaca salinan snapshot.py seperti di aplikasi (bench_database.py
+# mematikannya); PERIZINAN_SNAPSHOT=0 untuk perbandingan
+os.environ.setdefault('PERIZINAN_SNAPSHOT', '1')
+
+from bench_database import DATA_DIR, DATASET_VERSION, ensure_dataset, reset_caches, run_meta, save_report
+from datagen import DEFAULT_SEED, PerizinanGenerator
+
+import database
+from exporter import DB_COLUMNS
+
+DEFAULT_ROWS = 10_000
+DEFAULT_USERS = 8
+DEFAULT_DURATION = 30
+DEFAULT_IMPORT_ROWS = 200
+
+# Bobot aksi default (kira-kira pola pemakaian loket: banyak ketik, sedikit import)
+DEFAULT_MIX = {
+    'input': 15,
+    'autocomplete': 40,
+    'edit': 10,
+    'tabel': 10,
+    'import': 1,
+    'dashboard': 24,
+}
+
+SEARCH_TERMS = ['maju', 'jaya', 'sumber', 'lampung', 'bandar', 'karya', 'makmur', 'sejahtera']
+SUGGESTION_FIELDS = ['nama_pengguna_layanan', 'alamat', 'pemilik_pengurus', 'jenis_usaha', 'kbli']
+EDIT_COLUMNS = [column for column in DB_COLUMNS if column not in ('id', 'created_at', 'updated_at')]
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+class UserSession:
+    """Satu user simulasi; aksi memakai record / id / kata acak dari seed sendiri"""
+
+    def __init__(self, user_id, seed, sample, import_rows):
+        self.rng = random.Random(seed * 1000 + user_id)
+        self.records = iter(PerizinanGenerator(10 ** 9, seed + 1 + user_id))
+        self.sample = sample
+        self.import_rows = import_rows
+
+    def input(self):
+        record = next(self.records)
+        if record['nib']:
+            database.get_pelaku_by_nib(record['nib'])
+        database.insert_perizinan(record)
+
+    def autocomplete(self):
+        record = next(self.records)
+        terms = {}
+        for field in self.rng.sample(SUGGESTION_FIELDS, 3):
+            value = str(record.get(field) or '')
+            if len(value) >= 2:
+                terms[field] = value[:self.rng.randint(2, 4)].lower()
+        database.search_suggestions_batch(terms)
+
+    def edit(self):
+        id = self.rng.randint(self.sample['min_id'], self.sample['max_id'])
+        row = database.get_perizinan_by_id(id)
+        if row is None:
+            return
+        data = {column: '' if value is None else str(value) for column, value in zip(DB_COLUMNS, row)}
+        data = {column: data[column] for column in EDIT_COLUMNS}
+        data['keterangan'] = f"diedit load test {self.rng.randint(1, 10 ** 6)}"
+        database.update_perizinan(id, data)
+
+    def tabel(self):
+        database.search_perizinan(self.rng.choice(SEARCH_TERMS), limit=500)
+
+    def import_(self):
+        database.insert_perizinan_many(next(self.records) for _ in range(self.import_rows))
+        database.run_pelaku_dedup()
+
+    def dashboard(self):
+        years = database.get_available_years()
+        year = self.rng.choice(years) if years else None
+        database.get_analytics_metrics({'type': 'yearly', 'year': year} if year else None)
+        database.get_kbli_rollup()
+
+    def action(self, name):
+        return self.import_ if name == 'import' else getattr(self, name)
+
+
+def _user_loop(session, mix, start_at, stop_at, think_ms, results):
+    """Jalankan aksi acak sampai stop_at; latensi / error ditulis ke results[aksi]"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    time.sleep(max(0.0, start_at - time.time()))
+    while time.time() < stop_at:
+        name = session.rng.choices(names, weights)[0]
+        entry = results[name]
+        start = time.perf_counter()
+        try:
+            session.action(name)()
+        except Exception as e:
+            if is_lock_error(e):
+                entry['lock_errors'] += 1
+            else:
+                entry['errors'] += 1
+                entry.setdefault('error_sample', f"{type(e).__name__}: {e}")
+        else:
+            entry['latencies'].append(time.perf_counter() - start)
+        if think_ms:
+            time.sleep(session.rng.expovariate(1000 / think_ms))
+
+
+def run_process(args):
+    """Satu proses: beberapa thread user terhadap db_path. Return hasil per aksi."""
+    db_path, user_ids, seed, sample, mix, start_at, stop_at, think_ms, import_rows = args
+    database.DB_PATH = db_path
+    reset_caches()
+    per_user = []
+    threads = []
+    for user_id in user_ids:
+        results = {name: {'latencies': [], 'lock_errors': 0, 'errors': 0} for name in mix}
+        per_user.append(results)
+        session = UserSession(user_id, seed, sample, import_rows)
+        thread = threading.Thread(
+            target=_user_loop, args=(session, mix, start_at, stop_at, think_ms, results), daemon=True
+        )
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    database.close_connections()
+    return per_user
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(per_user, duration):
+    """Gabungkan hasil semua user: throughput, p50 / p99 (ms), rasio error per aksi + total"""
+    merged = {}
+    for results in per_user:
+        for name, entry in results.items():
+            target = merged.setdefault(name, {'latencies': [], 'lock_errors': 0, 'errors': 0})
+            target['latencies'].extend(entry['latencies'])
+            target['lock_errors'] += entry['lock_errors']
+            target['errors'] += entry['errors']
+            if 'error_sample' in entry:
+                target.setdefault('error_sample', entry['error_sample'])
+
+    summary = {}
+    all_latencies = []
+    totals = {'ok': 0, 'lock_errors': 0, 'errors': 0}
+    for name, entry in merged.items():
+        latencies = sorted(entry['latencies'])
+        all_latencies.extend(latencies)
+        attempts = len(latencies) + entry['lock_errors'] + entry['errors']
+        totals['ok'] += len(latencies)
+        totals['lock_errors'] += entry['lock_errors']
+        totals['errors'] += entry['errors']
+        summary[name] = {
+            'ok': len(latencies),
+            'ops_per_second': len(latencies) / duration,
+            'p50_ms': _percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p99_ms': _percentile(latencies, 0.99) * 1000 if latencies else None,
+            'max_ms': latencies[-1] * 1000 if latencies else None,
+            'lock_errors': entry['lock_errors'],
+            'lock_error_rate': entry['lock_errors'] / attempts if attempts else 0.0,
+            'errors': entry['errors'],
+            'error_sample': entry.get('error_sample'),
+        }
+    all_latencies.sort()
+    attempts = sum(totals.values())
+    summary['total'] = {
+        'ok': totals['ok'],
+        'ops_per_second': totals['ok'] / duration,
+        'p50_ms': _percentile(all_latencies, 0.50) * 1000 if all_latencies else None,
+        'p99_ms': _percentile(all_latencies, 0.99) * 1000 if all_latencies else None,
+        'max_ms': all_latencies[-1] * 1000 if all_latencies else None,
+        'lock_errors': totals['lock_errors'],
+        'lock_error_rate': totals['lock_errors'] / attempts if attempts else 0.0,
+        'errors': totals['errors'],
+        'error_sample': None,
+    }
+    return summary
+
+
+def _sample(path):
+    conn = sqlite3.connect(path)
+    try:
+        min_id, max_id = conn.execute("SELECT MIN(id), MAX(id) FROM perizinan").fetchone()
+    finally:
+        conn.close()
+    return {'min_id': min_id, 'max_id': max_id}
+
+
+def parse_mix(items):
+    """['input=5', 'edit=1'] -> bobot; aksi yang tidak disebut bobotnya 0"""
+    if not items:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Aksi tidak dikenal: {name} (pilihan: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test sesi bersamaan terhadap database.py")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="ukuran dataset awal")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--users', type=int, default=DEFAULT_USERS, help="jumlah user (thread) total")
+    parser.add_argument('--processes', type=int, default=1, help="user dibagi rata ke proses ini")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="detik")
+    parser.add_argument('--think-ms', type=float, default=0, help="rata-rata jeda antar aksi per user (ms)")
+    parser.add_argument('--import-rows', type=int, default=DEFAULT_IMPORT_ROWS, help="baris per aksi import")
+    parser.add_argument('--mix', nargs='+', help="bobot aksi, mis. input=5 autocomplete=10 import=1")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="lokasi cache dataset")
+    parser.add_argument('--output', help="file hasil JSON (default benchmarks/results/load_<waktu>.json)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    processes = max(1, min(args.processes, args.users))
+    path, _ = ensure_dataset(args.rows, args.seed, args.data_dir)
+    sample = _sample(path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_path = os.path.join(tmp, 'perizinan.db')
+        shutil.copyfile(path, work_path)
+        database.DB_PATH = work_path
+        database.init_database()
+
+        start_at = time.time() + 1.0 + 0.5 * processes
+        stop_at = start_at + args.duration
+        jobs = [
+            (work_path, list(range(p, args.users, processes)), args.seed, sample, mix,
+             start_at, stop_at, args.think_ms, args.import_rows)
+            for p in range(processes)
+        ]
+        print(f"{args.users} user, {processes} proses, {args.duration:g} s, dataset {args.rows:,} baris", flush=True)
+        if processes == 1:
+            per_user = run_process(jobs[0])
+        else:
+            with multiprocessing.get_context('spawn').Pool(processes) as pool:
+                per_user = [results for chunk in pool.map(run_process, jobs) for results in chunk]
+        database.close_connections()
+
+    summary = summarize(per_user, args.duration)
+    print(f"\n{'aksi':<13} {'ok':>8} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'lock err':>9} {'error':>6}")
+    for name, result in summary.items():
+        cells = ' '.join(
+            f"{result[key]:9.1f}" if result[key] is not None else f"{'-':>9}"
+            for key in ('ops_per_second', 'p50_ms', 'p99_ms', 'max_ms')
+        )
+        print(f"{name:<13} {result['ok']:>8} {cells} {result['lock_error_rate']:8.1%} {result['errors']:>6}")
+        if result['error_sample']:
+            print(f"{'':<13} contoh error: {result['error_sample']}")
+
+    report = {
+        'meta': run_meta(
+            seed=args.seed, rows=args.rows, users=args.users, processes=processes, duration=args.duration,
+            think_ms=args.think_ms, import_rows=args.import_rows, mix=mix, dataset_version=DATASET_VERSION,
+        ),
+        'actions': summary,
+    }
+    output = save_report(report, args.output, prefix='load_')
+    print(f"\nHasil disimpan di {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Fixture workbook format PKL (seeded) untuk halaman Import Data.
+
+Layout sama dengan file PKL dinas: baris judul, header di baris 4
+(0-indexed, importer.PKL_HEADER_ROW), kolom importer.PKL_MAPPING, sel gabungan
+"Nomor Permohonan : X (DD Bulan YYYY)" dan frasa masa berlaku seumur hidup.
+Isi baris diambil dari datagen.PerizinanGenerator.
+
+dirty_ratio mengatur porsi baris "kotor" seperti yang sering muncul di file
+asli: prefix "NIB.", penanda kosong ('-', 'nan'), spasi berlebih, variasi
+frasa seumur hidup, tanggal sebagai sel datetime, nama bulan huruf kecil,
+nomor tanpa label "Nomor Permohonan :" dan baris kosong di tengah data.
+
+Contoh:
+    python benchmarks/pkl_fixtures.py pkl_10k.xlsx --rows 10000 --dirty 0.2
+"""
+import argparse
+import random
+from datetime import date, datetime
+
+from openpyxl import Workbook
+
+from datagen import DEFAULT_SEED, END_DATE, PerizinanGenerator
+
+from importer import PKL_HEADER_ROW, PKL_MAPPING
+
+SHEET_NAME = 'PKL'
+
+PKL_TITLE_ROWS = [
+    'DATA PELAYANAN PERIZINAN DAN NON PERIZINAN',
+    'DINAS PENANAMAN MODAL DAN PELAYANAN TERPADU SATU PINTU PROVINSI LAMPUNG',
+    'TAHUN {tahun}',
+]
+
+PKL_HEADERS = ['NO'] + list(PKL_MAPPING)
+
+LIFETIME_PHRASES = [
+    'Selama Pelaku Usaha Menjalankan Kegiatan Usaha',
+    'Seumur Hidup',
+    'Berlaku Selamanya',
+    'Selama Perusahaan Berdiri',
+    'Selama beroperasi',
+]
+
+EMPTY_MARKERS = ['-', 'nan', ' ']
+
+
+class PklRowWriter:
+    """Ubah record perizinan (dict database) jadi baris sel PKL"""
+
+    def __init__(self, generator, dirty_ratio=0.0, seed=DEFAULT_SEED):
+        self.generator = generator
+        self.rng = random.Random(seed)
+        self.dirty_ratio = dirty_ratio
+
+    def tanggal(self, iso, dirty):
+        """Tanggal ISO -> "DD Bulan YYYY"; baris kotor kadang sel datetime / bulan huruf kecil"""
+        if not iso:
+            return None
+        tanggal = date.fromisoformat(iso)
+        if dirty and self.rng.random() < 0.3:
+            return datetime(tanggal.year, tanggal.month, tanggal.day)
+        text = self.generator.tanggal_indonesia(tanggal)
+        return text.lower() if dirty and self.rng.random() < 0.3 else text
+
+    def masa_berlaku(self, value, dirty):
+        if value.startswith('Selama Pelaku Usaha'):
+            return self.rng.choice(LIFETIME_PHRASES) if dirty else LIFETIME_PHRASES[0]
+        return self.tanggal(value, dirty)
+
+    def nomor_tanggal_permohonan(self, record, dirty):
+        tanggal = self.generator.tanggal_indonesia(date.fromisoformat(record['tanggal_permohonan']))
+        if dirty and self.rng.random() < 0.5:
+            return f"{record['nomor_permohonan']} ({tanggal})"
+        return f"Nomor Permohonan : {record['nomor_permohonan']} ({tanggal})"
+
+    def dirty_text(self, value):
+        """Kosong jadi penanda kosong, isi kadang diberi spasi berlebih"""
+        if not value:
+            return self.rng.choice(EMPTY_MARKERS)
+        if self.rng.random() < 0.3:
+            return f"  {value} "
+        return value
+
+    def row(self, no, record):
+        dirty = self.rng.random() < self.dirty_ratio
+        nib = record['nib']
+        if dirty and nib:
+            nib = self.rng.choice([f"NIB. {nib}", f"NIB.{nib}", int(nib)])
+        values = {
+            'nama_pengguna_layanan': record['nama_pengguna_layanan'],
+            'nib': nib,
+            'alamat': record['alamat'],
+            'pemilik_pengurus': record['pemilik_pengurus'],
+            'lokasi_usaha': record['lokasi_usaha'],
+            'luas_lahan_usaha': record['luas_lahan_usaha'],
+            'kbli': record['kbli'],
+            'jenis_usaha': record['jenis_usaha'],
+            'resiko': record['resiko'],
+            'kapasitas': record['kapasitas'],
+            'jenis_permohonan': record['jenis_permohonan'],
+            'nomor_tanggal_permohonan': self.nomor_tanggal_permohonan(record, dirty),
+            'nomor_tanggal_permohonan_rekomendasi': record['nomor_tanggal_permohonan_rekomendasi'],
+            'nomor_tanggal_rekomendasi': record['nomor_tanggal_rekomendasi'],
+            'nomor_izin': record['nomor_izin'],
+            'tanggal_izin': self.tanggal(record['tanggal_izin'], dirty),
+            'masa_berlaku': self.masa_berlaku(record['masa_berlaku'], dirty),
+            'npwp': record['npwp'],
+            'telepon': record['telepon'],
+            'email': record['email'],
+            'keterangan': record['keterangan'],
+        }
+        if dirty:
+            for field in ('alamat', 'lokasi_usaha', 'npwp', 'telepon', 'email', 'keterangan', 'nomor_izin'):
+                values[field] = self.dirty_text(values[field])
+        return [no] + [values[field] or None for field in PKL_MAPPING.values()]
+
+
+def write_pkl_workbook(path, rows, dirty_ratio=0.0, seed=DEFAULT_SEED):
+    """
+    Tulis workbook PKL berisi rows baris data (streaming, openpyxl write-only).
+    Return jumlah baris data (tanpa baris kosong sisipan).
+    """
+    generator = PerizinanGenerator(rows, seed)
+    writer = PklRowWriter(generator, dirty_ratio, seed)
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(SHEET_NAME)
+    periode = f"{generator.start_date.year}-{END_DATE.year}"
+    titles = [title.format(tahun=periode) for title in PKL_TITLE_ROWS]
+    for title in titles:
+        worksheet.append([title])
+    for _ in range(PKL_HEADER_ROW - len(titles)):
+        worksheet.append([])
+    worksheet.append(PKL_HEADERS)
+
+    for no, record in enumerate(generator, start=1):
+        # Baris kosong sisipan (mis. pemisah per bulan) dibuang oleh importer
+        if dirty_ratio and writer.rng.random() < dirty_ratio * 0.02:
+            worksheet.append([])
+        worksheet.append(writer.row(no, record))
+
+    workbook.save(path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixture workbook format PKL")
+    parser.add_argument('path', help="file .xlsx tujuan")
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--dirty', type=float, default=0.1, help="porsi baris kotor (0-1)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    count = write_pkl_workbook(args.path, args.rows, args.dirty, args.seed)
+    print(f"{count:,} baris PKL ditulis ke {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Query budget per halaman: jalankan setiap halaman di pages/ dengan AppTest
+terhadap database sintetis (datagen.py) dan hitung statement SQL, koneksi
+dan baris yang di-fetch per script run.
+
+Setiap skenario punya budget; harness gagal (exit code 1) jika ada yang
+melewati budget, supaya pola N+1 (insert per baris, query suggestion per
+field, delete per id) tidak masuk lagi tanpa ketahuan. Skenario tulis
+(hapus baris terpilih, import Excel) dijalankan terakhir karena mengubah
+dataset. Skenario import butuh streamlit>=1.56 (AppTest.file_uploader).
+
+Contoh:
+    python benchmarks/query_budget.py
+    python benchmarks/query_budget.py --rows 5000 --only Dashboard
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from streamlit.testing.v1 import AppTest
+
+from bench_database import reset_caches
+from datagen import DEFAULT_SEED, ROOT, build_database
+from pkl_fixtures import write_pkl_workbook
+
+import database
+
+DEFAULT_ROWS = 2000
+APPTEST_TIMEOUT = 120
+
+# Ukuran aksi tulis: insert / delete per baris melewati budget statement jauh
+DELETE_ROWS = 50
+IMPORT_ROWS = 200
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class QueryCounter:
+    """Penghitung statement / koneksi / baris untuk satu script run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.statements = 0
+            self.connections = 0
+            self.rows = 0
+
+    def add(self, statements=0, connections=0, rows=0):
+        with self.lock:
+            self.statements += statements
+            self.connections += connections
+            self.rows += rows
+
+    def snapshot(self):
+        with self.lock:
+            return {'statements': self.statements, 'connections': self.connections, 'rows': self.rows}
+
+
+counter = QueryCounter()
+
+
+class CountingCursor(sqlite3.Cursor):
+    """
+    Cursor yang menghitung statement yang dieksekusi aplikasi dan baris hasil
+    fetch / iterasi. executemany dihitung satu (satu batch), sehingga insert
+    per baris terlihat sebagai N statement.
+    """
+
+    def execute(self, *args):
+        counter.add(statements=1)
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        counter.add(statements=1)
+        return super().executemany(*args)
+
+    def executescript(self, *args):
+        counter.add(statements=1)
+        return super().executescript(*args)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            counter.add(rows=1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        counter.add(rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        counter.add(rows=len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        counter.add(rows=1)
+        return row
+
+
+class CountingConnection(sqlite3.Connection):
+    """Koneksi yang dihitung dan selalu memakai CountingCursor"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        counter.add(connections=1)
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+
+_original_connect = sqlite3.connect
+
+
+def install():
+    """Semua sqlite3.connect (termasuk di database.py) memakai CountingConnection"""
+    def connect(*args, **kwargs):
+        kwargs.setdefault('factory', CountingConnection)
+        return _original_connect(*args, **kwargs)
+    sqlite3.connect = connect
+
+
+def uninstall():
+    sqlite3.connect = _original_connect
+
+
+@dataclass
+class Scenario:
+    """
+    Satu pengukuran: halaman dijalankan sekali, lalu langkah setup (masing-
+    masing diikuti satu run), lalu action diterapkan dan script run
+    berikutnya yang diukur. Tanpa action, run pertama dengan cache kosong
+    yang diukur. Budget baris boleh berupa fungsi dari jumlah baris dataset.
+    """
+    name: str
+    page: str
+    max_statements: int
+    max_connections: int
+    max_rows: object
+    action: Optional[Callable] = None
+    setup: list = field(default_factory=list)
+
+
+def _select(label, value):
+    """Action: pilih value di selectbox berlabel label"""
+    def action(at):
+        next(box for box in at.selectbox if box.label == label).set_value(value)
+    return action
+
+
+def _text(key, value):
+    """Action: isi text_input dengan key"""
+    def action(at):
+        at.text_input(key=key).set_value(value)
+    return action
+
+
+def _click(label):
+    """Action: klik tombol berlabel label"""
+    def action(at):
+        next(button for button in at.button if button.label == label).click()
+    return action
+
+
+def _session(**values):
+    """Setup: isi session_state (mis. konfirmasi hapus dengan baris terpilih)"""
+    def step(at):
+        for key, value in values.items():
+            at.session_state[key] = value
+    return step
+
+
+def _upload(path, mime_type):
+    """Setup: upload file path ke file_uploader pertama"""
+    def step(at):
+        with open(path, 'rb') as f:
+            at.file_uploader[0].upload(os.path.basename(path), f.read(), mime_type)
+    return step
+
+
+def _rerun(at):
+    pass
+
+
+def scenarios(sample):
+    """Skenario dan budget per halaman (n = jumlah baris dataset)"""
+    return [
+        # Beranda menjalankan init_database: skema + sinkron seed tabel referensi
+        Scenario('Beranda', 'Home.py', 70, 2, 100),
+        Scenario('Input Data: load', '1_Input_Data_Perizinan.py', 10, 3, 100),
+        # Index suggestion dibangun sekali (cold), semua field dalam satu koneksi
+        Scenario('Input Data: suggestion', '1_Input_Data_Perizinan.py', 5, 2, lambda n: n,
+                 setup=[_click('Konfirmasi Sektor')], action=_text('nama_pengguna', 'maj')),
+        Scenario('Masa Berlaku: load', '2_Data_Perizinan.py', 5, 2, lambda n: n + 50),
+        Scenario('Dashboard: load', '3_Analytics.py', 60, 4, lambda n: n // 2 + 500),
+        # Dashboard belum memakai cache antar rerun: budget rerun = budget load
+        Scenario('Dashboard: rerun', '3_Analytics.py', 60, 4, lambda n: n // 2 + 500, action=_rerun),
+        Scenario('Dashboard: ganti tahun', '3_Analytics.py', 60, 4, lambda n: n // 2 + 500,
+                 action=_select('Tahun', sample['first_year'])),
+        # Tabel Data belum berhalaman: filter dihitung di DataFrame, jadi satu fetch tabel penuh
+        Scenario('Tabel Data: load', '4_Tabel_Data.py', 10, 2, lambda n: n + 50),
+        Scenario('Tabel Data: ganti filter', '4_Tabel_Data.py', 5, 2, lambda n: n + 50,
+                 action=_select('Sektor', sample['sektor'])),
+        Scenario('Tabel Data: cari', '4_Tabel_Data.py', 5, 2, 550,
+                 action=_text('global_search', 'maju jaya')),
+        Scenario('Import Data: load', '5_Import_Data.py', 5, 1, 50),
+        Scenario('SLA: load', '6_SLA_Monitoring.py', 10, 2, lambda n: n + 50),
+        # Satu query anggota per kelompok yang ditampilkan (CLUSTERS_PER_PAGE)
+        Scenario('Duplikat Pelaku: load', '7_Duplikat_Pelaku.py', 30, 4, 500),
+        # Aksi tulis di akhir (mengubah dataset). Hapus DELETE_ROWS baris terpilih
+        # dalam satu transaksi; tabel dimuat dua kali (run klik + st.rerun)
+        Scenario('Tabel Data: hapus', '4_Tabel_Data.py', 15, 4, lambda n: 2 * n + 100,
+                 setup=[_session(confirm_delete=True, delete_ids=sample['delete_ids'])],
+                 action=_click('Ya, Hapus')),
+        # Import IMPORT_ROWS baris workbook PKL: satu batch insert + dedup
+        # inkremental (memuat index duplikat: baris ~ jumlah pelaku usaha)
+        Scenario('Import Data: import Excel', '5_Import_Data.py', 25, 4, lambda n: n + 500,
+                 setup=[_upload(sample['pkl_workbook'], XLSX_MIME)], action=_click('Import Data')),
+    ]
+
+
+def _sample(path):
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT sektor FROM v_perizinan GROUP BY sektor ORDER BY COUNT(*) DESC LIMIT 1")
+        sektor = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(substr(tanggal_permohonan, 1, 4)) FROM perizinan WHERE tanggal_permohonan != ''")
+        first_year = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM perizinan ORDER BY id LIMIT ?", (DELETE_ROWS,))
+        delete_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    return {'sektor': sektor, 'first_year': first_year, 'delete_ids': delete_ids}
+
+
+def run_scenario(scenario):
+    """Return hitungan untuk skenario (script run yang diukur)"""
+    import streamlit as st
+
+    reset_caches()
+    st.cache_data.clear()
+    at = AppTest.from_file(os.path.join(ROOT, 'pages', scenario.page), default_timeout=APPTEST_TIMEOUT)
+
+    if scenario.action is None:
+        counter.reset()
+        at.run()
+    else:
+        at.run()
+        for step in scenario.setup:
+            step(at)
+            at.run()
+        scenario.action(at)
+        counter.reset()
+        at.run()
+
+    if at.exception:
+        raise RuntimeError(f"{scenario.name}: {at.exception[0].message}")
+    return counter.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query budget per halaman (AppTest)")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="ukuran dataset sintetis")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--only', nargs='+', help="hanya skenario yang namanya memuat kata ini")
+    args = parser.parse_args()
+
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'perizinan.db')
+        print(f"Membuat dataset {args.rows:,} baris ...", flush=True)
+        build_database(path, args.rows, args.seed)
+        sample = _sample(path)
+        sample['pkl_workbook'] = os.path.join(tmp, 'pkl_import.xlsx')
+        write_pkl_workbook(sample['pkl_workbook'], IMPORT_ROWS, dirty_ratio=0.1, seed=args.seed + 1)
+
+        install()
+        try:
+            print(f"\n{'skenario':<28} {'statement':>14} {'koneksi':>10} {'baris':>16}")
+            for scenario in scenarios(sample):
+                if args.only and not any(word in scenario.name for word in args.only):
+                    continue
+                counts = run_scenario(scenario)
+                max_rows = scenario.max_rows(args.rows) if callable(scenario.max_rows) else scenario.max_rows
+                budget = {
+                    'statements': scenario.max_statements,
+                    'connections': scenario.max_connections,
+                    'rows': max_rows,
+                }
+                over = [key for key, limit in budget.items() if counts[key] > limit]
+                cells = ' '.join(
+                    f"{counts[key]:>{width}}/{budget[key]:<{width2}}"
+                    for key, width, width2 in [('statements', 6, 7), ('connections', 4, 5), ('rows', 7, 8)]
+                )
+                status = 'LEWAT BUDGET: ' + ', '.join(over) if over else 'ok'
+                print(f"{scenario.name:<28} {cells} {status}")
+                if over:
+                    failed.append(scenario.name)
+        finally:
+            uninstall()
+            database.DB_PATH = 'perizinan.db'
+
+    if failed:
+        print(f"\n{len(failed)} skenario melewati budget: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nSemua skenario dalam budget")
+
+
+if __name__ == '__main__':
+    main()
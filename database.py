@@ -1,88 +1,849 @@
 import sqlite3
 import os
+import threading
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime
+from functools import partial
+
+from suggestions import SuggestionIndex
+from dedup import DuplicateIndex, normalize_nib
+from referensi import REFERENCE_COLUMNS
+from angka import NUMERIC_COLUMNS, numeric_values
+from kbli import KBLI_COLUMNS, KBLI_LEVELS, kbli_levels, kbli_parent
+from wilayah import lokasi_kode, lokasi_nama
+import instrumentation
+import metrics
+from writer import WriteCoordinator
+from readpool import ReadPool
+import snapshot
 
 DB_PATH = "perizinan.db"
 
+
+def get_connection(path=None):
+    """Koneksi ke DB_PATH; terinstrumentasi jika PERIZINAN_QUERY_LOG / profiling aktif (lihat instrumentation.py)"""
+    path = path or DB_PATH
+    if instrumentation.active():
+        return instrumentation.connect(path)
+    return sqlite3.connect(path)
+
+
+# Tunggu lock tulis dari proses lain (ms) sebelum "database is locked"
+WRITE_BUSY_TIMEOUT_MS = 30000
+
+def _writer_connection(path):
+    """Koneksi thread penulis: transaksi diatur writer.py (BEGIN IMMEDIATE / SAVEPOINT)"""
+    conn = get_connection(path)
+    conn.isolation_level = None
+    conn.execute(f"PRAGMA busy_timeout = {WRITE_BUSY_TIMEOUT_MS}")
+    return conn
+
+# Semua mutasi proses ini lewat satu thread penulis (group commit, lihat writer.py)
+_writer = WriteCoordinator(_writer_connection)
+
+def _write(fn, *args):
+    """Jalankan fn(cursor, *args) di transaksi thread penulis untuk DB_PATH, return hasilnya"""
+    return _writer.run(DB_PATH, fn, *args)
+
+def _reader_connection(key):
+    """
+    Koneksi baca-saja, boleh dipakai lintas thread (pool readpool.py).
+    key = (path, salinan snapshot?, terinstrumentasi?); file salinan dibuka
+    immutable (tanpa lock), database utama dengan PRAGMA query_only. Jika
+    file salinan gagal dibuka (mis. sudah dihapus setelah diganti), baca
+    DB_PATH langsung.
+    """
+    path, is_snapshot, instrumented = key
+    target, kwargs = (snapshot.uri(path), {'uri': True}) if is_snapshot else (path, {})
+    try:
+        if instrumented:
+            conn = instrumentation.connect(target, check_same_thread=False, **kwargs)
+            conn.database_path = path
+        else:
+            conn = sqlite3.connect(target, check_same_thread=False, **kwargs)
+        conn.execute("PRAGMA query_only = ON")
+    except sqlite3.Error:
+        if not is_snapshot:
+            raise
+        return _reader_connection((DB_PATH, False, instrumented))
+    return conn
+
+# Query baca independen (agregat Dashboard) dijalankan paralel di pool ini
+_read_pool = ReadPool(_reader_connection)
+
+# Pembacaan berat (Analytics, export, Masa Berlaku / SLA) dari salinan berkala
+# DB_PATH (lihat snapshot.py); input, Tabel Data dan penulisan tetap di DB_PATH
+_snapshot = snapshot.Snapshot(on_retire=lambda path: _read_pool.close(lambda key: key[0] == path))
+
+def _read_key():
+    """Key pool baca untuk pembacaan berat: salinan snapshot jika umurnya dalam batas, selain itu DB_PATH"""
+    path = _snapshot.current(DB_PATH)
+    return (path or DB_PATH, path is not None, instrumentation.active())
+
+def get_read_connection():
+    """Koneksi untuk pembacaan berat yang boleh sedikit basi (lihat snapshot.py)"""
+    key = _read_key()
+    return _reader_connection(key) if key[1] else get_connection()
+
+def get_snapshot_time():
+    """Waktu data salinan snapshot yang sedang dipakai (datetime), None jika membaca DB_PATH langsung"""
+    as_of = _snapshot.as_of(DB_PATH)
+    return datetime.fromtimestamp(as_of) if as_of else None
+
+def _read_all(tasks):
+    """Jalankan {nama: fn(cursor)} paralel di pool baca (salinan snapshot / DB_PATH), return {nama: hasil}"""
+    return _read_pool.run_all(_read_key(), {name: instrumentation.bind(fn) for name, fn in tasks.items()})
+
+def close_connections():
+    """Tutup koneksi thread penulis, pool baca dan salinan snapshot (mis. sebelum file DB_PATH dihapus, dipindah atau diganti)"""
+    _writer.close()
+    _snapshot.close()
+    _read_pool.close()
+
+
+# Field yang boleh dipakai autocomplete (validasi nama kolom untuk keamanan)
+SUGGESTION_FIELDS = [
+    'nama_pengguna_layanan', 'nib', 'alamat', 'pemilik_pengurus',
+    'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha',
+    'kapasitas', 'rencana_investasi', 'jenis_permohonan', 'nomor_permohonan',
+    'nomor_tanggal_permohonan_rekomendasi', 'nomor_tanggal_rekomendasi',
+    'nomor_izin', 'masa_berlaku', 'npwp', 'telepon', 'email', 'keterangan'
+]
+
+# Index dibangun ulang setelah TTL (detik) supaya tulisan dari proses lain
+# (mis. transfer.py import) ikut terbaca
+SUGGESTION_INDEX_TTL = 300
+
+_suggestion_indexes = {}  # field -> (SuggestionIndex, waktu build)
+_suggestion_lock = threading.Lock()
+
+# Versi data, naik setiap ada tulisan / rebuild index; bagian dari key memo suggestion
+_data_version = 0
+_suggestion_memo = OrderedDict()  # (field, term, limit, versi) -> hasil
+_suggestion_memo_lock = threading.Lock()
+SUGGESTION_MEMO_SIZE = 2048
+
+# DuplicateIndex pelaku usaha (index, jumlah baris pelaku_cluster saat disimpan)
+_dedup_cache = None
+_dedup_lock = threading.Lock()
+
+# Kolom teks yang diindex full-text (FTS5 trigram -> pencarian substring)
+SEARCH_FIELDS = [
+    'nama_pengguna_layanan', 'nib', 'alamat', 'pemilik_pengurus', 'lokasi_usaha',
+    'kbli', 'jenis_usaha', 'nomor_permohonan', 'nomor_tanggal_permohonan_rekomendasi',
+    'nomor_tanggal_rekomendasi', 'nomor_izin', 'npwp', 'email', 'telepon', 'keterangan'
+]
+# Trigram tokenizer butuh minimal 3 karakter per kata; kata lebih pendek pakai LIKE
+FTS_MIN_TERM = 3
+# Di atas jumlah hasil ini ranking bm25 dilewati (hasil diurut terbaru)
+SEARCH_RANK_MAX_HITS = 10000
+
+# Grup agregat investasi (bulan = prefix YYYY-MM tanggal_permohonan); ekspresi
+# harus sama persis dengan index supaya index dipakai
+INVESTASI_BULAN_SQL = "substr(tanggal_permohonan, 1, 7)"
+INVESTASI_INDEX_GROUPS = {
+    '': '',
+    '_sektor': 'sektor_id, ',
+    '_resiko': 'resiko_id, ',
+    '_bulan': f'{INVESTASI_BULAN_SQL}, ',
+}
+
+# Layout tabel perizinan: kolom kategori disimpan sebagai kode integer ke tabel
+# referensi (lihat referensi.py); baca lewat view v_perizinan yang memakai nama
+# kolom lama (sektor, kategori_perizinan, resiko, jenis_permohonan, jenis_dokumen)
+PERIZINAN_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sektor_id INTEGER REFERENCES ref_sektor(id),
+    kategori_id INTEGER REFERENCES ref_kategori(id),
+    nama_pengguna_layanan TEXT,
+    nib TEXT,
+    alamat TEXT,
+    pemilik_pengurus TEXT,
+    lokasi_usaha TEXT,
+    luas_lahan_usaha TEXT,
+    kbli TEXT,
+    jenis_usaha TEXT,
+    resiko_id INTEGER REFERENCES ref_resiko(id),
+    kapasitas TEXT,
+    jenis_permohonan_id INTEGER REFERENCES ref_jenis_permohonan(id),
+    nomor_permohonan TEXT,
+    tanggal_permohonan TEXT,
+    nomor_tanggal_permohonan_rekomendasi TEXT,
+    nomor_tanggal_rekomendasi TEXT,
+    nomor_izin TEXT,
+    tanggal_izin TEXT,
+    masa_berlaku TEXT,
+    npwp TEXT,
+    telepon TEXT,
+    email TEXT,
+    keterangan TEXT,
+    jenis_dokumen_id INTEGER REFERENCES ref_jenis_dokumen(id),
+    rencana_investasi TEXT,
+    pelaku_id INTEGER REFERENCES pelaku_usaha(id),
+    rencana_investasi_nilai REAL,
+    rencana_investasi_satuan TEXT,
+    luas_lahan_usaha_nilai REAL,
+    luas_lahan_usaha_satuan TEXT,
+    kapasitas_nilai REAL,
+    kapasitas_satuan TEXT,
+    kbli_kategori TEXT,
+    kbli_golongan_pokok TEXT,
+    kbli_golongan TEXT,
+    kbli_subgolongan TEXT,
+    kbli_kelompok TEXT,
+    lokasi_kode TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
 def init_database():
     """Inisialisasi database dan tabel"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # WAL: pembaca tidak terblokir transaksi thread penulis (tersimpan di file database)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
+    # Tabel referensi (kode integer) + seed dari a.txt dan daftar pilihan form.
+    # seeded = 1 untuk nilai dari daftar seed (pilihan form / editor); nilai
+    # yang masuk lewat import / edit tabel tetap 0
+    for table, _, seed in REFERENCE_COLUMNS.values():
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            nama TEXT NOT NULL UNIQUE,
+            seeded INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN seeded INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        # Daftar seed bisa berubah (mis. a.txt diedit): nilai yang dihapus dari
+        # daftar tidak lagi ditawarkan, kodenya tetap ada untuk data lama
+        cursor.execute(f"UPDATE {table} SET seeded = 0 WHERE seeded = 1")
+        cursor.executemany(f"""
+            INSERT INTO {table} (nama, seeded) VALUES (?, 1)
+            ON CONFLICT(nama) DO UPDATE SET seeded = 1
+        """, ((v,) for v in seed()))
+    
+    # Database lama tanpa kolom angka (angka.py) / level KBLI (kbli.py) perlu diisi dari kolom teks
+    cursor.execute("PRAGMA table_info(perizinan)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
+    backfill_numeric = bool(existing_columns) and NUMERIC_COLUMNS[0] not in existing_columns
+    backfill_kbli = bool(existing_columns) and KBLI_COLUMNS[0] not in existing_columns
+    backfill_lokasi = bool(existing_columns) and 'lokasi_kode' not in existing_columns
+    
     # Tabel data perizinan
+    cursor.execute(PERIZINAN_TABLE_SQL.format(table='perizinan'))
+    
+    # Migrate existing databases: add rencana_investasi if not exists
+    try:
+        cursor.execute("ALTER TABLE perizinan ADD COLUMN rencana_investasi TEXT DEFAULT ''")
+        conn.commit()
+    except Exception:
+        pass  # Column already exists
+    
+    # Tabel entitas pelaku usaha (key: NIB ternormalisasi), direferensikan perizinan.pelaku_id.
+    # Kolom pelaku di perizinan tetap disimpan sebagai data saat permohonan diajukan
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'pelaku_usaha'")
+    pelaku_exists = cursor.fetchone() is not None
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS perizinan (
+    CREATE TABLE IF NOT EXISTS pelaku_usaha (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sektor TEXT NOT NULL,
-        kategori_perizinan TEXT NOT NULL,
+        nib TEXT NOT NULL UNIQUE,
         nama_pengguna_layanan TEXT,
-        nib TEXT,
         alamat TEXT,
         pemilik_pengurus TEXT,
-        lokasi_usaha TEXT,
-        luas_lahan_usaha TEXT,
-        kbli TEXT,
-        jenis_usaha TEXT,
-        resiko TEXT,
-        kapasitas TEXT,
-        jenis_permohonan TEXT,
-        nomor_permohonan TEXT,
-        tanggal_permohonan TEXT,
-        nomor_tanggal_permohonan_rekomendasi TEXT,
-        nomor_tanggal_rekomendasi TEXT,
-        nomor_izin TEXT,
-        tanggal_izin TEXT,
-        masa_berlaku TEXT,
         npwp TEXT,
         telepon TEXT,
         email TEXT,
-        keterangan TEXT,
-        jenis_dokumen TEXT,
-        rencana_investasi TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """)
+    try:
+        cursor.execute("ALTER TABLE perizinan ADD COLUMN pelaku_id INTEGER REFERENCES pelaku_usaha(id)")
+        conn.commit()
+    except Exception:
+        pass  # Column already exists
     
-    # Migrate existing databases: add rencana_investasi if not exists
+    # Database lama: kolom kategori teks -> kode integer
+    _migrate_reference_codes(conn)
+    
+    # Kolom angka hasil parsing rencana_investasi / luas_lahan_usaha / kapasitas
+    for column in NUMERIC_COLUMNS:
+        try:
+            cursor.execute(f"ALTER TABLE perizinan ADD COLUMN {column} {'REAL' if column.endswith('_nilai') else 'TEXT'}")
+            conn.commit()
+        except Exception:
+            pass  # Column already exists
+    
+    # Level hierarki KBLI dari kode pertama di kolom kbli
+    for column in KBLI_COLUMNS:
+        try:
+            cursor.execute(f"ALTER TABLE perizinan ADD COLUMN {column} TEXT")
+            conn.commit()
+        except Exception:
+            pass  # Column already exists
+    
+    # Kode kabupaten / kota lokasi usaha (wilayah.py)
     try:
-        cursor.execute("ALTER TABLE perizinan ADD COLUMN rencana_investasi TEXT DEFAULT ''")
+        cursor.execute("ALTER TABLE perizinan ADD COLUMN lokasi_kode TEXT")
         conn.commit()
     except Exception:
         pass  # Column already exists
     
+    # View baca dengan nama kolom lama; dibuat ulang supaya kolom baru ikut
+    cursor.execute("DROP VIEW IF EXISTS v_perizinan")
+    cursor.execute(f"""
+    CREATE VIEW v_perizinan AS
+    SELECT p.*, {', '.join(f"COALESCE({table}.nama, '') AS {column}" for column, (table, _, _) in REFERENCE_COLUMNS.items())}
+    FROM perizinan p
+    {' '.join(f"LEFT JOIN {table} ON {table}.id = p.{code}" for table, code, _ in REFERENCE_COLUMNS.values())}
+    """)
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perizinan_pelaku ON perizinan(pelaku_id)")
+    
+    # Database lama: isi pelaku_usaha dari data perizinan yang sudah ada
+    if not pelaku_exists:
+        _sync_pelaku_usaha(conn)
+    
+    # Index sektor (rowid ikut di index, jadi ORDER BY sektor_id, id tanpa sort)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perizinan_sektor ON perizinan(sektor_id)")
+    
+    # Isi kolom turunan sebelum index-nya dibuat (bulk build lebih cepat dari update per baris)
+    if backfill_numeric:
+        _sync_numeric_columns(conn)
+    if backfill_kbli:
+        _sync_kbli_columns(conn)
+    if backfill_lokasi:
+        _sync_lokasi_kode(conn)
+    
+    # Agregat investasi keseluruhan / per sektor / resiko / bulan: covering index
+    # dengan nilai terurut per grup untuk median (hanya investasi rupiah)
+    for name, group_sql in INVESTASI_INDEX_GROUPS.items():
+        cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_perizinan_investasi{name}
+        ON perizinan({group_sql}rencana_investasi_nilai, tanggal_permohonan)
+        WHERE rencana_investasi_satuan = 'IDR'
+        """)
+    
+    # Roll-up KBLI: urutan index = urutan hierarki, GROUP BY semua level satu pass
+    cursor.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_perizinan_kbli
+    ON perizinan({', '.join(KBLI_COLUMNS)}, tanggal_permohonan)
+    WHERE kbli_kelompok IS NOT NULL
+    """)
+    
+    # Distribusi geografis: GROUP BY kode kab/kota (covering, tanpa baca teks lokasi)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perizinan_lokasi ON perizinan(lokasi_kode)")
+    
+    # Delta export: index perubahan, tombstone data terhapus, watermark per consumer
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perizinan_updated ON perizinan(updated_at, id)")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS perizinan_deleted (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        perizinan_id INTEGER NOT NULL,
+        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermark (
+        consumer TEXT PRIMARY KEY,
+        updated_at TEXT NOT NULL DEFAULT '',
+        last_id INTEGER NOT NULL DEFAULT 0,
+        deleted_seq INTEGER NOT NULL DEFAULT 0,
+        exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    
+    _init_search_index(cursor)
+    
+    # Hasil deteksi duplikat pelaku usaha: cluster per baris perizinan.
+    # Baris yang dihapus / diubah nama atau NIB-nya dikeluarkan, lalu diproses
+    # ulang pada run deteksi berikutnya
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS pelaku_cluster (
+        perizinan_id INTEGER PRIMARY KEY,
+        cluster_id INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pelaku_cluster ON pelaku_cluster(cluster_id)")
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS pelaku_cluster_ad AFTER DELETE ON perizinan BEGIN
+        DELETE FROM pelaku_cluster WHERE perizinan_id = old.id;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS pelaku_cluster_au AFTER UPDATE OF nama_pengguna_layanan, nib ON perizinan BEGIN
+        DELETE FROM pelaku_cluster WHERE perizinan_id = old.id;
+    END
+    """)
+    
     conn.commit()
     conn.close()
+    
+    # DB_PATH bisa berganti (mis. migrate_db), cache kode referensi dimuat ulang
+    _reset_reference_cache()
 
-def insert_perizinan(data):
-    """Insert data perizinan baru"""
-    conn = sqlite3.connect(DB_PATH)
+_initialized_path = None
+_init_lock = threading.Lock()
+
+def ensure_database():
+    """init_database sekali per proses untuk DB_PATH (untuk dipanggil di setiap rerun halaman)"""
+    global _initialized_path
+    if _initialized_path == DB_PATH:
+        return
+    with _init_lock:
+        if _initialized_path != DB_PATH:
+            init_database()
+            _initialized_path = DB_PATH
+
+
+def _init_search_index(cursor):
+    """Tabel FTS5 (external content) di atas perizinan, disinkronkan oleh trigger"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'perizinan_fts'")
+    exists = cursor.fetchone() is not None
+    
+    cols = ', '.join(SEARCH_FIELDS)
+    new_cols = ', '.join(f'new.{c}' for c in SEARCH_FIELDS)
+    old_cols = ', '.join(f'old.{c}' for c in SEARCH_FIELDS)
+    
+    cursor.execute(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS perizinan_fts USING fts5(
+        {cols}, content='perizinan', content_rowid='id', tokenize='trigram'
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS perizinan_fts_ai AFTER INSERT ON perizinan BEGIN
+        INSERT INTO perizinan_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS perizinan_fts_ad AFTER DELETE ON perizinan BEGIN
+        INSERT INTO perizinan_fts(perizinan_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+    END
+    """)
+    # Hanya update kolom yang diindex yang memicu reindex
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS perizinan_fts_au AFTER UPDATE OF {cols} ON perizinan BEGIN
+        INSERT INTO perizinan_fts(perizinan_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        INSERT INTO perizinan_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+    END
+    """)
+    
+    # Database lama: isi index dari data yang sudah ada
+    if not exists:
+        cursor.execute("INSERT INTO perizinan_fts(perizinan_fts) VALUES ('rebuild')")
+
+def _migrate_reference_codes(conn):
+    """
+    Bangun ulang tabel perizinan layout lama (kolom kategori teks) ke layout kode
+    integer. Id, urutan AUTOINCREMENT dan semua kolom lain dipertahankan; index
+    dan trigger dibuat ulang oleh init_database.
+    """
     cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(perizinan)")
+    old_columns = [row[1] for row in cursor.fetchall()]
+    if 'sektor' not in old_columns:
+        return
     
-    cursor.execute("""
-    INSERT INTO perizinan (
-        sektor, kategori_perizinan, nama_pengguna_layanan, nib, alamat, pemilik_pengurus,
-        lokasi_usaha, luas_lahan_usaha, kbli, jenis_usaha, resiko,
-        kapasitas, jenis_permohonan, nomor_permohonan, tanggal_permohonan,
-        nomor_tanggal_permohonan_rekomendasi,
-        nomor_tanggal_rekomendasi, nomor_izin, tanggal_izin,
-        masa_berlaku, npwp, telepon, email, keterangan, jenis_dokumen, rencana_investasi
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        data['sektor'], data['kategori_perizinan'], data['nama_pengguna_layanan'], data['nib'],
+    # Nilai lama di luar seed ikut masuk referensi (urut kemunculan)
+    for column, (table, _, _) in REFERENCE_COLUMNS.items():
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO {table} (nama)
+            SELECT {column} FROM perizinan WHERE COALESCE({column}, '') != ''
+            GROUP BY {column} ORDER BY MIN(id)
+        """)
+    
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'perizinan'")
+    row = cursor.fetchone()
+    seq = row[0] if row else 0
+    
+    cursor.execute("DROP VIEW IF EXISTS v_perizinan")
+    cursor.execute(PERIZINAN_TABLE_SQL.format(table='perizinan_baru'))
+    cursor.execute("PRAGMA table_info(perizinan_baru)")
+    new_columns = [row[1] for row in cursor.fetchall()]
+    
+    codes = {code: (column, table) for column, (table, code, _) in REFERENCE_COLUMNS.items()}
+    # Kolom yang belum ada di layout lama (mis. kolom angka) dibiarkan kosong
+    new_columns = [name for name in new_columns if name in codes or name in old_columns]
+    select = []
+    for name in new_columns:
+        if name in codes:
+            column, table = codes[name]
+            select.append(f"(SELECT id FROM {table} WHERE nama = perizinan.{column})")
+        else:
+            select.append(f"perizinan.{name}")
+    cursor.execute(f"""
+        INSERT INTO perizinan_baru ({', '.join(new_columns)})
+        SELECT {', '.join(select)} FROM perizinan ORDER BY id
+    """)
+    
+    cursor.execute("DROP TABLE perizinan")
+    cursor.execute("ALTER TABLE perizinan_baru RENAME TO perizinan")
+    # Id yang pernah dipakai (termasuk yang sudah dihapus) tidak boleh dipakai ulang
+    cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'perizinan'", (seq,))
+    conn.commit()
+    cursor.execute("VACUUM")
+
+# Cache kode referensi per proses: {kolom: {nama: id}}
+_reference_cache = None
+# Nilai seed per kolom (pilihan form / editor): {kolom: [nama]}
+_seeded_cache = None
+_reference_lock = threading.Lock()
+
+def _reset_reference_cache():
+    global _reference_cache, _seeded_cache
+    with _reference_lock:
+        _reference_cache = None
+        _seeded_cache = None
+
+def _load_references(cursor, columns):
+    """
+    Baca tabel referensi, return ({kolom: {nama: id}}, {kolom: [nama seed]})
+    (dipanggil di dalam _reference_lock). Cache baru diubah setelah semua
+    kolom terbaca, supaya pembaca tanpa lock tidak melihat cache setengah
+    terisi jika query gagal.
+    """
+    loaded = {}
+    seeded = {}
+    for column in columns:
+        table = REFERENCE_COLUMNS[column][0]
+        cursor.execute(f"SELECT nama, id, seeded FROM {table} ORDER BY id")
+        rows = cursor.fetchall()
+        loaded[column] = {nama: id for nama, id, _ in rows}
+        seeded[column] = [nama for nama, _, flag in rows if flag]
+    return loaded, seeded
+
+def _references():
+    """Kode referensi semua kolom (dan daftar seed), dimuat sekali per proses"""
+    global _reference_cache, _seeded_cache
+    cache = _reference_cache
+    if cache is not None:
+        metrics.cache_lookup('reference', True)
+        return cache
+    with _reference_lock:
+        metrics.cache_lookup('reference', _reference_cache is not None)
+        if _reference_cache is None:
+            conn = get_connection()
+            try:
+                references, _seeded_cache = _load_references(conn.cursor(), REFERENCE_COLUMNS)
+                # Diset terakhir: pembaca tanpa lock yang melihat cache kode juga melihat daftar seed
+                _reference_cache = references
+            finally:
+                conn.close()
+        return _reference_cache
+
+def _reference_code(column, value):
+    """Kode integer untuk filter; nilai yang tidak dikenal dicek ulang ke database"""
+    if not value:
+        return None
+    code = _references()[column].get(value)
+    if code is None:
+        # Bisa ditambahkan proses lain setelah cache dimuat
+        with _reference_lock:
+            conn = get_connection()
+            try:
+                _reference_cache.update(_load_references(conn.cursor(), [column])[0])
+            finally:
+                conn.close()
+            code = _reference_cache[column].get(value)
+    return code
+
+def _resolve_references(records):
+    """
+    Pastikan semua nilai kolom referensi di records punya kode (nilai baru dari
+    import / edit tabel ditambahkan), return dict {kolom: {nama: id}}.
+    Nilai baru ditulis di job penulis sendiri sebelum job tulis data.
+    """
+    cache = _references()
+    missing = {}
+    for data in records:
+        for column in REFERENCE_COLUMNS:
+            value = data.get(column)
+            if value and value not in cache[column]:
+                missing.setdefault(column, set()).add(value)
+    if not missing:
+        return cache
+    
+    with _reference_lock:
+        _reference_cache.update(_write(_insert_references, missing))
+    return _reference_cache
+
+def _insert_references(cursor, missing):
+    """Tambah nilai referensi baru {kolom: nilai} (transaksi penulis), return kode kolom tersebut"""
+    for column, values in missing.items():
+        table = REFERENCE_COLUMNS[column][0]
+        cursor.executemany(f"INSERT OR IGNORE INTO {table} (nama) VALUES (?)", ((v,) for v in sorted(values)))
+    return _load_references(cursor, missing)[0]
+
+def get_reference_options(column, seeded=False):
+    """
+    Daftar nilai referensi (urut kode). Default semua nilai yang pernah
+    tersimpan (filter); seeded=True hanya daftar seed, untuk pilihan input
+    form dan editor tabel supaya nilai hasil import / salah ketik tidak
+    menjadi pilihan tetap.
+    """
+    references = _references()
+    if seeded:
+        return list(_seeded_cache[column])
+    return list(references[column])
+
+# Kolom turunan yang dihitung dari kolom teks saat tulis (lihat _derived_values)
+DERIVED_COLUMNS = NUMERIC_COLUMNS + KBLI_COLUMNS + ['lokasi_kode']
+
+def _derived_values(data):
+    """Nilai DERIVED_COLUMNS untuk satu dict data"""
+    return [*numeric_values(data), *kbli_levels(data['kbli']), lokasi_kode(data['lokasi_usaha'])]
+
+INSERT_SQL = f"""
+INSERT INTO perizinan (
+    sektor_id, kategori_id, nama_pengguna_layanan, nib, alamat, pemilik_pengurus,
+    lokasi_usaha, luas_lahan_usaha, kbli, jenis_usaha, resiko_id,
+    kapasitas, jenis_permohonan_id, nomor_permohonan, tanggal_permohonan,
+    nomor_tanggal_permohonan_rekomendasi,
+    nomor_tanggal_rekomendasi, nomor_izin, tanggal_izin,
+    masa_berlaku, npwp, telepon, email, keterangan, jenis_dokumen_id, rencana_investasi, pelaku_id,
+    {', '.join(DERIVED_COLUMNS)}
+) VALUES ({', '.join('?' * (27 + len(DERIVED_COLUMNS)))})
+"""
+
+def _insert_params(data, codes, pelaku_id=None):
+    """Urutan parameter INSERT_SQL dari dict data (codes dari _resolve_references)"""
+    def code(column):
+        return codes[column].get(data.get(column)) if data.get(column) else None
+    
+    return (
+        code('sektor'), code('kategori_perizinan'), data['nama_pengguna_layanan'], data['nib'],
         data['alamat'], data['pemilik_pengurus'], data['lokasi_usaha'],
         data['luas_lahan_usaha'], data['kbli'], data['jenis_usaha'],
-        data['resiko'], data['kapasitas'], data['jenis_permohonan'],
+        code('resiko'), data['kapasitas'], code('jenis_permohonan'),
         data['nomor_permohonan'], data['tanggal_permohonan'],
         data['nomor_tanggal_permohonan_rekomendasi'],
         data['nomor_tanggal_rekomendasi'],
         data['nomor_izin'], data['tanggal_izin'], data['masa_berlaku'],
-        data['npwp'], data['telepon'], data['email'], data.get('keterangan', ''), data.get('jenis_dokumen', ''), data.get('rencana_investasi', '')
+        data['npwp'], data['telepon'], data['email'], data.get('keterangan', ''), code('jenis_dokumen'), data.get('rencana_investasi', ''),
+        pelaku_id, *_derived_values(data)
+    )
+
+# Field perizinan yang disimpan di entitas pelaku usaha
+PELAKU_FIELDS = ['nama_pengguna_layanan', 'alamat', 'pemilik_pengurus', 'npwp', 'telepon', 'email']
+
+# Upsert per NIB: nilai terbaru yang tidak kosong menggantikan nilai lama
+UPSERT_PELAKU_SQL = f"""
+INSERT INTO pelaku_usaha (nib, {', '.join(PELAKU_FIELDS)}) VALUES (?, {', '.join('?' * len(PELAKU_FIELDS))})
+ON CONFLICT(nib) DO UPDATE SET
+    {', '.join(f"{f} = COALESCE(NULLIF(excluded.{f}, ''), pelaku_usaha.{f})" for f in PELAKU_FIELDS)},
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+def _upsert_pelaku_many(cursor, records):
+    """Upsert pelaku usaha untuk records, return {nib ternormalisasi: pelaku_id}"""
+    latest = {}
+    for data in records:
+        nib = normalize_nib(data.get('nib'))
+        if nib:
+            merged = latest.setdefault(nib, {})
+            for field in PELAKU_FIELDS:
+                if data.get(field):
+                    merged[field] = data[field]
+    if not latest:
+        return {}
+    
+    cursor.executemany(UPSERT_PELAKU_SQL, (
+        [nib] + [data.get(f, '') for f in PELAKU_FIELDS] for nib, data in latest.items()
     ))
     
-    conn.commit()
+    ids = {}
+    nibs = list(latest)
+    # Batas jumlah parameter SQLite
+    for start in range(0, len(nibs), 500):
+        chunk = nibs[start:start + 500]
+        cursor.execute(
+            f"SELECT nib, id FROM pelaku_usaha WHERE nib IN ({', '.join('?' * len(chunk))})", chunk
+        )
+        ids.update(cursor.fetchall())
+    return ids
+
+def _sync_pelaku_usaha(conn, batch_size=5000):
+    """
+    Isi pelaku_usaha dari perizinan dan hubungkan perizinan.pelaku_id
+    (untuk baris yang belum terhubung). Return jumlah baris yang dihubungkan.
+    """
+    read = conn.cursor()
+    write = conn.cursor()
+    read.execute(f"""
+        SELECT id, nib, {', '.join(PELAKU_FIELDS)} FROM perizinan
+        WHERE pelaku_id IS NULL AND COALESCE(nib, '') != ''
+        ORDER BY id
+    """)
+    columns = ['id', 'nib'] + PELAKU_FIELDS
+    linked = 0
+    
+    # Urut id: nilai terbaru yang tidak kosong menang, sama seperti jalur insert
+    while True:
+        records = [dict(zip(columns, row)) for row in read.fetchmany(batch_size)]
+        if not records:
+            break
+        pelaku_ids = _upsert_pelaku_many(write, records)
+        links = []
+        for data in records:
+            pelaku_id = pelaku_ids.get(normalize_nib(data['nib']))
+            if pelaku_id is not None:
+                links.append((pelaku_id, data['id']))
+        write.executemany("UPDATE perizinan SET pelaku_id = ? WHERE id = ?", links)
+        linked += len(links)
+    
+    return linked
+
+def sync_pelaku_usaha():
+    """Hubungkan perizinan yang belum punya pelaku_id (mis. data dari proses lain)"""
+    return _write(lambda cursor: _sync_pelaku_usaha(cursor.connection))
+
+def _sync_derived_columns(conn, source_columns, columns, compute, batch_size=5000):
+    """
+    Hitung ulang kolom turunan (columns) dari kolom teks (source_columns) untuk
+    semua baris; compute(dict sumber) -> list nilai. Return jumlah baris.
+    """
+    read = conn.cursor()
+    write = conn.cursor()
+    read.execute(f"SELECT id, {', '.join(source_columns)} FROM perizinan ORDER BY id")
+    update_sql = f"UPDATE perizinan SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?"
+    updated = 0
+    
+    while True:
+        rows = read.fetchmany(batch_size)
+        if not rows:
+            break
+        write.executemany(update_sql, (
+            [*compute(dict(zip(source_columns, row[1:]))), row[0]] for row in rows
+        ))
+        updated += len(rows)
+    
+    return updated
+
+def _sync_numeric_columns(conn):
+    """Isi kolom angka (angka.py) dari kolom teks"""
+    return _sync_derived_columns(
+        conn, ['rencana_investasi', 'luas_lahan_usaha', 'kapasitas'], NUMERIC_COLUMNS, numeric_values
+    )
+
+def _sync_kbli_columns(conn):
+    """Isi level KBLI (kbli.py) dari kolom kbli"""
+    return _sync_derived_columns(conn, ['kbli'], KBLI_COLUMNS, lambda data: kbli_levels(data['kbli']))
+
+def _sync_lokasi_kode(conn):
+    """Isi kode kabupaten / kota (wilayah.py) dari kolom lokasi_usaha"""
+    return _sync_derived_columns(conn, ['lokasi_usaha'], ['lokasi_kode'], lambda data: [lokasi_kode(data['lokasi_usaha'])])
+
+def sync_numeric_columns():
+    """Parse ulang kolom angka seluruh tabel (mis. setelah aturan parsing di angka.py berubah)"""
+    return _write(lambda cursor: _sync_numeric_columns(cursor.connection))
+
+def sync_kbli_columns():
+    """Hitung ulang level KBLI seluruh tabel (mis. setelah aturan di kbli.py berubah)"""
+    return _write(lambda cursor: _sync_kbli_columns(cursor.connection))
+
+def sync_lokasi_kode():
+    """Hitung ulang kode kabupaten / kota seluruh tabel (mis. setelah wilayah.csv diperbarui)"""
+    return _write(lambda cursor: _sync_lokasi_kode(cursor.connection))
+
+def get_pelaku_by_nib(nib):
+    """Ambil data pelaku usaha berdasarkan NIB (dict), None jika belum terdaftar"""
+    nib = normalize_nib(nib)
+    if not nib:
+        return None
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"SELECT id, nib, {', '.join(PELAKU_FIELDS)} FROM pelaku_usaha WHERE nib = ?", (nib,))
+    row = cursor.fetchone()
+    
     conn.close()
+    if row is None:
+        return None
+    return dict(zip(['id', 'nib'] + PELAKU_FIELDS, row))
+
+def _insert_records(cursor, records, codes):
+    """Insert records (kode referensi sudah ada di codes) di transaksi penulis, return jumlah baris"""
+    pelaku_ids = _upsert_pelaku_many(cursor, records)
+    cursor.executemany(INSERT_SQL, (
+        _insert_params(data, codes, pelaku_ids.get(normalize_nib(data.get('nib')))) for data in records
+    ))
+    return cursor.rowcount
 
+def insert_perizinan(data):
+    """Insert data perizinan baru"""
+    start = time.perf_counter()
+    codes = _resolve_references([data])
+    _write(_insert_records, [data], codes)
+    
+    _update_suggestion_indexes(new_data=data)
+    metrics.record_write('insert', 1, time.perf_counter() - start)
+
+def insert_perizinan_many(records):
+    """Insert banyak data perizinan dalam satu transaksi, return jumlah baris"""
+    start = time.perf_counter()
+    records = list(records)
+    codes = _resolve_references(records)
+    count = _write(_insert_records, records, codes)
+    
+    _add_suggestion_values(records)
+    
+    metrics.record_write('insert_many', count, time.perf_counter() - start)
+    return count
+
+def import_perizinan(records):
+    """
+    Insert banyak data perizinan dalam satu transaksi; baris yang gagal
+    dilewati. Return (jumlah berhasil, [(index baris, pesan error)]).
+    """
+    start = time.perf_counter()
+    records = list(records)
+    codes = _resolve_references(records)
+    inserted, errors = _write(_insert_records_skipping, records, codes)
+    
+    _add_suggestion_values(inserted)
+    
+    metrics.record_write('insert_many', len(inserted), time.perf_counter() - start)
+    return len(inserted), errors
+
+def _insert_records_skipping(cursor, records, codes):
+    """
+    Insert records sebagai satu batch di SAVEPOINT; jika batch gagal, ulangi
+    per baris (SAVEPOINT per baris) supaya baris yang salah saja yang dilewati.
+    Return (record yang masuk, [(index, pesan error)]).
+    """
+    cursor.execute("SAVEPOINT import_batch")
+    try:
+        _insert_records(cursor, records, codes)
+    except Exception:
+        cursor.execute("ROLLBACK TO import_batch")
+    else:
+        cursor.execute("RELEASE import_batch")
+        return records, []
+    cursor.execute("RELEASE import_batch")
+    
+    inserted = []
+    errors = []
+    for i, data in enumerate(records):
+        cursor.execute("SAVEPOINT import_row")
+        try:
+            _insert_records(cursor, [data], codes)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO import_row")
+            errors.append((i, str(e)))
+        else:
+            inserted.append(data)
+        cursor.execute("RELEASE import_row")
+    return inserted, errors
+
+# Kolom baca (lewat view v_perizinan, nama kolom referensi sama seperti dulu)
 SELECT_COLS = """
     id, sektor, kategori_perizinan, nama_pengguna_layanan, nib, alamat,
     pemilik_pengurus, lokasi_usaha, luas_lahan_usaha, kbli, jenis_usaha,
@@ -92,27 +853,172 @@ SELECT_COLS = """
     telepon, email, keterangan, jenis_dokumen, created_at, updated_at
 """
 
-def get_all_perizinan(sektor=None):
-    """Ambil semua data perizinan, optional filter by sektor"""
-    conn = sqlite3.connect(DB_PATH)
+def get_all_perizinan(sektor=None, from_snapshot=False):
+    """Ambil semua data perizinan, optional filter by sektor; from_snapshot=True boleh dari salinan snapshot (laporan)"""
+    conn = get_read_connection() if from_snapshot else get_connection()
     cursor = conn.cursor()
     
     if sektor:
-        cursor.execute(f"SELECT {SELECT_COLS} FROM perizinan WHERE sektor = ? ORDER BY created_at DESC", (sektor,))
+        cursor.execute(
+            f"SELECT {SELECT_COLS} FROM v_perizinan WHERE sektor_id = ? ORDER BY created_at DESC, id DESC",
+            (_reference_code('sektor', sektor),)
+        )
     else:
-        cursor.execute(f"SELECT {SELECT_COLS} FROM perizinan ORDER BY created_at DESC")
+        cursor.execute(f"SELECT {SELECT_COLS} FROM v_perizinan ORDER BY created_at DESC, id DESC")
     
     rows = cursor.fetchall()
     conn.close()
     
     return rows
 
+def _like_pattern(term):
+    """Pola LIKE 'contains' dengan escape untuk % dan _"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+ITER_ORDERS = {
+    'id': "ORDER BY id",
+    'newest': "ORDER BY created_at DESC, id DESC",  # Urutan sama dengan get_all_perizinan (Tabel Data)
+    'sektor': "ORDER BY sektor_id, id",    # Untuk export terpartisi per sektor (urut kode)
+}
+
+def _search_clause(query):
+    """
+    Kondisi WHERE untuk pencarian global: kata >= 3 karakter lewat FTS5 MATCH
+    (substring, via trigram), kata lebih pendek lewat LIKE di semua kolom cari.
+    Return (match_expr atau None, list klausa LIKE, params LIKE).
+    """
+    terms = (query or '').split()
+    long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM]
+    short_terms = [t for t in terms if len(t) < FTS_MIN_TERM]
+    
+    # Setiap kata jadi phrase ber-quote supaya karakter khusus FTS5 tidak diparse
+    match_expr = ' '.join('"' + t.replace('"', '""') + '"' for t in long_terms) or None
+    
+    clauses = []
+    params = []
+    for term in short_terms:
+        pattern = _like_pattern(term)
+        clauses.append('(' + ' OR '.join(f"{c} LIKE ? ESCAPE '\\'" for c in SEARCH_FIELDS) + ')')
+        params.extend([pattern] * len(SEARCH_FIELDS))
+    return match_expr, clauses, params
+
+def _filter_clauses(sektor=None, kategori=None, nama=None, nib=None):
+    """Klausa WHERE + params untuk filter tabel / export"""
+    where_clauses = []
+    params = []
+    
+    # Filter pada kode integer; nilai yang tidak dikenal (kode None) tidak cocok dengan baris manapun
+    if sektor:
+        where_clauses.append("sektor_id = ?")
+        params.append(_reference_code('sektor', sektor))
+    if kategori:
+        where_clauses.append("kategori_id = ?")
+        params.append(_reference_code('kategori_perizinan', kategori))
+    if nama:
+        where_clauses.append("nama_pengguna_layanan LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(nama))
+    if nib:
+        where_clauses.append("nib LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(nib))
+    
+    return where_clauses, params
+
+def iter_perizinan(sektor=None, kategori=None, nama=None, nib=None, search=None, order='id', batch_size=1000, from_snapshot=False):
+    """
+    Stream data perizinan per batch dari cursor (memori konstan) dengan filter opsional;
+    from_snapshot=True boleh dari salinan snapshot (export)
+    """
+    where_clauses, params = _filter_clauses(sektor, kategori, nama, nib)
+    
+    if search:
+        match_expr, like_clauses, like_params = _search_clause(search)
+        if match_expr:
+            where_clauses.append("id IN (SELECT rowid FROM perizinan_fts WHERE perizinan_fts MATCH ?)")
+            params.append(match_expr)
+        where_clauses.extend(like_clauses)
+        params.extend(like_params)
+    
+    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+    order_sql = ITER_ORDERS[order]
+    
+    conn = get_read_connection() if from_snapshot else get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(f"SELECT {SELECT_COLS} FROM v_perizinan {where_sql} {order_sql}", params)
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def search_perizinan(query, filters=None, limit=100, offset=0):
+    """
+    Pencarian global di semua kolom teks, diurutkan relevansi (bm25).
+    filters: dict opsional dengan key sektor / kategori / nama / nib.
+    Return (rows, total) dengan rows berkolom SELECT_COLS.
+    """
+    match_expr, like_clauses, like_params = _search_clause(query)
+    where_clauses, params = _filter_clauses(**(filters or {}))
+    where_clauses.extend(like_clauses)
+    params.extend(like_params)
+    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if not match_expr:
+            # Semua kata < 3 karakter: tidak ada skor relevansi, urut terbaru
+            cursor.execute(f"SELECT COUNT(*) FROM perizinan {where_sql}", params)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT {SELECT_COLS} FROM v_perizinan {where_sql} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )
+            return cursor.fetchall(), total
+        
+        cursor.execute("SELECT COUNT(*) FROM perizinan_fts WHERE perizinan_fts MATCH ?", (match_expr,))
+        fts_hits = cursor.fetchone()[0]
+        total = fts_hits
+        if where_clauses and fts_hits:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT rowid AS fts_id FROM perizinan_fts WHERE perizinan_fts MATCH ?) AS m "
+                f"CROSS JOIN perizinan ON perizinan.id = m.fts_id {where_sql}",
+                [match_expr] + params
+            )
+            total = cursor.fetchone()[0]
+        
+        # bm25 dihitung untuk setiap hasil FTS (sebelum filter); untuk kata yang
+        # sangat umum ranking dilewati dan hasil diurut terbaru
+        if fts_hits > SEARCH_RANK_MAX_HITS:
+            fts_sql = "SELECT rowid AS fts_id FROM perizinan_fts WHERE perizinan_fts MATCH ? ORDER BY rowid DESC"
+            order_sql = "ORDER BY m.fts_id DESC"
+        else:
+            fts_sql = "SELECT rowid AS fts_id, rank FROM perizinan_fts WHERE perizinan_fts MATCH ?"
+            order_sql = "ORDER BY m.rank"
+        
+        # CROSS JOIN: hasil FTS jadi loop luar, filter dicek per hasil.
+        # Subquery hanya expose fts_id / rank, jadi kolom SELECT_COLS tetap milik v_perizinan
+        cursor.execute(
+            f"SELECT {SELECT_COLS} FROM ({fts_sql}) AS m "
+            f"CROSS JOIN v_perizinan ON v_perizinan.id = m.fts_id {where_sql} {order_sql} LIMIT ? OFFSET ?",
+            [match_expr] + params + [limit, offset]
+        )
+        return cursor.fetchall(), total
+    finally:
+        conn.close()
+
 def get_perizinan_by_id(id):
     """Ambil data perizinan by ID"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute(f"SELECT {SELECT_COLS} FROM perizinan WHERE id = ?", (id,))
+    cursor.execute(f"SELECT {SELECT_COLS} FROM v_perizinan WHERE id = ?", (id,))
     row = cursor.fetchone()
     
     conn.close()
@@ -120,82 +1026,463 @@ def get_perizinan_by_id(id):
 
 def update_perizinan(id, data):
     """Update data perizinan"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    codes = _resolve_references([data])
+    old_values = _write(_update_record, id, data, codes)
     
-    cursor.execute("""
+    if old_values is not None:
+        _update_suggestion_indexes(old_data=old_values, new_data=data)
+
+def _update_record(cursor, id, data, codes):
+    """UPDATE satu baris di transaksi penulis, return nilai field suggestion sebelumnya"""
+    old_values = _fetch_suggestion_values(cursor, id)
+    pelaku_ids = _upsert_pelaku_many(cursor, [data])
+    
+    cursor.execute(f"""
     UPDATE perizinan SET
-        sektor = ?, kategori_perizinan = ?, nama_pengguna_layanan = ?, nib = ?, alamat = ?,
+        sektor_id = ?, kategori_id = ?, nama_pengguna_layanan = ?, nib = ?, alamat = ?,
         pemilik_pengurus = ?, lokasi_usaha = ?, luas_lahan_usaha = ?,
-        kbli = ?, jenis_usaha = ?, resiko = ?, kapasitas = ?,
-        jenis_permohonan = ?, nomor_permohonan = ?, tanggal_permohonan = ?,
+        kbli = ?, jenis_usaha = ?, resiko_id = ?, kapasitas = ?,
+        jenis_permohonan_id = ?, nomor_permohonan = ?, tanggal_permohonan = ?,
         nomor_tanggal_permohonan_rekomendasi = ?,
         nomor_tanggal_rekomendasi = ?, nomor_izin = ?,
         tanggal_izin = ?, masa_berlaku = ?, npwp = ?, telepon = ?, email = ?,
-        keterangan = ?, jenis_dokumen = ?, rencana_investasi = ?, updated_at = CURRENT_TIMESTAMP
+        keterangan = ?, jenis_dokumen_id = ?, rencana_investasi = ?, pelaku_id = ?,
+        {', '.join(f"{column} = ?" for column in DERIVED_COLUMNS)},
+        updated_at = CURRENT_TIMESTAMP
     WHERE id = ?
-    """, (
-        data['sektor'], data['kategori_perizinan'], data['nama_pengguna_layanan'], data['nib'],
-        data['alamat'], data['pemilik_pengurus'], data['lokasi_usaha'],
-        data['luas_lahan_usaha'], data['kbli'], data['jenis_usaha'],
-        data['resiko'], data['kapasitas'], data['jenis_permohonan'],
-        data['nomor_permohonan'], data['tanggal_permohonan'],
-        data['nomor_tanggal_permohonan_rekomendasi'],
-        data['nomor_tanggal_rekomendasi'],
-        data['nomor_izin'], data['tanggal_izin'], data['masa_berlaku'],
-        data['npwp'], data['telepon'], data['email'], data.get('keterangan', ''), data.get('jenis_dokumen', ''), data.get('rencana_investasi', ''), id
-    ))
-    
-    conn.commit()
-    conn.close()
+    """, _insert_params(data, codes, pelaku_ids.get(normalize_nib(data.get('nib')))) + (id,))
+    return old_values
 
 def delete_perizinan(id):
     """Hapus data perizinan"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    old_values = _write(_delete_record, id)
+    
+    if old_values is not None:
+        _update_suggestion_indexes(old_data=old_values)
+
+def _delete_record(cursor, id):
+    """DELETE satu baris + tombstone di transaksi penulis, return nilai field suggestion sebelumnya"""
+    old_values = _fetch_suggestion_values(cursor, id)
     
     cursor.execute("DELETE FROM perizinan WHERE id = ?", (id,))
+    # Catat tombstone untuk delta export
+    if cursor.rowcount:
+        cursor.execute("INSERT INTO perizinan_deleted (perizinan_id) VALUES (?)", (id,))
+    return old_values
+
+def delete_perizinan_many(ids):
+    """
+    Hapus banyak data perizinan dalam satu transaksi; id yang gagal dilewati.
+    Return (jumlah berhasil, [(id, pesan error)]).
+    """
+    ids = [int(id) for id in ids]
+    old_values, errors = _write(_delete_records_skipping, ids)
     
-    conn.commit()
-    conn.close()
+    _remove_suggestion_values(old_values)
+    return len(ids) - len(errors), errors
 
-def search_field_suggestions(field_name, search_term, limit=3):
-    """Search suggestions untuk field tertentu"""
-    conn = sqlite3.connect(DB_PATH)
+def _delete_records_skipping(cursor, ids):
+    """
+    DELETE semua id sebagai satu batch di SAVEPOINT; jika batch gagal, ulangi
+    per id (SAVEPOINT per id) supaya id yang salah saja yang dilewati.
+    Return ([nilai field suggestion baris terhapus], [(id, pesan error)]).
+    """
+    cursor.execute("SAVEPOINT delete_batch")
+    try:
+        old_values = _delete_records(cursor, ids)
+    except Exception:
+        cursor.execute("ROLLBACK TO delete_batch")
+    else:
+        cursor.execute("RELEASE delete_batch")
+        return old_values, []
+    cursor.execute("RELEASE delete_batch")
+    
+    old_values = []
+    errors = []
+    for id in ids:
+        cursor.execute("SAVEPOINT delete_row")
+        try:
+            values = _delete_record(cursor, id)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO delete_row")
+            errors.append((id, str(e)))
+        else:
+            if values is not None:
+                old_values.append(values)
+        cursor.execute("RELEASE delete_row")
+    return old_values, errors
+
+def _delete_records(cursor, ids):
+    """DELETE banyak baris + tombstone di transaksi penulis, return nilai field suggestion sebelumnya"""
+    fields = list(_suggestion_indexes)
+    existing = []
+    old_values = []
+    # Batas jumlah parameter SQLite
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"SELECT id FROM perizinan WHERE id IN ({placeholders})", chunk)
+        existing.extend(row[0] for row in cursor.fetchall())
+        if fields:
+            cursor.execute(
+                f"SELECT {', '.join(fields)} FROM v_perizinan WHERE id IN ({placeholders})", chunk
+            )
+            old_values.extend(dict(zip(fields, row)) for row in cursor.fetchall())
+    
+    cursor.executemany("DELETE FROM perizinan WHERE id = ?", ((id,) for id in existing))
+    # Catat tombstone untuk delta export (hanya id yang benar-benar terhapus)
+    cursor.executemany(
+        "INSERT INTO perizinan_deleted (perizinan_id) VALUES (?)", ((id,) for id in existing)
+    )
+    return old_values
+
+def get_export_watermark(consumer):
+    """Ambil watermark export terakhir untuk consumer (default: belum pernah export)"""
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # Validasi field name untuk keamanan
-    valid_fields = [
-        'nama_pengguna_layanan', 'nib', 'alamat', 'pemilik_pengurus',
-        'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha',
-        'kapasitas', 'jenis_permohonan', 'nomor_permohonan',
-        'nomor_permohonan_rekomendasi', 'nomor_tanggal_rekomendasi',
-        'nomor_izin', 'masa_berlaku', 'npwp', 'telepon', 'email', 'keterangan'
-    ]
+    cursor.execute(
+        "SELECT updated_at, last_id, deleted_seq FROM export_watermark WHERE consumer = ?",
+        (consumer,)
+    )
+    row = cursor.fetchone()
+    conn.close()
     
-    if field_name not in valid_fields:
+    if not row:
+        return {'updated_at': '', 'last_id': 0, 'deleted_seq': 0}
+    return {'updated_at': row[0], 'last_id': row[1], 'deleted_seq': row[2]}
+
+def save_export_watermark(consumer, watermark):
+    """Simpan watermark setelah file delta berhasil ditulis"""
+    _write(_save_export_watermark, consumer, watermark)
+
+def _save_export_watermark(cursor, consumer, watermark):
+    cursor.execute("""
+    INSERT INTO export_watermark (consumer, updated_at, last_id, deleted_seq, exported_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(consumer) DO UPDATE SET
+        updated_at = excluded.updated_at, last_id = excluded.last_id,
+        deleted_seq = excluded.deleted_seq, exported_at = excluded.exported_at
+    """, (consumer, watermark['updated_at'], watermark['last_id'], watermark['deleted_seq']))
+
+def iter_perizinan_changes(watermark, batch_size=1000):
+    """
+    Stream data yang di-insert/update sejak watermark, urut (updated_at, id).
+    Baris yang berubah pada detik yang sedang berjalan ditunda ke export berikutnya,
+    karena updated_at hanya berpresisi detik.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cutoff = cursor.execute("SELECT CURRENT_TIMESTAMP").fetchone()[0]
+        cursor.execute(f"""
+        SELECT {SELECT_COLS} FROM v_perizinan
+        WHERE (updated_at > ? OR (updated_at = ? AND id > ?)) AND updated_at < ?
+        ORDER BY updated_at, id
+        """, (watermark['updated_at'], watermark['updated_at'], watermark['last_id'], cutoff))
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
         conn.close()
-        return []
+
+def get_deleted_since(deleted_seq):
+    """Tombstone sejak seq tertentu, return list (seq, perizinan_id)"""
+    conn = get_connection()
+    cursor = conn.cursor()
     
-    # Query untuk mendapatkan distinct values yang mengandung search term
-    query = f"""
-    SELECT DISTINCT {field_name}
-    FROM perizinan
-    WHERE {field_name} LIKE ? AND {field_name} IS NOT NULL AND {field_name} != ''
-    ORDER BY {field_name}
-    LIMIT ?
+    cursor.execute(
+        "SELECT seq, perizinan_id FROM perizinan_deleted WHERE seq > ? ORDER BY seq",
+        (deleted_seq,)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def _bump_data_version():
+    """Naikkan versi data memo suggestion (setelah index berubah; dipanggil dari banyak sesi)"""
+    global _data_version
+    with _suggestion_memo_lock:
+        _data_version += 1
+
+def _get_suggestion_index(field_name, conn=None):
+    """Index autocomplete per field, dibangun lazy saat pertama dipakai"""
+    entry = _suggestion_indexes.get(field_name)
+    if entry and time.monotonic() - entry[1] < SUGGESTION_INDEX_TTL:
+        metrics.cache_lookup('suggestion_index', True)
+        return entry[0]
+    
+    with _suggestion_lock:
+        entry = _suggestion_indexes.get(field_name)
+        hit = bool(entry and time.monotonic() - entry[1] < SUGGESTION_INDEX_TTL)
+        metrics.cache_lookup('suggestion_index', hit)
+        if hit:
+            return entry[0]
+        
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+        SELECT {field_name}, COUNT(*)
+        FROM v_perizinan
+        WHERE {field_name} IS NOT NULL AND {field_name} != ''
+        GROUP BY {field_name}
+        """)
+        index = SuggestionIndex((str(value), count) for value, count in cursor.fetchall())
+        if own_conn:
+            conn.close()
+        
+        _suggestion_indexes[field_name] = (index, time.monotonic())
+        # Rebuild bisa membawa data dari proses lain, memo lama tidak berlaku
+        _bump_data_version()
+        return index
+
+def _fetch_suggestion_values(cursor, id):
+    """Nilai field autocomplete (yang index-nya sudah dibangun) untuk satu baris"""
+    fields = list(_suggestion_indexes)
+    if not fields:
+        return None
+    cursor.execute(f"SELECT {', '.join(fields)} FROM v_perizinan WHERE id = ?", (id,))
+    row = cursor.fetchone()
+    return dict(zip(fields, row)) if row else None
+
+def _update_suggestion_indexes(old_data=None, new_data=None):
+    """Update index autocomplete in-place setelah insert/update/delete"""
+    for field, (index, _) in list(_suggestion_indexes.items()):
+        old_value = old_data.get(field) if old_data else None
+        new_value = new_data.get(field) if new_data else None
+        if old_value == new_value:
+            continue
+        if old_value:
+            index.remove(str(old_value))
+        if new_value:
+            index.add(str(new_value))
+    # Setelah index berubah: pencarian yang membaca versi lama tidak bisa
+    # memo hasil sebelum perubahan di bawah versi baru
+    _bump_data_version()
+
+def _add_suggestion_values(records):
+    """Tambah nilai banyak record baru ke index autocomplete, satu update per field"""
+    for field, (index, _) in list(_suggestion_indexes.items()):
+        counts = Counter(str(data[field]) for data in records if data.get(field))
+        index.add_many(counts)
+    _bump_data_version()
+
+def _remove_suggestion_values(records):
+    """Kurangi nilai banyak record terhapus dari index autocomplete"""
+    for field, (index, _) in list(_suggestion_indexes.items()):
+        counts = Counter(str(data[field]) for data in records if data.get(field))
+        for value, count in counts.items():
+            index.remove(value, count)
+    _bump_data_version()
+
+def search_field_suggestions(field_name, search_term, limit=3):
+    """Search suggestions untuk field tertentu (prefix dulu, lalu substring, urut frekuensi)"""
+    return search_suggestions_batch({field_name: search_term}, limit).get(field_name, [])
+
+def search_suggestions_batch(terms, limit=3):
+    """
+    Suggestions untuk banyak field sekaligus: {field: term} -> {field: [saran]}.
+    Index yang belum ada dibangun dengan satu koneksi; hasil dimemo per
+    (field, term, limit, versi data) sehingga field yang tidak berubah gratis.
     """
+    results = {}
+    missing = []
+    # Satu versi untuk lookup dan penyimpanan memo: hasil yang dihitung saat
+    # sesi lain menulis tidak tersimpan di bawah versi sesudah penulisan
+    version = _data_version
     
-    cursor.execute(query, (f'%{search_term}%', limit))
-    results = [row[0] for row in cursor.fetchall()]
+    for field_name, term in terms.items():
+        # Validasi field name untuk keamanan
+        if field_name not in SUGGESTION_FIELDS or not term:
+            results[field_name] = []
+            continue
+        memo_key = (field_name, term, limit, version)
+        with _suggestion_memo_lock:
+            cached = _suggestion_memo.get(memo_key)
+            if cached is not None:
+                _suggestion_memo.move_to_end(memo_key)
+        metrics.cache_lookup('suggestion_memo', cached is not None)
+        if cached is not None:
+            results[field_name] = cached
+        else:
+            missing.append(field_name)
+    
+    if not missing:
+        return results
+    
+    conn = None
+    if any(field_name not in _suggestion_indexes for field_name in missing):
+        conn = get_connection()
+    try:
+        for field_name in missing:
+            term = terms[field_name]
+            index = _get_suggestion_index(field_name, conn)
+            found = index.search(term, limit)
+            results[field_name] = found
+            with _suggestion_memo_lock:
+                _suggestion_memo[(field_name, term, limit, version)] = found
+    finally:
+        if conn is not None:
+            conn.close()
+    
+    with _suggestion_memo_lock:
+        while len(_suggestion_memo) > SUGGESTION_MEMO_SIZE:
+            _suggestion_memo.popitem(last=False)
     
-    conn.close()
     return results
 
 
+def _load_dedup_index(cursor):
+    """Bangun DuplicateIndex dari cluster tersimpan (tanpa pencarian kandidat ulang)"""
+    cursor.execute("""
+        SELECT p.id, p.nama_pengguna_layanan, p.nib, pc.cluster_id
+        FROM perizinan p JOIN pelaku_cluster pc ON pc.perizinan_id = p.id
+        ORDER BY p.id
+    """)
+    rows = cursor.fetchall()
+    index = DuplicateIndex.for_names(row[1] for row in rows)
+    for id, nama, nib, cluster_id in rows:
+        index.add(id, nama, nib, cluster_id=cluster_id)
+    return index
+
+def run_pelaku_dedup(rebuild=False):
+    """
+    Deteksi duplikat pelaku usaha untuk baris yang belum punya cluster
+    (mis. hasil import terbaru). rebuild=True menghitung ulang seluruh tabel.
+    Return jumlah baris yang diproses.
+    """
+    global _dedup_cache
+    
+    start = time.perf_counter()
+    with _dedup_lock:
+        if rebuild:
+            _dedup_cache = None
+        try:
+            index, clustered, processed = _write(_cluster_new_rows, rebuild)
+        except BaseException:
+            # Index cache bisa sudah berubah di job yang gagal
+            _dedup_cache = None
+            raise
+        _dedup_cache = (index, clustered)
+    
+    metrics.record_write('dedup', processed, time.perf_counter() - start)
+    return processed
+
+def _cluster_new_rows(cursor, rebuild):
+    """
+    Bagian run_pelaku_dedup di transaksi penulis (dipanggil dengan _dedup_lock).
+    Return (index, jumlah baris pelaku_cluster, jumlah baris baru).
+    """
+    if rebuild:
+        cursor.execute("DELETE FROM pelaku_cluster")
+    
+    # Index di-cache selama pelaku_cluster tidak berubah di luar run ini
+    # (hapus / ubah nama / NIB mengeluarkan baris lewat trigger)
+    cursor.execute("SELECT COUNT(*) FROM pelaku_cluster")
+    clustered = cursor.fetchone()[0]
+    hit = _dedup_cache is not None and _dedup_cache[1] == clustered
+    metrics.cache_lookup('dedup_index', hit)
+    if hit:
+        index = _dedup_cache[0]
+    else:
+        index = _load_dedup_index(cursor)
+    
+    cursor.execute("""
+        SELECT p.id, p.nama_pengguna_layanan, p.nib
+        FROM perizinan p LEFT JOIN pelaku_cluster pc ON pc.perizinan_id = p.id
+        WHERE pc.perizinan_id IS NULL
+        ORDER BY p.id
+    """)
+    new_rows = cursor.fetchall()
+    for id, nama, nib in new_rows:
+        index.add(id, nama, nib)
+    
+    # Tulis ulang cluster yang tersentuh baris baru (cluster lama bisa tergabung)
+    touched = {}
+    for id, _, _ in new_rows:
+        cid = index.cluster_id(id)
+        if cid not in touched:
+            touched[cid] = index.members(id)
+    cursor.executemany(
+        "INSERT OR REPLACE INTO pelaku_cluster (perizinan_id, cluster_id) VALUES (?, ?)",
+        ((member, cid) for cid, members in touched.items() for member in members)
+    )
+    return index, clustered + len(new_rows), len(new_rows)
+
+# Pelaku usaha unik: satu per cluster duplikat; baris yang belum diproses
+# deteksi duplikat dihitung per nama seperti sebelumnya
+PELAKU_COUNT_SQL = """
+    SELECT COUNT(DISTINCT COALESCE('c' || pc.cluster_id, 'n' || p.nama_pengguna_layanan))
+    FROM perizinan p LEFT JOIN pelaku_cluster pc ON pc.perizinan_id = p.id
+    WHERE COALESCE(p.nama_pengguna_layanan, '') != '' OR COALESCE(p.nib, '') != ''
+"""
+
+def get_pelaku_clusters(limit=50, offset=0):
+    """
+    Cluster yang berisi lebih dari satu variasi nama / NIB, untuk direview.
+    Return (list (cluster_id, rows), total cluster); rows = (id, sektor, nama, nib, tanggal_permohonan).
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    variant_sql = """
+        SELECT pc.cluster_id, COUNT(*) AS n
+        FROM pelaku_cluster pc JOIN perizinan p ON p.id = pc.perizinan_id
+        GROUP BY pc.cluster_id
+        HAVING COUNT(DISTINCT COALESCE(p.nama_pengguna_layanan, '') || '|' || COALESCE(p.nib, '')) > 1
+    """
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM ({variant_sql})")
+        total = cursor.fetchone()[0]
+        cursor.execute(f"{variant_sql} ORDER BY n DESC, pc.cluster_id LIMIT ? OFFSET ?", (limit, offset))
+        cluster_ids = [row[0] for row in cursor.fetchall()]
+        
+        clusters = []
+        for cluster_id in cluster_ids:
+            cursor.execute("""
+                SELECT p.id, p.sektor, p.nama_pengguna_layanan, p.nib, p.tanggal_permohonan
+                FROM pelaku_cluster pc JOIN v_perizinan p ON p.id = pc.perizinan_id
+                WHERE pc.cluster_id = ?
+                ORDER BY p.id
+            """, (cluster_id,))
+            clusters.append((cluster_id, cursor.fetchall()))
+    finally:
+        conn.close()
+    
+    return clusters, total
+
+def count_pelaku_usaha():
+    """Jumlah pelaku usaha unik setelah penggabungan duplikat"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(PELAKU_COUNT_SQL)
+    count = cursor.fetchone()[0] or 0
+    conn.close()
+    return count
+
+def get_storage_stats():
+    """Ukuran file database / WAL (byte) dan jumlah data per sektor (untuk metrics.py)"""
+    wal_path = DB_PATH + '-wal'
+    conn = get_connection()
+    try:
+        sektor_counts = _reference_distribution(conn.cursor(), 'sektor')
+    finally:
+        conn.close()
+    return {
+        'db_bytes': os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0,
+        'wal_bytes': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        'sektor_counts': sektor_counts,
+    }
+
 def get_available_years():
     """Get list of available years from perizinan data"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     query = """
@@ -211,19 +1498,61 @@ def get_available_years():
     conn.close()
     return years
 
-def get_analytics_metrics(period=None):
+def _reference_distribution(cursor, column):
+    """Jumlah data per nilai referensi: GROUP BY kode integer, nama di-join setelah agregasi"""
+    table, code, _ = REFERENCE_COLUMNS[column]
+    cursor.execute(f"""
+        SELECT r.nama, c.n
+        FROM (
+            SELECT {code}, COUNT(*) AS n FROM perizinan
+            WHERE {code} IS NOT NULL
+            GROUP BY {code}
+        ) c JOIN {table} r ON r.id = c.{code}
+        WHERE r.nama != ''
+        ORDER BY c.n DESC
+    """)
+    return cursor.fetchall()
+
+def _investasi_aggregate(cursor, group_sql, where_sql, params):
     """
-    Get analytics metrics based on period filter
-    period dict:
-    - type: 'yearly', 'quarterly', 'monthly'
-    - year: 'YYYY'
-    - quarter: 'TW1', 'TW2', 'TW3', 'TW4' (optional)
-    - month: 1-12 (optional)
+    (grup, total, median, jumlah data) investasi rupiah per grup (group_sql None =
+    satu grup keseluruhan). Total lewat satu GROUP BY di index investasi; median per
+    grup dengan LIMIT / OFFSET di index yang sama (sudah terurut nilai, tanpa sort).
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    base_sql = f"FROM perizinan WHERE rencana_investasi_satuan = 'IDR' AND {where_sql}"
+    if group_sql is None:
+        cursor.execute(f"SELECT NULL, SUM(rencana_investasi_nilai), COUNT(*) {base_sql}", params)
+    else:
+        cursor.execute(f"SELECT {group_sql}, SUM(rencana_investasi_nilai), COUNT(*) {base_sql} GROUP BY 1", params)
     
-    # Base WHERE clause
+    rows = []
+    for group, total, n in cursor.fetchall():
+        if not n:
+            continue
+        group_clause = f"AND {group_sql} IS ?" if group_sql is not None else ""
+        group_params = [group] if group_sql is not None else []
+        cursor.execute(f"""
+            SELECT AVG(nilai) FROM (
+                SELECT rencana_investasi_nilai AS nilai {base_sql} {group_clause}
+                ORDER BY rencana_investasi_nilai LIMIT ? OFFSET ?
+            )
+        """, params + group_params + [2 - n % 2, (n - 1) // 2])
+        rows.append((group, total, cursor.fetchone()[0], n))
+    return rows
+
+def _investasi_by_reference(cursor, column, where_sql, params):
+    """Agregat investasi per nilai referensi (sektor / resiko), urut total terbesar"""
+    table, code, _ = REFERENCE_COLUMNS[column]
+    rows = _investasi_aggregate(cursor, code, where_sql, params)
+    cursor.execute(f"SELECT id, nama FROM {table}")
+    names = dict(cursor.fetchall())
+    return sorted(
+        ((names.get(g, ''), total, median, n) for g, total, median, n in rows if g is not None),
+        key=lambda row: -row[1]
+    )
+
+def _period_clause(period=None):
+    """Klausa WHERE (tanggal_permohonan) + params untuk filter periode Dashboard"""
     where_clauses = ["tanggal_permohonan IS NOT NULL", "tanggal_permohonan != ''"]
     params = []
     
@@ -251,87 +1580,124 @@ def get_analytics_metrics(period=None):
                 where_clauses.append(f"strftime('%m', tanggal_permohonan) IN ({placeholders})")
                 params.extend(months)
     
-    where_sql = " AND ".join(where_clauses)
-    
-    metrics = {}
-    
-    # 1. Jumlah Pelaku Usaha (Count Distinct Nama - All data)
-    cursor.execute("SELECT COUNT(DISTINCT nama_pengguna_layanan) FROM perizinan")
-    metrics['jumlah_pelaku'] = cursor.fetchone()[0] or 0
-    
-    # 2. Total NIB (Count Distinct NIB - All data)
-    cursor.execute("SELECT COUNT(DISTINCT nib) FROM perizinan")
-    metrics['total_nib'] = cursor.fetchone()[0] or 0
-    
-    # 3. Average Process Time (SLA) - Only records with valid dates
-    cursor.execute("""
-        SELECT AVG(julianday(tanggal_izin) - julianday(tanggal_permohonan))
-        FROM perizinan 
-        WHERE tanggal_izin IS NOT NULL AND tanggal_izin != ''
-        AND tanggal_permohonan IS NOT NULL AND tanggal_permohonan != ''
-    """)
-    metrics['avg_sla'] = round(cursor.fetchone()[0] or 0, 1)
+    return " AND ".join(where_clauses), params
 
-    # 4. Risk Distribution (All data)
-    cursor.execute("""
-        SELECT resiko, COUNT(*) 
-        FROM perizinan 
-        WHERE resiko IS NOT NULL AND resiko != ''
-        GROUP BY resiko
-        ORDER BY COUNT(*) DESC
-    """)
-    metrics['risk_distribution'] = cursor.fetchall()
+def get_kbli_rollup(period=None):
+    """
+    Jumlah perizinan per level KBLI (kategori > golongan pokok > golongan >
+    subgolongan > kelompok) untuk periode (format sama dengan get_analytics_metrics).
+    Satu GROUP BY di index KBLI; level atas dijumlahkan dari hasilnya, jadi drill
+    down tidak perlu query ulang.
+    Return {level: {kode: jumlah}} untuk setiap level di kbli.KBLI_LEVELS.
+    """
+    where_sql, params = _period_clause(period)
+    conn = get_read_connection()
+    cursor = conn.cursor()
     
-    # 4. Kategori Distribution (All data, not filtered by date)
-    cursor.execute("""
-        SELECT kategori_perizinan, COUNT(*) 
-        FROM perizinan 
-        WHERE kategori_perizinan IS NOT NULL AND kategori_perizinan != ''
-        GROUP BY kategori_perizinan
-        ORDER BY COUNT(*) DESC
-    """)
-    metrics['kategori_distribution'] = cursor.fetchall()
+    cursor.execute(f"""
+        SELECT {', '.join(KBLI_COLUMNS)}, COUNT(*)
+        FROM perizinan
+        WHERE kbli_kelompok IS NOT NULL AND {where_sql}
+        GROUP BY {', '.join(KBLI_COLUMNS)}
+    """, params)
     
-    # 5. Time Trend (All data with valid dates)
-    cursor.execute("""
-        SELECT strftime('%Y-%m', tanggal_permohonan) as month, COUNT(*) 
-        FROM perizinan 
-        WHERE tanggal_permohonan IS NOT NULL AND tanggal_permohonan != ''
-        GROUP BY month
-        ORDER BY month
-    """)
-    metrics['time_trend'] = cursor.fetchall()
+    rollup = {level: {} for level, _ in KBLI_LEVELS}
+    for row in cursor.fetchall():
+        count = row[-1]
+        for (level, _), kode in zip(KBLI_LEVELS, row):
+            rollup[level][kode] = rollup[level].get(kode, 0) + count
     
-    # 6. Jenis Permohonan Distribution (All data)
-    cursor.execute("""
-        SELECT jenis_permohonan, COUNT(*) 
-        FROM perizinan 
-        WHERE jenis_permohonan IS NOT NULL AND jenis_permohonan != ''
-        GROUP BY jenis_permohonan
-        ORDER BY COUNT(*) DESC
-    """)
-    metrics['jenis_permohonan_dist'] = cursor.fetchall()
-    
-    # 7. Geo Distribution (All data, Top 10)
-    cursor.execute("""
-        SELECT lokasi_usaha, COUNT(*) 
-        FROM perizinan 
-        WHERE lokasi_usaha IS NOT NULL AND lokasi_usaha != ''
-        GROUP BY lokasi_usaha
-        ORDER BY COUNT(*) DESC
-        LIMIT 10
-    """)
-    metrics['geo_distribution'] = cursor.fetchall()
+    conn.close()
+    return rollup
+
+def get_kbli_children(rollup, level, parent=None):
+    """Kode di level dengan induk parent (None = semua) dari hasil get_kbli_rollup, urut jumlah terbesar"""
+    return sorted(
+        ((kode, n) for kode, n in rollup[level].items() if parent is None or kbli_parent(level, kode) == parent),
+        key=lambda item: (-item[1], item[0])
+    )
+
+def _fetch_value(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return cursor.fetchone()[0]
+
+def _fetch_rows(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+def get_analytics_metrics(period=None):
+    """
+    Get analytics metrics based on period filter
+    period dict:
+    - type: 'yearly', 'quarterly', 'monthly'
+    - year: 'YYYY'
+    - quarter: 'TW1', 'TW2', 'TW3', 'TW4' (optional)
+    - month: 1-12 (optional)
+    Setiap agregat saling independen dan dijalankan paralel di pool baca
+    (readpool.py); latensi mendekati agregat yang paling lambat.
+    """
+    where_sql, params = _period_clause(period)
     
-    # 8. Jenis Dokumen Distribution (All data, not filtered by date)
-    cursor.execute("""
-        SELECT jenis_dokumen, COUNT(*) 
-        FROM perizinan 
-        WHERE jenis_dokumen IS NOT NULL AND jenis_dokumen != ''
-        GROUP BY jenis_dokumen
-        ORDER BY COUNT(*) DESC
-    """)
-    metrics['jenis_dokumen_dist'] = cursor.fetchall()
+    tasks = {
+        # 1. Jumlah Pelaku Usaha (cluster duplikat nama/NIB digabung - All data)
+        'jumlah_pelaku': partial(_fetch_value, sql=PELAKU_COUNT_SQL),
+        
+        # 2. Total NIB (pelaku usaha ber-NIB yang punya perizinan, via index pelaku_id)
+        'total_nib': partial(_fetch_value, sql="SELECT COUNT(DISTINCT pelaku_id) FROM perizinan"),
+        
+        # 3. Average Process Time (SLA) - Only records with valid dates
+        'avg_sla': partial(_fetch_value, sql="""
+            SELECT AVG(julianday(tanggal_izin) - julianday(tanggal_permohonan))
+            FROM perizinan 
+            WHERE tanggal_izin IS NOT NULL AND tanggal_izin != ''
+            AND tanggal_permohonan IS NOT NULL AND tanggal_permohonan != ''
+        """),
+        
+        # 4. Risk Distribution (All data)
+        'risk_distribution': partial(_reference_distribution, column='resiko'),
+        
+        # 4. Kategori Distribution (All data, not filtered by date)
+        'kategori_distribution': partial(_reference_distribution, column='kategori_perizinan'),
+        
+        # 5. Time Trend (All data with valid dates)
+        'time_trend': partial(_fetch_rows, sql="""
+            SELECT strftime('%Y-%m', tanggal_permohonan) as month, COUNT(*) 
+            FROM perizinan 
+            WHERE tanggal_permohonan IS NOT NULL AND tanggal_permohonan != ''
+            GROUP BY month
+            ORDER BY month
+        """),
+        
+        # 6. Jenis Permohonan Distribution (All data)
+        'jenis_permohonan_dist': partial(_reference_distribution, column='jenis_permohonan'),
+        
+        # 7. Geo Distribution (All data, per kabupaten / kota)
+        'geo_distribution': partial(_fetch_rows, sql="""
+            SELECT lokasi_kode, COUNT(*) 
+            FROM perizinan 
+            WHERE lokasi_kode IS NOT NULL
+            GROUP BY lokasi_kode
+            ORDER BY COUNT(*) DESC
+        """),
+        
+        # 8. Jenis Dokumen Distribution (All data, not filtered by date)
+        'jenis_dokumen_dist': partial(_reference_distribution, column='jenis_dokumen'),
+        
+        # 9. Rencana Investasi (rupiah, filtered by period): total & median
+        #    keseluruhan, per sektor, per resiko dan per bulan
+        'investasi': partial(_investasi_aggregate, group_sql=None, where_sql=where_sql, params=params),
+        'investasi_by_sektor': partial(_investasi_by_reference, column='sektor', where_sql=where_sql, params=params),
+        'investasi_by_resiko': partial(_investasi_by_reference, column='resiko', where_sql=where_sql, params=params),
+        'investasi_trend': partial(_investasi_aggregate, group_sql=INVESTASI_BULAN_SQL, where_sql=where_sql, params=params),
+    }
+    result = _read_all(tasks)
     
-    conn.close()
-    return metrics
+    result['jumlah_pelaku'] = result['jumlah_pelaku'] or 0
+    result['total_nib'] = result['total_nib'] or 0
+    result['avg_sla'] = round(result['avg_sla'] or 0, 1)
+    result['geo_distribution'] = [(lokasi_nama(kode), count) for kode, count in result['geo_distribution']]
+    overall = result.pop('investasi')
+    result['investasi_total'], result['investasi_median'], result['investasi_count'] = (
+        overall[0][1:] if overall else (0, 0, 0)
+    )
+    return result
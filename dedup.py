@@ -0,0 +1,240 @@
+"""
+Deteksi duplikat pelaku usaha.
+
+Satu pelaku usaha sering tercatat dengan variasi nama ("PT. X", "PT X Tbk")
+atau NIB dengan / tanpa prefix "NIB.". DuplicateIndex mengelompokkan baris
+perizinan yang kemungkinan milik pelaku yang sama tanpa membandingkan semua
+pasangan (O(n²)):
+
+- blocking key NIB ternormalisasi (hanya digit) -> baris ber-NIB sama digabung
+- nama dinormalisasi (bentuk badan usaha & tanda baca dibuang); nama yang sama
+  digabung, nama mirip dicari lewat trigram dengan prefix filtering: hanya
+  trigram paling jarang di tiap nama yang diindex, lalu kandidat diverifikasi
+  dengan Jaccard similarity
+- nama sama / mirip tapi NIB berbeda tidak digabung, begitu juga nama yang
+  angkanya berbeda ("KUD 1" / "KUD 2" = unit berbeda); angka dalam nama
+  ikut jadi blocking key
+
+Cluster disimpan sebagai union-find; baris yang sudah punya cluster (hasil run
+sebelumnya) didaftarkan tanpa dicari ulang, jadi run incremental hanya
+mencari kandidat untuk baris baru.
+"""
+import math
+import re
+from collections import Counter
+
+# Minimal Jaccard similarity trigram nama untuk dianggap duplikat
+NAME_SIMILARITY = 0.8
+
+# Bentuk badan usaha yang tidak membedakan pelaku usaha
+LEGAL_FORMS = {
+    'PT', 'CV', 'UD', 'TBK', 'PERSERO', 'PERSEROAN', 'TERBATAS', 'FA', 'FIRMA', 'PD'
+}
+
+# Trigram yang dimiliki lebih dari ini nama tidak dipakai sebagai blocking key
+# (terlalu umum, membandingkannya mendekati O(n²))
+MAX_BLOCK_SIZE = 500
+
+# NIB valid 13 digit; nilai yang terlalu pendek dianggap kosong
+MIN_NIB_DIGITS = 8
+
+
+def normalize_nib(nib):
+    """NIB hanya digit (prefix 'NIB.' / spasi / tanda baca dibuang)"""
+    digits = re.sub(r'\D', '', re.sub(r'^\s*NIB\.?', '', nib or '', flags=re.IGNORECASE))
+    return digits if len(digits) >= MIN_NIB_DIGITS else ''
+
+
+def normalize_name(name):
+    """Nama uppercase tanpa tanda baca dan bentuk badan usaha"""
+    tokens = re.sub(r'[^0-9A-Z]+', ' ', (name or '').upper()).split()
+    core = [t for t in tokens if t not in LEGAL_FORMS]
+    # Nama yang isinya hanya bentuk badan usaha tetap dipakai apa adanya
+    return ' '.join(core or tokens)
+
+
+def name_trigrams(normalized):
+    """Set trigram karakter dari nama ternormalisasi"""
+    if len(normalized) < 3:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+
+def name_digits(normalized):
+    """Token angka dalam nama; nama dengan angka berbeda tidak dibandingkan"""
+    if not any(c.isdigit() for c in normalized):
+        return ''
+    return ' '.join(t for t in normalized.split() if t.isdigit())
+
+
+def jaccard(a, b):
+    overlap = len(a & b)
+    return overlap / (len(a) + len(b) - overlap) if overlap else 0.0
+
+
+class DuplicateIndex:
+    """Cluster baris perizinan per pelaku usaha (union-find + blocking key)"""
+
+    def __init__(self, threshold=NAME_SIMILARITY, gram_counts=None, normalized=None, grams=None):
+        self.threshold = threshold
+        # Cache normalisasi (nama mentah -> ternormalisasi -> trigram) dari for_names
+        self._normalized = normalized or {}
+        self._pending_grams = grams or {}
+        # Urutan global trigram (jarang -> umum) untuk prefix filtering.
+        # Trigram baru mendapat rank negatif (paling jarang) secara permanen,
+        # jadi urutan tetap konsisten untuk semua nama
+        ordered = sorted((gram_counts or {}).items(), key=lambda item: (item[1], item[0]))
+        self._gram_rank = {gram: rank for rank, (gram, _) in enumerate(ordered)}
+
+        self._parent = {}
+        self._members = {}  # root -> list record id
+        self._min_id = {}   # root -> record id terkecil (id cluster)
+
+        self._nib_rep = {}      # nib -> record id pertama
+        self._name_groups = {}  # nama -> {nib atau '': record id pertama}
+        self._name_grams = {}   # nama -> trigram
+        self._similar = {}      # nama -> nama mirip yang terdaftar
+        self._postings = {}     # (angka nama, trigram prefix) -> list nama
+
+    @classmethod
+    def for_names(cls, names, threshold=NAME_SIMILARITY):
+        """Index kosong dengan urutan trigram dari frekuensi nama-nama ini"""
+        normalized = {}
+        for name in names:
+            if name not in normalized:
+                normalized[name] = normalize_name(name)
+        grams = {n: name_trigrams(n) for n in set(normalized.values())}
+        counts = Counter()
+        for name_grams in grams.values():
+            counts.update(name_grams)
+        return cls(threshold, counts, normalized, grams)
+
+    # --- union-find ---
+
+    def _find(self, node):
+        parent = self._parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _make(self, node, record_id=None):
+        if node not in self._parent:
+            self._parent[node] = node
+            self._members[node] = [record_id] if record_id is not None else []
+            self._min_id[node] = record_id
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra
+        if len(self._members[ra]) < len(self._members[rb]):
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._members[ra].extend(self._members.pop(rb))
+        ids = [i for i in (self._min_id[ra], self._min_id.pop(rb)) if i is not None]
+        self._min_id[ra] = min(ids) if ids else None
+        return ra
+
+    # --- pencarian nama mirip ---
+
+    def _prefix(self, grams):
+        rank = self._gram_rank
+        for gram in grams:
+            if gram not in rank:
+                rank[gram] = -len(rank) - 1
+        ordered = sorted(grams, key=rank.__getitem__)
+        # Dua set dengan Jaccard >= t pasti berbagi trigram di prefix ini
+        size = len(ordered) - math.ceil(self.threshold * len(ordered) - 1e-9) + 1
+        return ordered[:size]
+
+    def _register_name(self, name, probe=True):
+        """
+        Daftarkan nama baru. probe=False untuk nama dari cluster tersimpan
+        (kemiripannya dengan nama lama sudah tercermin di cluster).
+        """
+        grams = self._pending_grams.pop(name, None)
+        if grams is None:
+            grams = name_trigrams(name)
+        prefix = self._prefix(grams)
+        digits = name_digits(name)
+        similar = []
+
+        if probe:
+            candidates = set()
+            for gram in prefix:
+                block = self._postings.get((digits, gram), ())
+                if len(block) <= MAX_BLOCK_SIZE:
+                    candidates.update(block)
+            low, high = self.threshold * len(grams), len(grams) / self.threshold
+            name_grams = self._name_grams
+            similar = [
+                other for other in candidates
+                if low <= len(name_grams[other]) <= high
+                and jaccard(grams, name_grams[other]) >= self.threshold
+            ]
+            for other in similar:
+                self._similar[other].append(name)
+
+        self._name_groups[name] = {}
+        self._name_grams[name] = grams
+        self._similar[name] = similar
+        for gram in prefix:
+            self._postings.setdefault((digits, gram), []).append(name)
+
+    # --- API ---
+
+    def add(self, record_id, nama, nib, cluster_id=None):
+        """
+        Tambah satu baris. Jika cluster_id diberikan (hasil run sebelumnya),
+        baris langsung masuk cluster itu tanpa pencarian kandidat.
+        """
+        name = self._normalized.get(nama)
+        if name is None:
+            name = normalize_name(nama)
+        nib = normalize_nib(nib)
+        self._make(record_id, record_id)
+        if name and name not in self._name_groups:
+            self._register_name(name, probe=cluster_id is None)
+
+        if cluster_id is not None:
+            self._make(('cluster', cluster_id))
+            self._union(record_id, ('cluster', cluster_id))
+        else:
+            if nib and nib in self._nib_rep:
+                self._union(record_id, self._nib_rep[nib])
+            if name:
+                for other in [name] + self._similar[name]:
+                    group = self._name_groups[other]
+                    if nib:
+                        # NIB berbeda = pelaku berbeda, walau namanya sama
+                        target = group.get(nib, group.get(''))
+                    else:
+                        target = next(iter(group.values()), None)
+                    if target is not None:
+                        self._union(record_id, target)
+
+        if nib:
+            self._nib_rep.setdefault(nib, record_id)
+        if name:
+            self._name_groups[name].setdefault(nib, record_id)
+
+    def cluster_id(self, record_id):
+        """Id cluster = record id terkecil di cluster"""
+        return self._min_id[self._find(record_id)]
+
+    def members(self, record_id):
+        return sorted(self._members[self._find(record_id)])
+
+    def clusters(self, min_size=2):
+        """Semua cluster berisi minimal min_size baris"""
+        return [
+            sorted(members) for members in self._members.values()
+            if len(members) >= min_size
+        ]
+
+    def __len__(self):
+        """Jumlah pelaku usaha (cluster)"""
+        return sum(1 for members in self._members.values() if members)
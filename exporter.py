@@ -0,0 +1,404 @@
+"""
+Format export data perizinan.
+
+Satu definisi layout kolom export dipakai oleh export Excel di halaman
+Tabel Data maupun writer CSV / JSON Lines untuk transfer antar instansi.
+"""
+import csv
+import json
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from itertools import groupby, islice
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Indonesian month names
+BULAN_INDONESIA = {
+    1: 'Januari', 2: 'Februari', 3: 'Maret', 4: 'April',
+    5: 'Mei', 6: 'Juni', 7: 'Juli', 8: 'Agustus',
+    9: 'September', 10: 'Oktober', 11: 'November', 12: 'Desember'
+}
+
+# Lookup array nama bulan, index = nomor bulan (untuk format tanggal vektor)
+BULAN_ARRAY = np.array([''] + [BULAN_INDONESIA[m] for m in range(1, 13)], dtype=object)
+
+# Nama kolom tampilan Tabel Data, urutan sama dengan database.SELECT_COLS
+TABLE_COLUMNS = [
+    'ID', 'Sektor', 'Kategori', 'Nama Pengguna', 'NIB', 'Alamat',
+    'Pemilik/Pengurus', 'Lokasi Usaha', 'Luas Lahan', 'KBLI', 'Jenis Usaha',
+    'Resiko', 'Kapasitas', 'Rencana Investasi', 'Jenis Permohonan', 'No. Permohonan', 'Tgl Permohonan',
+    'No. & Tgl Perm. Rekom', 'No. & Tgl Rekomendasi',
+    'No. Izin', 'Tgl Izin', 'Masa Berlaku', 'NPWP',
+    'Telepon', 'Email', 'Keterangan', 'Jenis Dokumen', 'Created At', 'Updated At'
+]
+
+# Database field names, urutan sama dengan TABLE_COLUMNS
+DB_COLUMNS = [
+    'id', 'sektor', 'kategori_perizinan', 'nama_pengguna_layanan', 'nib', 'alamat',
+    'pemilik_pengurus', 'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha',
+    'resiko', 'kapasitas', 'rencana_investasi', 'jenis_permohonan', 'nomor_permohonan', 'tanggal_permohonan',
+    'nomor_tanggal_permohonan_rekomendasi', 'nomor_tanggal_rekomendasi',
+    'nomor_izin', 'tanggal_izin', 'masa_berlaku', 'npwp',
+    'telepon', 'email', 'keterangan', 'jenis_dokumen', 'created_at', 'updated_at'
+]
+
+# Kolom export -> kolom Tabel Data yang disalin apa adanya (kosong/NULL jadi '-')
+EXPORT_PASSTHROUGH = {
+    'ID': 'ID',
+    'Sektor': 'Sektor',
+    'Jenis Perizinan': 'Kategori',
+    'Nama Pengguna Layanan': 'Nama Pengguna',
+    'NIB': 'NIB',
+    'Alamat': 'Alamat',
+    'Pemilik/Pengurus': 'Pemilik/Pengurus',
+    'Lokasi Usaha': 'Lokasi Usaha',
+    'Luas Lahan': 'Luas Lahan',
+    'KBLI': 'KBLI',
+    'Jenis Usaha': 'Jenis Usaha',
+    'Risiko': 'Resiko',
+    'Rencana Nilai Investasi': 'Rencana Investasi',
+    'Kapasitas': 'Kapasitas',
+    'Jenis Permohonan': 'Jenis Permohonan',
+    'Nomor & Tanggal Permohonan Rekom': 'No. & Tgl Perm. Rekom',
+    'Nomor & Tanggal Rekomendasi': 'No. & Tgl Rekomendasi',
+    'Nomor Izin': 'No. Izin',
+    'NPWP': 'NPWP',
+    'Telepon': 'Telepon',
+    'Email': 'Email',
+    'Jenis Dokumen': 'Jenis Dokumen',
+    'Keterangan': 'Keterangan',
+}
+
+EXPORT_COLUMNS = [
+    'No', 'ID', 'Sektor', 'Jenis Perizinan', 'Nama Pengguna Layanan', 'NIB', 'Alamat',
+    'Pemilik/Pengurus', 'Gender', 'Lokasi Usaha', 'Luas Lahan', 'KBLI', 'Jenis Usaha',
+    'Risiko', 'Rencana Nilai Investasi', 'Kapasitas', 'Jenis Permohonan',
+    'Nomor & Tanggal Permohonan', 'Nomor & Tanggal Permohonan Rekom',
+    'Nomor & Tanggal Rekomendasi', 'Nomor Izin', 'Tanggal Izin', 'Masa Berlaku',
+    'NPWP', 'Telepon', 'Email', 'Jenis Dokumen', 'Keterangan',
+]
+
+# Jumlah baris database yang diformat sekaligus (vektor) oleh export_records
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_TITLE_ROWS = [
+    'DATA PENGGUNA LAYANAN PERIZINAN, PERIZINAN BERUSAHA, DAN NONPERIZINAN',
+    'YANG DITERBITKAN DINAS PENANAMAN MODAL DAN PELAYANAN TERPADU SATU PINTU PROVINSI LAMPUNG',
+]
+
+def format_date(date_str):
+    """Convert YYYY-MM-DD to DD/MM/YY"""
+    if pd.isna(date_str) or not date_str:
+        return ''
+    try:
+        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
+        return dt.strftime('%d/%m/%y')
+    except:
+        return str(date_str)
+
+def format_date_full(date_str):
+    """Convert YYYY-MM-DD to DD/MM/YYYY"""
+    if pd.isna(date_str) or not date_str or str(date_str).strip() == '':
+        return '-'
+    try:
+        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
+        return dt.strftime('%d/%m/%Y')
+    except:
+        return str(date_str) if date_str else '-'
+
+def format_date_indonesian(date_str):
+    """Convert YYYY-MM-DD to 'DD Bulan YYYY' format"""
+    if pd.isna(date_str) or not date_str or str(date_str).strip() == '':
+        return ''
+    try:
+        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
+        return f"{dt.day} {BULAN_INDONESIA[dt.month]} {dt.year}"
+    except:
+        return str(date_str) if date_str else ''
+
+def export_record(no, row):
+    """Format satu baris (dict berkolom TABLE_COLUMNS) ke layout export"""
+    # Combine nomor_permohonan + tanggal_permohonan
+    nomor_perm = str(row['No. Permohonan']) if pd.notna(row['No. Permohonan']) and row['No. Permohonan'] else ''
+    tgl_perm_indo = format_date_indonesian(row['Tgl Permohonan'])
+
+    if nomor_perm and tgl_perm_indo:
+        nomor_tgl_permohonan = f"{nomor_perm} ({tgl_perm_indo})"
+    elif nomor_perm:
+        nomor_tgl_permohonan = nomor_perm
+    else:
+        nomor_tgl_permohonan = '-'
+
+    def value(col):
+        v = row[EXPORT_PASSTHROUGH[col]]
+        return v if pd.notna(v) else '-'
+
+    masa_berlaku = row['Masa Berlaku']
+
+    export_row = {}
+    for col in EXPORT_COLUMNS:
+        if col == 'No':
+            export_row[col] = no
+        elif col == 'Gender':
+            export_row[col] = '-'  # Not in database
+        elif col == 'Nomor & Tanggal Permohonan':
+            export_row[col] = nomor_tgl_permohonan
+        elif col == 'Tanggal Izin':
+            export_row[col] = format_date_full(row['Tgl Izin'])
+        elif col == 'Masa Berlaku':
+            export_row[col] = masa_berlaku if str(masa_berlaku).lower().startswith('selama') else format_date_full(masa_berlaku)
+        else:
+            export_row[col] = value(col)
+    return export_row
+
+def export_records(db_rows, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream baris database (tuple SELECT_COLS) sebagai dict layout export.
+    Baris diformat per batch secara vektor (sama dengan create_export_dataframe,
+    memori sebatas satu batch); hasil sama dengan export_record per baris.
+    """
+    rows = iter(db_rows)
+    start = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        # dtype object: nilai asli dari database (mis. int + None) tidak dikonversi ke float
+        df_source = pd.DataFrame(batch, columns=TABLE_COLUMNS, index=range(start, start + len(batch)), dtype=object)
+        columns = _export_columns(df_source)
+        for values in zip(*(columns[col] for col in EXPORT_COLUMNS)):
+            yield dict(zip(EXPORT_COLUMNS, values))
+        start += len(batch)
+
+def _format_dates(series, scalar_format, vector_format):
+    """
+    Format kolom tanggal secara vektor.
+    Nilai unik difaktorisasi dulu; yang berbentuk YYYY-MM-DD valid diformat
+    dengan operasi datetime vektor, sisanya (teks bebas, tanggal tidak valid)
+    jatuh ke scalar_format sehingga hasil selalu sama dengan versi per baris.
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+
+    text = uniques.astype(str)
+    date_part = text.str.split(' ').str[0]
+    fast = date_part.str.fullmatch(r'\d{4}-\d{2}-\d{2}') & (text.str.strip() != '')
+
+    dt = pd.to_datetime(date_part.where(fast), format='%Y-%m-%d', errors='coerce')
+    fast &= dt.notna()
+
+    formatted = pd.Series('', index=uniques.index, dtype=object)
+    if fast.any():
+        formatted[fast] = vector_format(dt[fast])
+    if (~fast).any():
+        formatted[~fast] = uniques[~fast].map(scalar_format)
+
+    # Code -1 = NULL/NaN
+    lookup = np.append(formatted.to_numpy(dtype=object), scalar_format(None))
+    return pd.Series(lookup[codes], index=series.index, dtype=object)
+
+def _vector_date_full(dt):
+    """DD/MM/YYYY dari Series datetime"""
+    return (
+        dt.dt.day.astype(str).str.zfill(2) + '/'
+        + dt.dt.month.astype(str).str.zfill(2) + '/'
+        + dt.dt.year.astype(str)
+    )
+
+def _vector_date_indonesian(dt):
+    """'DD Bulan YYYY' dari Series datetime"""
+    bulan = pd.Series(BULAN_ARRAY[dt.dt.month.to_numpy()], index=dt.index)
+    return dt.dt.day.astype(str) + ' ' + bulan + ' ' + dt.dt.year.astype(str)
+
+def _export_columns(df_source):
+    """Kolom layout export (array object per kolom EXPORT_COLUMNS) dari DataFrame Tabel Data, secara vektor"""
+    # Combine nomor_permohonan + tanggal_permohonan
+    nomor = df_source['No. Permohonan']
+    has_nomor = (nomor.notna() & nomor.astype(bool)).to_numpy()
+    nomor_text = nomor.fillna('').astype(str).to_numpy(dtype=object)
+    tgl_indo = _format_dates(df_source['Tgl Permohonan'], format_date_indonesian, _vector_date_indonesian).to_numpy(dtype=object)
+    has_tgl = tgl_indo != ''
+    nomor_tgl_permohonan = np.where(
+        has_nomor & has_tgl,
+        nomor_text + ' (' + tgl_indo + ')',
+        np.where(has_nomor, nomor_text, '-')
+    )
+
+    masa = df_source['Masa Berlaku']
+    is_lifetime = masa.fillna('').astype(str).str.lower().str.startswith('selama')
+    masa_berlaku = _format_dates(masa, format_date_full, _vector_date_full).where(~is_lifetime, masa)
+
+    columns = {}
+    for col in EXPORT_COLUMNS:
+        if col == 'No':
+            columns[col] = (df_source.index + 1).to_numpy(dtype=object)
+        elif col == 'Gender':
+            columns[col] = np.full(len(df_source), '-', dtype=object)  # Not in database
+        elif col == 'Nomor & Tanggal Permohonan':
+            columns[col] = nomor_tgl_permohonan.astype(object)
+        elif col == 'Tanggal Izin':
+            columns[col] = _format_dates(df_source['Tgl Izin'], format_date_full, _vector_date_full).to_numpy(dtype=object)
+        elif col == 'Masa Berlaku':
+            columns[col] = masa_berlaku.to_numpy(dtype=object)
+        else:
+            source = df_source[EXPORT_PASSTHROUGH[col]].to_numpy(dtype=object)
+            columns[col] = np.where(pd.isna(source), '-', source).astype(object)
+    return columns
+
+def create_export_dataframe(df_source):
+    """Transform database dataframe to export format (column-wise)"""
+    if df_source.empty:
+        return pd.DataFrame()
+    # Inferensi dtype sama dengan pd.DataFrame(list of dict) pada versi per baris
+    return pd.DataFrame(_export_columns(df_source)).infer_objects()
+
+def generate_excel_export(df_export):
+    """Generate Excel file with headers above column names"""
+    output = BytesIO()
+
+    current_year = datetime.now().year
+
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Write data starting from row 5 (0-indexed: row 4)
+        # This leaves rows 0-3 for title headers
+        df_export.to_excel(writer, index=False, sheet_name='Data Perizinan', startrow=4)
+
+        # Get the worksheet
+        worksheet = writer.sheets['Data Perizinan']
+
+        # Write title headers in rows 1-3
+        worksheet.cell(row=1, column=1, value=EXPORT_TITLE_ROWS[0])
+        worksheet.cell(row=2, column=1, value=EXPORT_TITLE_ROWS[1])
+        worksheet.cell(row=3, column=1, value=f'TAHUN {current_year}')
+        # Row 4 is empty (intentional gap)
+        # Row 5 is column headers (written by to_excel)
+        # Row 6+ is data
+
+    return output.getvalue()
+
+def write_export_sheet(worksheet, records, year=None):
+    """Append title rows, header dan record layout export ke worksheet write-only"""
+    year = year or datetime.now().year
+
+    # Rows 1-3 title headers, row 4 empty (intentional gap)
+    worksheet.append([EXPORT_TITLE_ROWS[0]])
+    worksheet.append([EXPORT_TITLE_ROWS[1]])
+    worksheet.append([f'TAHUN {year}'])
+    worksheet.append([])
+    # Row 5 column headers, row 6+ data
+    worksheet.append(EXPORT_COLUMNS)
+
+    count = 0
+    for record in records:
+        worksheet.append([record[col] for col in EXPORT_COLUMNS])
+        count += 1
+    return count
+
+def write_xlsx(records, fileobj):
+    """Tulis record layout export ke XLSX secara streaming (openpyxl write-only)"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Data Perizinan')
+    count = write_export_sheet(worksheet, records)
+    workbook.save(fileobj)
+    return count
+
+def _sektor_label(sektor):
+    """Nama sektor tanpa akhiran provinsi, untuk nama sheet / file"""
+    label = (sektor or '').strip() or 'TANPA SEKTOR'
+    return re.sub(r'\s+PROVINSI LAMPUNG$', '', label, flags=re.IGNORECASE)
+
+def _unique_name(name, used, max_len):
+    """Pastikan nama unik (case-insensitive) dan tidak melebihi max_len"""
+    candidate = name[:max_len]
+    n = 2
+    while candidate.lower() in used:
+        suffix = f' ({n})'
+        candidate = name[:max_len - len(suffix)] + suffix
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+def _group_by_sektor(db_rows):
+    """Kelompokkan baris database yang sudah terurut per sektor (SELECT_COLS index 1)"""
+    return groupby(db_rows, key=lambda row: row[1])
+
+def write_xlsx_by_sektor(db_rows, fileobj):
+    """
+    Export satu pass: baris database terurut per sektor ditulis streaming,
+    satu worksheet per sektor, masing-masing dengan title header standar.
+    Return dict {sektor: jumlah baris}.
+    """
+    workbook = Workbook(write_only=True)
+    used = set()
+    counts = {}
+
+    for sektor, rows in _group_by_sektor(db_rows):
+        # Karakter []:*?/\ tidak boleh di nama sheet, maksimal 31 karakter
+        sheet_name = re.sub(r'[\[\]:*?/\\]', ' ', _sektor_label(sektor))
+        sheet_name = re.sub(r'^DINAS\s+', '', sheet_name, flags=re.IGNORECASE)
+        worksheet = workbook.create_sheet(_unique_name(sheet_name, used, 31).strip())
+        counts[sektor] = write_export_sheet(worksheet, export_records(rows))
+
+    if not counts:
+        write_export_sheet(workbook.create_sheet('Data Perizinan'), [])
+    workbook.save(fileobj)
+    return counts
+
+def write_zip_by_sektor(db_rows, fileobj):
+    """
+    Sama dengan write_xlsx_by_sektor, tetapi setiap sektor menjadi file XLSX
+    tersendiri di dalam satu arsip ZIP. Return dict {sektor: jumlah baris}.
+    """
+    used = set()
+    counts = {}
+
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for sektor, rows in _group_by_sektor(db_rows):
+            file_name = re.sub(r'[^\w\-]+', '_', _sektor_label(sektor)).strip('_')
+            file_name = _unique_name(file_name, used, 100)
+            with archive.open(f'{file_name}.xlsx', 'w', force_zip64=True) as member:
+                counts[sektor] = write_xlsx(export_records(rows), member)
+
+    return counts
+
+def write_csv(records, fileobj):
+    """Tulis record layout export ke CSV secara streaming, return jumlah baris"""
+    writer = csv.DictWriter(fileobj, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+def write_jsonl(records, fileobj):
+    """Tulis record layout export ke JSON Lines secara streaming, return jumlah baris"""
+    count = 0
+    for record in records:
+        fileobj.write(json.dumps(record, ensure_ascii=False, default=str))
+        fileobj.write('\n')
+        count += 1
+    return count
+
+def write_delta_jsonl(records, deleted_ids, fileobj):
+    """
+    Tulis file sinkronisasi delta JSON Lines:
+    {"op": "upsert", "data": {...layout export...}} lalu {"op": "delete", "id": n}.
+    Return (jumlah upsert, jumlah delete).
+    """
+    upserts = 0
+    for record in records:
+        fileobj.write(json.dumps({'op': 'upsert', 'data': record}, ensure_ascii=False, default=str))
+        fileobj.write('\n')
+        upserts += 1
+
+    deletes = 0
+    for deleted_id in deleted_ids:
+        fileobj.write(json.dumps({'op': 'delete', 'id': deleted_id}))
+        fileobj.write('\n')
+        deletes += 1
+    return upserts, deletes
@@ -0,0 +1,292 @@
+"""
+Parsing dan mapping data import perizinan.
+
+Dipakai bersama oleh halaman Import Data (Excel format PKL) dan
+reader CSV / JSON Lines, supaya semua jalur import memakai aturan
+mapping kolom yang sama.
+"""
+import csv
+import json
+import re
+from datetime import datetime
+
+import pandas as pd
+
+LIFETIME_VALUE = 'Selama Pelaku Usaha Menjalankan Kegiatan Usaha'
+
+# Kolom PKL dan mapping ke field database
+PKL_MAPPING = {
+    'NAMA PENGGUNA LAYANAN': 'nama_pengguna_layanan',
+    'NIB': 'nib',
+    'ALAMAT PERUSAHAAN': 'alamat',
+    'PEMILIK / PENGURUS': 'pemilik_pengurus',
+    'LOKASI USAHA': 'lokasi_usaha',
+    'LUAS LAHAN USAHA': 'luas_lahan_usaha',
+    'KBLI': 'kbli',
+    'JENIS USAHA': 'jenis_usaha',
+    'RESIKO': 'resiko',
+    'KAPASITAS': 'kapasitas',
+    'JENIS PERMOHONAN': 'jenis_permohonan',
+    'NOMOR DAN TANGGAL PERMOHONAN': 'nomor_tanggal_permohonan',  # Will be split
+    'NOMOR DAN TANGGAL PERMOHONAN REKOMENDASI': 'nomor_tanggal_permohonan_rekomendasi',
+    'NOMOR DAN TANGGAL REKOMENDASI': 'nomor_tanggal_rekomendasi',
+    'NOMOR IZIN': 'nomor_izin',
+    'TANGGAL IZIN': 'tanggal_izin',
+    'MASA BERLAKU': 'masa_berlaku',
+    'NPWP': 'npwp',
+    'TELPON': 'telepon',
+    'EMAIL': 'email',
+    'KETERANGAN': 'keterangan'
+}
+
+# Semua field yang wajib ada di record sebelum insert
+ALL_FIELDS = [
+    'nama_pengguna_layanan', 'nib', 'alamat', 'pemilik_pengurus',
+    'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha', 'resiko',
+    'kapasitas', 'jenis_permohonan', 'nomor_permohonan', 'tanggal_permohonan',
+    'nomor_tanggal_permohonan_rekomendasi',
+    'nomor_tanggal_rekomendasi', 'nomor_izin', 'tanggal_izin',
+    'masa_berlaku', 'npwp', 'telepon', 'email', 'keterangan'
+]
+
+# Kolom layout export (lihat exporter.EXPORT_COLUMNS) dan mapping ke field database
+EXPORT_MAPPING = {
+    'Sektor': 'sektor',
+    'Jenis Perizinan': 'kategori_perizinan',
+    'Nama Pengguna Layanan': 'nama_pengguna_layanan',
+    'NIB': 'nib',
+    'Alamat': 'alamat',
+    'Pemilik/Pengurus': 'pemilik_pengurus',
+    'Lokasi Usaha': 'lokasi_usaha',
+    'Luas Lahan': 'luas_lahan_usaha',
+    'KBLI': 'kbli',
+    'Jenis Usaha': 'jenis_usaha',
+    'Risiko': 'resiko',
+    'Rencana Nilai Investasi': 'rencana_investasi',
+    'Kapasitas': 'kapasitas',
+    'Jenis Permohonan': 'jenis_permohonan',
+    'Nomor & Tanggal Permohonan': 'nomor_tanggal_permohonan',  # Will be split
+    'Nomor & Tanggal Permohonan Rekom': 'nomor_tanggal_permohonan_rekomendasi',
+    'Nomor & Tanggal Rekomendasi': 'nomor_tanggal_rekomendasi',
+    'Nomor Izin': 'nomor_izin',
+    'Tanggal Izin': 'tanggal_izin',
+    'Masa Berlaku': 'masa_berlaku',
+    'NPWP': 'npwp',
+    'Telepon': 'telepon',
+    'Email': 'email',
+    'Jenis Dokumen': 'jenis_dokumen',
+    'Keterangan': 'keterangan',
+}
+
+EMPTY_VALUES = ['nan', '-', 'NaN']
+
+# Layout sheet PKL: judul di atas, header di baris 4 (0-indexed), data mulai baris 5
+PKL_HEADER_ROW = 4
+PKL_DATA_START_ROW = 5
+
+MONTHS = {
+    'januari': '01', 'februari': '02', 'maret': '03', 'april': '04',
+    'mei': '05', 'juni': '06', 'juli': '07', 'agustus': '08',
+    'september': '09', 'oktober': '10', 'november': '11', 'desember': '12'
+}
+
+
+def clean_nib(value):
+    """Strip 'NIB.' prefix from NIB values"""
+    if pd.isna(value):
+        return ''
+    text = str(value).strip()
+    # Remove common prefixes
+    text = re.sub(r'^NIB\.?\s*', '', text, flags=re.IGNORECASE)
+    return text
+
+def clean_text(value):
+    """Convert cell value to stripped string, empty markers become ''"""
+    value = str(value).strip() if pd.notna(value) else ''
+    if value in EMPTY_VALUES:
+        value = ''
+    return value
+
+def parse_nomor_tanggal(value):
+    """Parse combined 'Nomor Permohonan : XXX (DD Month YYYY)' format"""
+    if pd.isna(value) or not str(value).strip():
+        return '', ''
+
+    text = str(value).strip()
+    nomor = ''
+    tanggal = ''
+
+    # Extract nomor permohonan
+    nomor_match = re.search(r'(?:Nomor\s*Permohonan\s*:\s*)?([A-Z0-9\-]+)', text, re.IGNORECASE)
+    if nomor_match:
+        nomor = nomor_match.group(1)
+
+    # Extract date in parentheses or after the nomor
+    date_match = re.search(r'\((\d{1,2}\s+\w+\s+\d{4})\)', text)
+    if date_match:
+        tanggal = date_match.group(1)
+
+    return nomor, tanggal
+
+def split_nomor_tanggal_export(value):
+    """Split export format 'XXX (DD Bulan YYYY)' back into nomor and tanggal"""
+    text = clean_text(value)
+    match = re.match(r'^(.*?)\s*\((\d{1,2}\s+\w+\s+\d{4})\)$', text)
+    if match:
+        return match.group(1), match.group(2)
+    return text, ''
+
+def parse_indonesian_date(date_str):
+    """Convert Indonesian date format to YYYY-MM-DD"""
+    if pd.isna(date_str) or not str(date_str).strip():
+        return ''
+
+    # Sel tanggal Excel terbaca sebagai datetime / Timestamp
+    if isinstance(date_str, datetime):
+        return date_str.strftime('%Y-%m-%d')
+
+    text = str(date_str).strip()
+
+    # Handle "Seumur Hidup" / Berlaku selamanya variations
+    lifetime_terms = ['seumur hidup', 'selamanya', 'selama perusahaan berdiri', 'selama beroperasi', 'selama pelaku usaha']
+    if any(term in text.lower() for term in lifetime_terms):
+        return LIFETIME_VALUE
+
+    # Try to parse "DD Month YYYY" format
+    match = re.search(r'(\d{1,2})\s+(\w+)\s+(\d{4})', text, re.IGNORECASE)
+    if match:
+        day = match.group(1).zfill(2)
+        month_name = match.group(2).lower()
+        year = match.group(3)
+        month = MONTHS.get(month_name, '01')
+        return f"{year}-{month}-{day}"
+
+    return text  # Return as-is if can't parse
+
+def parse_export_date(date_str):
+    """Convert export format DD/MM/YYYY back to YYYY-MM-DD"""
+    text = clean_text(date_str)
+    if not text:
+        return ''
+    try:
+        return datetime.strptime(text, '%d/%m/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return parse_indonesian_date(text)
+
+def auto_match_columns(headers):
+    """Cocokkan header file ke PKL_MAPPING, return {db_field: header}"""
+    col_mapping = {}
+    for pkl_col, db_field in PKL_MAPPING.items():
+        for h in headers:
+            if h and pkl_col.lower() in str(h).lower():
+                col_mapping[db_field] = h
+                break
+    return col_mapping
+
+def default_pkl_sheet(sheet_names):
+    """Sheet yang namanya memuat 'PKL', atau sheet pertama"""
+    pkl_sheets = [s for s in sheet_names if 'PKL' in s.upper()]
+    return pkl_sheets[0] if pkl_sheets else sheet_names[0]
+
+def split_pkl_sheet(df_raw, header_row=PKL_HEADER_ROW, data_start_row=PKL_DATA_START_ROW):
+    """
+    Pisahkan sheet PKL mentah (read_excel header=None) jadi (headers, df_data).
+    Baris tanpa nilai di kolom pertama (NO) dibuang.
+    """
+    headers = list(df_raw.iloc[header_row])
+    df_data = df_raw.iloc[data_start_row:].copy()
+    df_data.columns = headers
+    df_data = df_data.reset_index(drop=True)
+    
+    no_col = headers[0]  # First column is typically NO
+    df_data = df_data[df_data[no_col].notna() & (df_data[no_col].astype(str).str.strip() != '')]
+    return headers, df_data
+
+def build_record(row, col_mapping, sektor, kategori):
+    """Bangun satu record database dari baris PKL (dict / Series) sesuai col_mapping"""
+    record = {
+        'sektor': sektor,
+        'kategori_perizinan': kategori,
+    }
+
+    for db_field, excel_col in col_mapping.items():
+        value = row.get(excel_col, '')
+
+        # Special processing
+        if db_field == 'nib':
+            value = clean_nib(value)
+        elif db_field == 'nomor_tanggal_permohonan':
+            nomor, tanggal = parse_nomor_tanggal(value)
+            record['nomor_permohonan'] = nomor
+            record['tanggal_permohonan'] = parse_indonesian_date(tanggal)
+            continue
+        elif db_field in ['tanggal_izin', 'masa_berlaku']:
+            value = parse_indonesian_date(value)
+        else:
+            # nomor_tanggal_(permohonan_)rekomendasi tetap sebagai combined field
+            value = clean_text(value)
+
+        record[db_field] = value
+
+    # Ensure all required fields exist
+    for field in ALL_FIELDS:
+        if field not in record:
+            record[field] = ''
+
+    return record
+
+def build_records(df_data, col_mapping, sektor, kategori):
+    """Record database untuk semua baris sheet PKL"""
+    return [build_record(row, col_mapping, sektor, kategori) for _, row in df_data.iterrows()]
+
+def build_record_from_export(row):
+    """Bangun satu record database dari baris berlayout export"""
+    record = {}
+    for export_col, db_field in EXPORT_MAPPING.items():
+        value = row.get(export_col, '')
+        if db_field == 'nib':
+            record[db_field] = clean_nib(clean_text(value))
+        elif db_field == 'nomor_tanggal_permohonan':
+            nomor, tanggal = split_nomor_tanggal_export(value)
+            record['nomor_permohonan'] = nomor
+            record['tanggal_permohonan'] = parse_indonesian_date(tanggal)
+        elif db_field in ['tanggal_izin', 'masa_berlaku']:
+            record[db_field] = parse_export_date(value)
+        else:
+            record[db_field] = clean_text(value)
+    return record
+
+def is_export_layout(headers):
+    """True jika header adalah layout export (bukan PKL)"""
+    headers = set(headers)
+    return 'Sektor' in headers and 'Nama Pengguna Layanan' in headers
+
+def _records_from_rows(rows, headers, sektor, kategori):
+    if is_export_layout(headers):
+        for row in rows:
+            yield build_record_from_export(row)
+        return
+
+    if not sektor or not kategori:
+        raise ValueError("File format PKL membutuhkan sektor dan kategori batch")
+    col_mapping = auto_match_columns(headers)
+    for row in rows:
+        yield build_record(row, col_mapping, sektor, kategori)
+
+def read_csv_records(fileobj, sektor=None, kategori=None):
+    """Stream record database dari file CSV (layout export atau PKL)"""
+    reader = csv.DictReader(fileobj)
+    yield from _records_from_rows(reader, reader.fieldnames or [], sektor, kategori)
+
+def read_jsonl_records(fileobj, sektor=None, kategori=None):
+    """Stream record database dari file JSON Lines (layout export atau PKL)"""
+    rows = (json.loads(line) for line in fileobj if line.strip())
+    first = next(rows, None)
+    if first is None:
+        return
+
+    def all_rows():
+        yield first
+        yield from rows
+
+    yield from _records_from_rows(all_rows(), list(first.keys()), sektor, kategori)
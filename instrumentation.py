@@ -0,0 +1,428 @@
+"""
+Instrumentasi query SQLite: latensi per statement, jumlah baris, fungsi
+database.py pemanggil dan halaman Streamlit yang sedang berjalan.
+
+Aktif lewat environment variable (atau enable() dari kode):
+    PERIZINAN_QUERY_LOG=1            aktifkan instrumentasi
+    PERIZINAN_SLOW_QUERY_MS=500      ambang slow query (ms)
+    PERIZINAN_SLOW_QUERY_LOG=...     file slow query log (default slow_queries.log)
+    PERIZINAN_QUERY_STATS=...        file JSON untuk dump histogram (default query_stats.json)
+
+Slow query ditulis ke log beserta output EXPLAIN QUERY PLAN. Histogram
+latensi per (fungsi, statement) disimpan di memori proses; format_stats() /
+dump_stats() menampilkannya, dan di Linux `kill -USR1 <pid>` menulis dump JSON.
+
+collect() menjumlahkan statement, waktu dan baris untuk satu blok kode di
+thread yang sama (dipakai profiling.py per script run); selama blok itu
+koneksi juga terinstrumentasi walaupun PERIZINAN_QUERY_LOG tidak aktif.
+bind() meneruskan blok collect() itu ke query yang dijalankan di thread lain.
+
+Jika tidak aktif, database.get_connection() langsung memakai
+sqlite3.connect biasa sehingga overhead praktis nol.
+"""
+import json
+import logging
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+ENABLED = os.environ.get('PERIZINAN_QUERY_LOG', '').lower() not in ('', '0', 'false', 'no')
+SLOW_QUERY_MS = float(os.environ.get('PERIZINAN_SLOW_QUERY_MS', '500'))
+SLOW_QUERY_LOG = os.environ.get('PERIZINAN_SLOW_QUERY_LOG', 'slow_queries.log')
+QUERY_STATS_FILE = os.environ.get('PERIZINAN_QUERY_STATS', 'query_stats.json')
+
+# Batas atas bucket histogram latensi (ms); bucket terakhir tanpa batas
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# Panjang SQL yang dipakai sebagai kunci statistik / ditulis ke log
+SQL_KEY_LENGTH = 120
+SQL_LOG_LENGTH = 2000
+
+# Statement yang tidak perlu di-EXPLAIN
+_NO_EXPLAIN = ('CREATE', 'DROP', 'ALTER', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'VACUUM', 'ANALYZE')
+
+_MODULE_FILE = os.path.basename(__file__)
+
+_stats = {}  # (fungsi, sql) -> QueryStats
+_stats_lock = threading.Lock()
+
+# Total per blok collect() yang sedang berjalan di thread ini
+_local = threading.local()
+
+slow_logger = logging.getLogger('perizinan.slow_query')
+slow_logger.propagate = False
+
+
+class QueryStats:
+    """Histogram latensi dan total baris untuk satu (fungsi, statement)"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'buckets', 'pages')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.pages = {}
+
+    def add(self, elapsed_ms, rows, page):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        self.buckets[bisect_left(HISTOGRAM_BUCKETS_MS, elapsed_ms)] += 1
+        if page:
+            self.pages[page] = self.pages.get(page, 0) + 1
+
+    def percentile(self, fraction):
+        """Perkiraan persentil dari histogram (batas atas bucket, ms)"""
+        target = self.count * fraction
+        seen = 0
+        for limit, count in zip(HISTOGRAM_BUCKETS_MS + [self.max_ms], self.buckets):
+            seen += count
+            if seen >= target:
+                return min(limit, self.max_ms)
+        return self.max_ms
+
+
+class RunTotals:
+    """Jumlah statement, waktu (ms) dan baris selama satu blok collect()"""
+
+    __slots__ = ('statements', 'ms', 'rows', '_lock')
+
+    def __init__(self):
+        self.statements = 0
+        self.ms = 0.0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, elapsed_ms, rows):
+        # Bisa ditambah dari beberapa thread sekaligus (lihat bind())
+        with self._lock:
+            self.statements += 1
+            self.ms += elapsed_ms
+            self.rows += rows
+
+
+def _normalize_sql(sql):
+    return ' '.join(sql.split())
+
+
+def _caller():
+    """(fungsi database.py pemanggil, halaman pages/ yang sedang berjalan)"""
+    function = page = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        basename = os.path.basename(filename)
+        if basename == _MODULE_FILE:
+            pass
+        elif function is None and basename == 'database.py':
+            function = code.co_name
+        elif basename == 'app.py' or os.path.basename(os.path.dirname(filename)) == 'pages':
+            page = basename
+            break
+        frame = frame.f_back
+    return function or '?', page
+
+
+class _Statement:
+    """Statement yang sedang berjalan di satu cursor (selesai saat hasil habis)"""
+
+    __slots__ = ('sql', 'params', 'elapsed', 'rows', 'function', 'page')
+
+    def __init__(self, sql, params, elapsed, function, page):
+        self.sql = sql
+        self.params = params
+        self.elapsed = elapsed
+        self.rows = 0
+        self.function = function
+        self.page = page
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor yang mengukur waktu execute + fetch setiap statement.
+    SQLite mengerjakan SELECT saat baris di-fetch, jadi statement dicatat
+    ketika hasilnya habis, cursor dipakai untuk statement lain, atau ditutup.
+    Untuk INSERT / UPDATE / DELETE, rows = jumlah baris yang berubah.
+    """
+
+    _current = None
+
+    def _start(self, sql, params, fn, *args):
+        self._finish()
+        function, page = _caller()
+        start = time.perf_counter()
+        result = fn(*args)
+        self._current = _Statement(sql, params, time.perf_counter() - start, function, page)
+        if self.description is None:
+            self._current.rows = max(self.rowcount, 0)
+            self._finish()
+        return result
+
+    def _timed_fetch(self, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        if self._current is not None:
+            self._current.elapsed += time.perf_counter() - start
+        return result
+
+    def _finish(self):
+        statement = self._current
+        if statement is not None:
+            self._current = None
+            _record(statement, self.connection)
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, parameters, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._start(sql, None, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._start(sql_script, None, super().executescript, sql_script)
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._current is not None:
+            self._current.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed_fetch(super().fetchmany, size)
+        if self._current is not None:
+            self._current.rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._current is not None:
+            self._current.rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed_fetch(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._current is not None:
+            self._current.rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Koneksi yang membuat InstrumentedCursor dan mencatat statement yang belum selesai saat close"""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.database_path = database
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def close(self):
+        for cursor in list(self._cursors):
+            if isinstance(cursor, InstrumentedCursor):
+                cursor._finish()
+        super().close()
+
+
+def _record(statement, connection):
+    elapsed_ms = statement.elapsed * 1000
+    key = (statement.function, _normalize_sql(statement.sql)[:SQL_KEY_LENGTH])
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = QueryStats()
+        stats.add(elapsed_ms, statement.rows, statement.page)
+    totals = getattr(_local, 'totals', None)
+    if totals is not None:
+        totals.add(elapsed_ms, statement.rows)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _log_slow_query(statement, elapsed_ms, getattr(connection, 'database_path', None))
+
+
+def explain_query_plan(database_path, sql, params=None):
+    """Baris EXPLAIN QUERY PLAN (teks berindentasi) untuk sql, [] jika tidak bisa"""
+    if not database_path or _normalize_sql(sql).upper().startswith(_NO_EXPLAIN):
+        return []
+    conn = sqlite3.connect(database_path)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    # (id, parent, notused, detail) -> indentasi per level
+    depth = {0: 0}
+    lines = []
+    for id, parent, _, detail in rows:
+        depth[id] = depth.get(parent, 0) + 1
+        lines.append('  ' * depth[id] + detail)
+    return lines
+
+
+def _log_slow_query(statement, elapsed_ms, database_path):
+    if not slow_logger.handlers:
+        handler = logging.FileHandler(SLOW_QUERY_LOG, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(logging.INFO)
+    plan = explain_query_plan(database_path, statement.sql, statement.params)
+    lines = [
+        f"# {datetime.now().isoformat(timespec='seconds')} {elapsed_ms:.1f} ms rows={statement.rows}"
+        f" fungsi={statement.function} halaman={statement.page or '-'}",
+        _normalize_sql(statement.sql)[:SQL_LOG_LENGTH],
+    ]
+    if statement.params:
+        lines.append(f"params: {list(statement.params)[:20]!r}")
+    lines.extend(f"plan: {line}" for line in plan)
+    slow_logger.info('\n'.join(lines) + '\n')
+
+
+def get_stats():
+    """Statistik per (fungsi, statement), urut total waktu terbesar"""
+    with _stats_lock:
+        items = list(_stats.items())
+    result = []
+    for (function, sql), stats in items:
+        result.append({
+            'function': function,
+            'sql': sql,
+            'count': stats.count,
+            'total_ms': stats.total_ms,
+            'mean_ms': stats.total_ms / stats.count,
+            'p95_ms': stats.percentile(0.95),
+            'max_ms': stats.max_ms,
+            'rows': stats.rows,
+            'histogram': dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + ['>5000ms'], stats.buckets)),
+            'pages': dict(stats.pages),
+        })
+    result.sort(key=lambda item: -item['total_ms'])
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_stats(limit=20):
+    """Tabel teks statistik teratas (untuk log / terminal)"""
+    lines = [f"{'total ms':>10} {'n':>6} {'mean':>8} {'p95':>8} {'max':>8} {'baris':>9}  fungsi / statement"]
+    for item in get_stats()[:limit]:
+        lines.append(
+            f"{item['total_ms']:10.1f} {item['count']:6d} {item['mean_ms']:8.2f} {item['p95_ms']:8.1f}"
+            f" {item['max_ms']:8.1f} {item['rows']:9d}  {item['function']}: {item['sql'][:70]}"
+        )
+    return '\n'.join(lines)
+
+
+def dump_stats(path=None):
+    """Tulis statistik ke file JSON, return path"""
+    path = path or QUERY_STATS_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': datetime.now().isoformat(timespec='seconds'), 'stats': get_stats()}, f, indent=2)
+    return path
+
+
+def _install_signal_handler():
+    """SIGUSR1 -> dump_stats() (hanya bisa dari main thread, tidak ada di Windows)"""
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump_stats())
+    except ValueError:
+        pass
+
+
+def enable(slow_query_ms=None):
+    """Aktifkan instrumentasi (mis. dari halaman / benchmark)"""
+    global ENABLED, SLOW_QUERY_MS
+    ENABLED = True
+    if slow_query_ms is not None:
+        SLOW_QUERY_MS = slow_query_ms
+    _install_signal_handler()
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def active():
+    """True jika koneksi baru di thread ini perlu diinstrumentasi"""
+    return ENABLED or getattr(_local, 'totals', None) is not None
+
+
+@contextmanager
+def collect():
+    """Kumpulkan RunTotals untuk query di thread ini selama blok with"""
+    totals = RunTotals()
+    previous = getattr(_local, 'totals', None)
+    _local.totals = totals
+    try:
+        yield totals
+    finally:
+        _local.totals = previous
+
+
+def bind(fn):
+    """
+    Bungkus fn agar query-nya, walaupun dijalankan di thread lain (mis. pool
+    baca readpool.py), ikut dijumlahkan ke blok collect() thread pemanggil
+    """
+    totals = getattr(_local, 'totals', None)
+    if totals is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        previous = getattr(_local, 'totals', None)
+        _local.totals = totals
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.totals = previous
+    return bound
+
+
+def connect(database_path, **kwargs):
+    """sqlite3.connect yang terinstrumentasi"""
+    return sqlite3.connect(database_path, factory=InstrumentedConnection, **kwargs)
+
+
+if ENABLED:
+    _install_signal_handler()
@@ -0,0 +1,87 @@
+"""
+Hierarki KBLI (Klasifikasi Baku Lapangan Usaha Indonesia 2020).
+
+Kode KBLI 5 digit berjenjang lewat prefix:
+kategori (huruf, dari rentang golongan pokok) > golongan pokok (2 digit) >
+golongan (3 digit) > subgolongan (4 digit) > kelompok (5 digit).
+
+Kolom kbli di data perizinan berisi teks bebas ("47111", "KBLI 47.111 -
+Perdagangan ..."); kode pertama dinormalisasi lalu semua level disimpan di
+kolom perizinan (KBLI_COLUMNS) supaya roll-up per level cukup satu GROUP BY.
+"""
+import re
+
+# Kategori KBLI 2020: (kode, golongan pokok awal, golongan pokok akhir, nama)
+KBLI_KATEGORI = [
+    ('A', 1, 3, 'Pertanian, Kehutanan dan Perikanan'),
+    ('B', 5, 9, 'Pertambangan dan Penggalian'),
+    ('C', 10, 33, 'Industri Pengolahan'),
+    ('D', 35, 35, 'Pengadaan Listrik, Gas, Uap/Air Panas dan Udara Dingin'),
+    ('E', 36, 39, 'Pengelolaan Air, Pengelolaan Air Limbah, Pengelolaan dan Daur Ulang Sampah, dan Aktivitas Remediasi'),
+    ('F', 41, 43, 'Konstruksi'),
+    ('G', 45, 47, 'Perdagangan Besar dan Eceran; Reparasi dan Perawatan Mobil dan Sepeda Motor'),
+    ('H', 49, 53, 'Pengangkutan dan Pergudangan'),
+    ('I', 55, 56, 'Penyediaan Akomodasi dan Penyediaan Makan Minum'),
+    ('J', 58, 63, 'Informasi dan Komunikasi'),
+    ('K', 64, 66, 'Aktivitas Keuangan dan Asuransi'),
+    ('L', 68, 68, 'Real Estat'),
+    ('M', 69, 75, 'Aktivitas Profesional, Ilmiah dan Teknis'),
+    ('N', 77, 82, 'Aktivitas Penyewaan dan Sewa Guna Usaha Tanpa Hak Opsi, Ketenagakerjaan, Agen Perjalanan dan Penunjang Usaha Lainnya'),
+    ('O', 84, 84, 'Administrasi Pemerintahan, Pertahanan dan Jaminan Sosial Wajib'),
+    ('P', 85, 85, 'Pendidikan'),
+    ('Q', 86, 88, 'Aktivitas Kesehatan Manusia dan Aktivitas Sosial'),
+    ('R', 90, 93, 'Kesenian, Hiburan dan Rekreasi'),
+    ('S', 94, 96, 'Aktivitas Jasa Lainnya'),
+    ('T', 97, 98, 'Aktivitas Rumah Tangga sebagai Pemberi Kerja; Aktivitas yang Menghasilkan Barang dan Jasa oleh Rumah Tangga yang Digunakan untuk Memenuhi Kebutuhan Sendiri'),
+    ('U', 99, 99, 'Aktivitas Badan Internasional dan Badan Ekstra Internasional Lainnya'),
+]
+
+KBLI_KATEGORI_NAMES = {kode: nama for kode, _, _, nama in KBLI_KATEGORI}
+
+# Golongan pokok '01'..'99' -> kode kategori
+_KATEGORI_BY_GOLONGAN_POKOK = {
+    f'{division:02d}': kode
+    for kode, first, last, _ in KBLI_KATEGORI
+    for division in range(first, last + 1)
+}
+
+# Level hierarki (nama level, kolom perizinan), dari paling umum
+KBLI_LEVELS = [
+    ('kategori', 'kbli_kategori'),
+    ('golongan_pokok', 'kbli_golongan_pokok'),
+    ('golongan', 'kbli_golongan'),
+    ('subgolongan', 'kbli_subgolongan'),
+    ('kelompok', 'kbli_kelompok'),
+]
+KBLI_COLUMNS = [column for _, column in KBLI_LEVELS]
+
+# Kode 5 digit, boleh dengan titik setelah golongan pokok ("47.111")
+KBLI_PATTERN = re.compile(r'(?<!\d)(\d{2})\.?(\d{3})(?!\d)')
+
+
+def normalize_kbli(text):
+    """Kode KBLI 5 digit pertama di teks, None jika tidak ada"""
+    match = KBLI_PATTERN.search(text or '')
+    return match.group(1) + match.group(2) if match else None
+
+
+def kbli_kategori(golongan_pokok):
+    """Kode kategori (huruf) untuk golongan pokok 2 digit, None jika tidak dikenal"""
+    return _KATEGORI_BY_GOLONGAN_POKOK.get(golongan_pokok)
+
+
+def kbli_levels(text):
+    """Nilai kolom KBLI_COLUMNS untuk teks kbli; semua None jika kode tidak valid"""
+    kode = normalize_kbli(text)
+    if kode is None or kbli_kategori(kode[:2]) is None:
+        return [None] * len(KBLI_LEVELS)
+    return [kbli_kategori(kode[:2]), kode[:2], kode[:3], kode[:4], kode]
+
+
+def kbli_parent(level, kode):
+    """Kode induk satu level di atas (kategori untuk golongan pokok, prefix untuk lainnya)"""
+    if level == 'kategori':
+        return None
+    if level == 'golongan_pokok':
+        return kbli_kategori(kode)
+    return kode[:-1]
@@ -0,0 +1,213 @@
+"""
+Metrik operasional dalam format teks Prometheus.
+
+Aktif jika salah satu environment variable diset:
+    PERIZINAN_METRICS_FILE=...       file .prom yang ditulis ulang berkala
+                                     (mis. direktori textfile collector node_exporter)
+    PERIZINAN_METRICS_PORT=9464      endpoint HTTP lokal http://127.0.0.1:<port>/metrics
+    PERIZINAN_METRICS_INTERVAL=15    jeda tulis file (detik); jika gagal, error dicatat
+                                     (logging) dan jeda digandakan hingga METRICS_RETRY_MAX
+
+Counter (tulis / import, cache, rerun halaman) dinaikkan langsung dari
+database.py dan app.py; hanya operasi dict di bawah lock, dan langsung
+return jika metrik tidak aktif. Ukuran database / WAL dan jumlah data per
+sektor dibaca saat render (file atau scrape). Jumlah dan histogram latensi
+query diambil dari instrumentation.py, yang ikut diaktifkan.
+"""
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import instrumentation
+
+METRICS_FILE = os.environ.get('PERIZINAN_METRICS_FILE', '')
+METRICS_PORT = int(os.environ.get('PERIZINAN_METRICS_PORT', '0') or 0)
+METRICS_INTERVAL = float(os.environ.get('PERIZINAN_METRICS_INTERVAL', '15'))
+ENABLED = bool(METRICS_FILE or METRICS_PORT)
+
+PREFIX = 'perizinan'
+
+# Batas jeda tulis ulang (detik) setelah gagal berturut-turut (jeda digandakan)
+METRICS_RETRY_MAX = 600
+
+logger = logging.getLogger(__name__)
+
+_counters = {}  # (nama, label tuple) -> nilai
+_counters_lock = threading.Lock()
+_started = False
+_start_lock = threading.Lock()
+
+# (nama, tipe, help) counter yang dinaikkan dari kode aplikasi
+COUNTERS = [
+    ('write_runs_total', 'counter', "Jumlah pemanggilan operasi tulis per operasi"),
+    ('write_rows_total', 'counter', "Baris yang ditulis / diproses per operasi"),
+    ('write_seconds_total', 'counter', "Total detik operasi tulis per operasi"),
+    ('cache_requests_total', 'counter', "Lookup cache per cache dan hasil (hit / miss)"),
+    ('page_reruns_total', 'counter', "Script run per halaman Streamlit"),
+]
+
+
+def _add(name, labels, value=1):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _counters_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def record_write(operation, rows, seconds):
+    """Satu operasi tulis (insert / insert_many / dedup): baris dan durasinya"""
+    if not ENABLED:
+        return
+    labels = {'operation': operation}
+    _add('write_runs_total', labels)
+    _add('write_rows_total', labels, rows)
+    _add('write_seconds_total', labels, seconds)
+
+
+def cache_lookup(cache, hit):
+    """Satu lookup cache; hit rate = hit / (hit + miss)"""
+    _add('cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+def count_rerun(page):
+    _add('page_reruns_total', {'page': page})
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+    return f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}"
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+
+def _render_counters(lines):
+    with _counters_lock:
+        items = sorted(_counters.items())
+    for name, kind, help_text in COUNTERS:
+        samples = [(labels, value) for (key, labels), value in items if key == name]
+        if not samples:
+            continue
+        _header(lines, name, kind, help_text)
+        for labels, value in samples:
+            lines.append(_sample(name, labels, value))
+
+
+def _render_storage(lines):
+    import database  # database.py mengimpor modul ini
+    storage = database.get_storage_stats()
+    _header(lines, 'database_size_bytes', 'gauge', "Ukuran file database SQLite")
+    lines.append(_sample('database_size_bytes', (), storage['db_bytes']))
+    _header(lines, 'wal_size_bytes', 'gauge', "Ukuran file WAL (-wal), 0 jika tidak ada")
+    lines.append(_sample('wal_size_bytes', (), storage['wal_bytes']))
+    _header(lines, 'rows', 'gauge', "Jumlah data perizinan per sektor")
+    for sektor, count in storage['sektor_counts']:
+        lines.append(_sample('rows', (('sektor', sektor),), count))
+
+
+def _render_queries(lines):
+    """Jumlah statement dan histogram latensi per fungsi database.py (dari instrumentation)"""
+    per_function = {}
+    for item in instrumentation.get_stats():
+        entry = per_function.setdefault(item['function'], {
+            'count': 0, 'sum_ms': 0.0, 'rows': 0, 'buckets': [0] * (len(instrumentation.HISTOGRAM_BUCKETS_MS) + 1),
+        })
+        entry['count'] += item['count']
+        entry['sum_ms'] += item['total_ms']
+        entry['rows'] += item['rows']
+        for i, count in enumerate(item['histogram'].values()):
+            entry['buckets'][i] += count
+    if not per_function:
+        return
+
+    _header(lines, 'query_rows_total', 'counter', "Baris hasil / baris berubah per fungsi database.py")
+    for function, entry in sorted(per_function.items()):
+        lines.append(_sample('query_rows_total', (('function', function),), entry['rows']))
+
+    name = 'query_duration_seconds'
+    _header(lines, name, 'histogram', "Latensi statement SQL (execute + fetch) per fungsi database.py")
+    for function, entry in sorted(per_function.items()):
+        cumulative = 0
+        for limit_ms, count in zip(instrumentation.HISTOGRAM_BUCKETS_MS, entry['buckets']):
+            cumulative += count
+            lines.append(_sample(f'{name}_bucket', (('function', function), ('le', f"{limit_ms / 1000:g}")), cumulative))
+        lines.append(_sample(f'{name}_bucket', (('function', function), ('le', '+Inf')), entry['count']))
+        lines.append(_sample(f'{name}_sum', (('function', function),), f"{entry['sum_ms'] / 1000:.6f}"))
+        lines.append(_sample(f'{name}_count', (('function', function),), entry['count']))
+
+
+def render():
+    """Semua metrik dalam format teks Prometheus"""
+    lines = []
+    _render_storage(lines)
+    _render_queries(lines)
+    _render_counters(lines)
+    _header(lines, 'metrics_updated_timestamp_seconds', 'gauge', "Waktu render metrik (unix)")
+    lines.append(_sample('metrics_updated_timestamp_seconds', (), f"{time.time():.0f}"))
+    return '\n'.join(lines) + '\n'
+
+
+def write_file(path=None):
+    """Tulis metrik ke file secara atomik (file sementara + rename), return path"""
+    path = path or METRICS_FILE
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _write_loop():
+    delay = METRICS_INTERVAL
+    while True:
+        try:
+            write_file()
+        except Exception:
+            logger.exception("Gagal menulis metrik ke %s, dicoba lagi dalam %.0f detik", METRICS_FILE, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, max(METRICS_RETRY_MAX, METRICS_INTERVAL))
+            continue
+        delay = METRICS_INTERVAL
+        time.sleep(METRICS_INTERVAL)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start():
+    """Mulai penulis file / endpoint HTTP sekali per proses (aman dipanggil setiap rerun)"""
+    global _started
+    if not ENABLED or _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        instrumentation.enable()
+        if METRICS_FILE:
+            threading.Thread(target=_write_loop, name='metrics-file', daemon=True).start()
+        if METRICS_PORT:
+            server = ThreadingHTTPServer(('127.0.0.1', METRICS_PORT), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
@@ -1,13 +1,17 @@
 """
 Skrip migrasi database perizinan.db
 Tujuan: Update semua data lama yang menggunakan 'Seumur Hidup' 
-        menjadi 'Selama Pelaku Usaha Menjalankan Kegiatan Usaha'
+        menjadi 'Selama Pelaku Usaha Menjalankan Kegiatan Usaha',
+        lalu hubungkan data perizinan ke tabel pelaku_usaha (per NIB)
+        dan ubah kolom sektor / kategori / resiko / jenis ke kode tabel referensi
 
 Jalankan sekali saja setelah pull dari VPS:
     python migrate_db.py
 """
 import sqlite3
 
+import database
+
 DB_PATH = "perizinan.db"
 
 OLD_LIFETIME_VALUES = [
@@ -41,8 +45,24 @@ def migrate():
     else:
         print(f"\nTotal {total_updated} baris berhasil diupdate.")
 
+def migrate_pelaku_usaha():
+    # init_database membuat tabel pelaku_usaha (dan mengisinya saat pertama kali)
+    # serta memindahkan kolom kategori teks ke kode tabel referensi
+    database.DB_PATH = DB_PATH
+    database.init_database()
+    database.sync_pelaku_usaha()
+    
+    conn = sqlite3.connect(DB_PATH)
+    total = conn.execute("SELECT COUNT(*) FROM pelaku_usaha").fetchone()[0]
+    linked = conn.execute("SELECT COUNT(*) FROM perizinan WHERE pelaku_id IS NOT NULL").fetchone()[0]
+    conn.close()
+    
+    print(f"Total {total} pelaku usaha (per NIB), {linked} data perizinan terhubung.")
+
 if __name__ == "__main__":
     print("=== Migrasi Database Perizinan ===")
     print(f"DB: {DB_PATH}\n")
     migrate()
+    print()
+    migrate_pelaku_usaha()
     print("\nMigrasi selesai. Anda sekarang bisa push ke VPS.")
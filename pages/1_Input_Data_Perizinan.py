@@ -1,5 +1,6 @@
 import streamlit as st
-from database import insert_perizinan, search_field_suggestions
+from database import insert_perizinan, search_suggestions_batch, get_pelaku_by_nib, get_reference_options
+from referensi import KATEGORI_OPTIONS, JENIS_DOKUMEN_BY_KATEGORI
 from datetime import datetime
 
 # Konfigurasi page
@@ -9,30 +10,79 @@ st.set_page_config(
     layout="wide"
 )
 
-import os
+# Widget key -> field database untuk semua input autocomplete
+AUTOCOMPLETE_FIELDS = {
+    'nama_pengguna': 'nama_pengguna_layanan',
+    'nib': 'nib',
+    'alamat': 'alamat',
+    'pemilik': 'pemilik_pengurus',
+    'lokasi': 'lokasi_usaha',
+    'luas': 'luas_lahan_usaha',
+    'kbli': 'kbli',
+    'jenis': 'jenis_usaha',
+    'kapasitas': 'kapasitas',
+    'rencana_investasi': 'rencana_investasi',
+    'nomor_perm': 'nomor_permohonan',
+    'nomor_tgl_perm_rek': 'nomor_tanggal_permohonan_rekomendasi',
+    'nomor_tgl_rek': 'nomor_tanggal_rekomendasi',
+    'nomor_izin': 'nomor_izin',
+    'npwp': 'npwp',
+    'telepon': 'telepon',
+    'email': 'email',
+    'keterangan': 'keterangan',
+}
 
-# Load daftar sektor dari file
-def load_sektor():
-    # Get standard path relative to this file (pages/...) -> root is parent
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(current_dir)
-    file_path = os.path.join(root_dir, 'a.txt')
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        sektor_list = [line.strip() for line in f.readlines() if line.strip()]
-    return sektor_list
+def prime_suggestions():
+    """
+    Satu lookup batch untuk semua field autocomplete pada full rerun, hanya
+    untuk mengisi memo di database; fragment tiap field lalu membaca dari memo.
+    """
+    terms = {}
+    for key, field_name in AUTOCOMPLETE_FIELDS.items():
+        value = st.session_state.get(key, '')
+        if len(value) >= 2:
+            terms[field_name] = value
+    search_suggestions_batch(terms, limit=3)
+
+# Widget key -> field pelaku usaha yang bisa diisi otomatis dari NIB terdaftar
+PELAKU_PREFILL_FIELDS = {
+    'nama_pengguna': 'nama_pengguna_layanan',
+    'alamat': 'alamat',
+    'pemilik': 'pemilik_pengurus',
+    'npwp': 'npwp',
+    'telepon': 'telepon',
+    'email': 'email',
+}
+
+def apply_pelaku_prefill():
+    """Isi field pelaku usaha dari prefill tertunda (diset sebelum widget dibuat)"""
+    pelaku = st.session_state.pop('pelaku_prefill', None)
+    if pelaku:
+        for key, field_name in PELAKU_PREFILL_FIELDS.items():
+            if pelaku.get(field_name):
+                st.session_state[key] = pelaku[field_name]
+
+def show_pelaku_prefill(nib):
+    """Tawarkan isi otomatis data pelaku usaha jika NIB sudah terdaftar"""
+    pelaku = get_pelaku_by_nib(nib)
+    if pelaku and st.button(
+        f"Isi data pelaku usaha terdaftar: {pelaku['nama_pengguna_layanan'] or pelaku['nib']}",
+        key='prefill_pelaku'
+    ):
+        st.session_state['pelaku_prefill'] = pelaku
+        # Full rerun: field lain berada di fragment masing-masing
+        st.rerun()
+
+def apply_suggestion(key, suggestion):
+    """Callback klik suggestion: diset sebelum rerun, jadi widget langsung terisi"""
+    st.session_state[key] = suggestion
 
 # Fungsi untuk create text input dengan autocomplete
-def text_input_with_autocomplete(label, field_name, key, is_textarea=False, height=100):
+# Setiap field adalah fragment: mengetik / klik suggestion hanya menjalankan ulang field itu
+@st.fragment
+def text_input_with_autocomplete(label, field_name, key, is_textarea=False, height=100, lookup_pelaku=False):
     """Text input dengan inline autocomplete suggestions"""
     
-    # Check if there's a pending value to set
-    pending_key = f'{key}_pending'
-    if pending_key in st.session_state:
-        # Set the value before widget creation
-        st.session_state[key] = st.session_state[pending_key]
-        del st.session_state[pending_key]
-    
     # Display input field
     if is_textarea:
         current_value = st.text_area(label, key=key, height=height)
@@ -41,7 +91,7 @@ def text_input_with_autocomplete(label, field_name, key, is_textarea=False, heig
     
     # Show suggestions if user typed >= 2 characters
     if len(current_value) >= 2:
-        suggestions = search_field_suggestions(field_name, current_value, limit=3)
+        suggestions = search_suggestions_batch({field_name: current_value}, limit=3)[field_name]
         
         if suggestions:
             # Display suggestions right below the input
@@ -50,12 +100,64 @@ def text_input_with_autocomplete(label, field_name, key, is_textarea=False, heig
                 with cols[idx]:
                     # Truncate long text for button display
                     display_text = suggestion if len(suggestion) <= 35 else suggestion[:32] + "..."
-                    if st.button(f"✓ {display_text}", key=f'{key}_sugg_{idx}', width="stretch", type="secondary"):
-                        # Store suggestion in pending state
-                        st.session_state[pending_key] = suggestion
-                        st.rerun()
+                    st.button(
+                        f"✓ {display_text}", key=f'{key}_sugg_{idx}', width="stretch", type="secondary",
+                        on_click=apply_suggestion, args=(key, suggestion)
+                    )
     
-    return current_value
+    if lookup_pelaku and current_value:
+        show_pelaku_prefill(current_value)
+
+LIFETIME_LABEL = "Selama Pelaku Usaha Menjalankan Kegiatan Usaha"
+
+def collect_form_data():
+    """
+    Kumpulkan data form dari session_state.
+    Field di dalam fragment tidak mengembalikan nilai ke script utama,
+    jadi submit membaca semua nilai lewat key widget.
+    """
+    state = st.session_state
+    data = {field_name: state.get(key, '') for key, field_name in AUTOCOMPLETE_FIELDS.items()}
+
+    kategori_perizinan = state.get('kategori')
+    tanggal_permohonan = state.get('tgl_perm')
+    tanggal_izin = state.get('tgl_izin')
+    if state.get('seumur_hidup'):
+        masa_berlaku_value = LIFETIME_LABEL
+    else:
+        masa_berlaku_value = state.get('tgl_berlaku_hingga', '')
+
+    data.update({
+        'sektor': state.selected_sektor,
+        'kategori_perizinan': kategori_perizinan,
+        'resiko': state.get('resiko', ''),
+        'jenis_permohonan': state.get('jenis_perm', ''),
+        'tanggal_permohonan': str(tanggal_permohonan) if tanggal_permohonan else '',
+        'tanggal_izin': str(tanggal_izin) if tanggal_izin else '',
+        'masa_berlaku': masa_berlaku_value,
+        # Jenis dokumen hanya berlaku jika kategori dipilih
+        'jenis_dokumen': state.get('jenis_dok', '') if kategori_perizinan else '',
+    })
+    return data
+
+# Kategori + Jenis Dokumen sebagai satu fragment (opsi jenis dokumen tergantung kategori)
+@st.fragment
+def kategori_dokumen_input():
+    """Pilihan kategori perizinan dan jenis dokumen"""
+    kategori_perizinan = st.radio(
+        "Pilih Kategori Perizinan *",
+        options=KATEGORI_OPTIONS,
+        index=None,
+        key="kategori"
+    )
+    
+    # Jenis Dokumen - conditional based on kategori
+    if kategori_perizinan:
+        st.selectbox(
+            "Jenis Dokumen",
+            options=[''] + JENIS_DOKUMEN_BY_KATEGORI.get(kategori_perizinan, []),
+            key="jenis_dok"
+        )
 
 # Inisialisasi session state
 if 'sektor_confirmed' not in st.session_state:
@@ -69,8 +171,8 @@ if 'form_data' not in st.session_state:
 st.title("Input Data Perizinan")
 st.markdown("---")
 
-# Load daftar sektor
-sektor_list = load_sektor()
+# Load daftar sektor (tabel referensi, dimuat sekali per proses)
+sektor_list = get_reference_options('sektor', seeded=True)
 
 # Section 1: Pemilihan Sektor
 st.header("Langkah 1: Pilih Sektor")
@@ -107,73 +209,55 @@ else:
     # Section 2: Form Input Data
     st.header("Langkah 2: Input Data Perizinan")
     
-    # Input fields dengan autocomplete
-    nama_pengguna = text_input_with_autocomplete("Nama Pengguna Layanan", "nama_pengguna_layanan", "nama_pengguna")
-    nib = text_input_with_autocomplete("NIB", "nib", "nib")
-    alamat = text_input_with_autocomplete("Alamat", "alamat", "alamat", is_textarea=True, height=100)
-    pemilik_pengurus = text_input_with_autocomplete("Pemilik/Pengurus", "pemilik_pengurus", "pemilik")
-    lokasi_usaha = text_input_with_autocomplete("Lokasi Usaha", "lokasi_usaha", "lokasi")
-    luas_lahan = text_input_with_autocomplete("Luas Lahan Usaha", "luas_lahan_usaha", "luas")
-    kbli = text_input_with_autocomplete("KBLI", "kbli", "kbli")
-    jenis_usaha = text_input_with_autocomplete("Jenis Usaha", "jenis_usaha", "jenis")
-    
-    resiko = st.selectbox("Resiko", ["", "RENDAH", "MENENGAH RENDAH", "MENENGAH TINGGI", "TINGGI", "UMKU"], key="resiko")
-    
-    kapasitas = text_input_with_autocomplete("Kapasitas", "kapasitas", "kapasitas")
-    rencana_investasi = text_input_with_autocomplete("Rencana Nilai Investasi", "rencana_investasi", "rencana_investasi")
-    jenis_permohonan = st.selectbox("Jenis Permohonan", ["", "Baru", "Perpanjangan", "Perubahan"], key="jenis_perm")
-    nomor_permohonan = text_input_with_autocomplete("Nomor Permohonan", "nomor_permohonan", "nomor_perm")
-    tanggal_permohonan = st.date_input("Tanggal Permohonan", value=None, key="tgl_perm")
-    nomor_tanggal_permohonan_rekomendasi = text_input_with_autocomplete("No. & Tgl Permohonan Rekomendasi", "nomor_tanggal_permohonan_rekomendasi", "nomor_tgl_perm_rek")
-    nomor_tanggal_rekomendasi = text_input_with_autocomplete("No. & Tgl Rekomendasi", "nomor_tanggal_rekomendasi", "nomor_tgl_rek")
-    nomor_izin = text_input_with_autocomplete("Nomor Izin", "nomor_izin", "nomor_izin")
+    # Data pelaku usaha dari NIB terdaftar (diklik pada rerun sebelumnya)
+    apply_pelaku_prefill()
+    
+    # Isi memo suggestion semua field sekaligus; setiap fragment di bawah mengambil dari memo
+    prime_suggestions()
+    
+    text_input_with_autocomplete("Nama Pengguna Layanan", "nama_pengguna_layanan", "nama_pengguna")
+    text_input_with_autocomplete("NIB", "nib", "nib", lookup_pelaku=True)
+    text_input_with_autocomplete("Alamat", "alamat", "alamat", is_textarea=True, height=100)
+    text_input_with_autocomplete("Pemilik/Pengurus", "pemilik_pengurus", "pemilik")
+    text_input_with_autocomplete("Lokasi Usaha", "lokasi_usaha", "lokasi")
+    text_input_with_autocomplete("Luas Lahan Usaha", "luas_lahan_usaha", "luas")
+    text_input_with_autocomplete("KBLI", "kbli", "kbli")
+    text_input_with_autocomplete("Jenis Usaha", "jenis_usaha", "jenis")
+    
+    st.selectbox("Resiko", [""] + get_reference_options('resiko', seeded=True), key="resiko")
+    
+    text_input_with_autocomplete("Kapasitas", "kapasitas", "kapasitas")
+    text_input_with_autocomplete("Rencana Nilai Investasi", "rencana_investasi", "rencana_investasi")
+    st.selectbox("Jenis Permohonan", [""] + get_reference_options('jenis_permohonan', seeded=True), key="jenis_perm")
+    text_input_with_autocomplete("Nomor Permohonan", "nomor_permohonan", "nomor_perm")
+    st.date_input("Tanggal Permohonan", value=None, key="tgl_perm")
+    text_input_with_autocomplete("No. & Tgl Permohonan Rekomendasi", "nomor_tanggal_permohonan_rekomendasi", "nomor_tgl_perm_rek")
+    text_input_with_autocomplete("No. & Tgl Rekomendasi", "nomor_tanggal_rekomendasi", "nomor_tgl_rek")
+    text_input_with_autocomplete("Nomor Izin", "nomor_izin", "nomor_izin")
     col_u1, col_u2 = st.columns([1, 1])
     with col_u1:
-        tanggal_izin = st.date_input("Tanggal Izin", value=None, key="tgl_izin")
+        st.date_input("Tanggal Izin", value=None, key="tgl_izin")
     
     with col_u2:
-        LIFETIME_LABEL = "Selama Pelaku Usaha Menjalankan Kegiatan Usaha"
-        is_seumur_hidup = st.checkbox("Berlaku Selama Pelaku Usaha Beroperasi", value=False)
+        is_seumur_hidup = st.checkbox("Berlaku Selama Pelaku Usaha Beroperasi", value=False, key="seumur_hidup")
         if is_seumur_hidup:
             st.text_input("Berlaku Hingga", value=LIFETIME_LABEL, disabled=True, key="tgl_berlaku_display")
-            masa_berlaku_value = LIFETIME_LABEL
         else:
-            masa_berlaku_value = st.text_input(
+            st.text_input(
                 "Berlaku Hingga",
                 value="",
                 placeholder="Contoh: 2027-12-31 atau kosongkan",
                 key="tgl_berlaku_hingga"
             )
-    npwp = text_input_with_autocomplete("NPWP", "npwp", "npwp")
-    telepon = text_input_with_autocomplete("Telepon", "telepon", "telepon")
-    email = text_input_with_autocomplete("Email", "email", "email")
-    keterangan = text_input_with_autocomplete("Keterangan", "keterangan", "keterangan")
+    text_input_with_autocomplete("NPWP", "npwp", "npwp")
+    text_input_with_autocomplete("Telepon", "telepon", "telepon")
+    text_input_with_autocomplete("Email", "email", "email")
+    text_input_with_autocomplete("Keterangan", "keterangan", "keterangan")
     
     st.markdown("---")
     
-    # Kategori Perizinan
-    kategori_perizinan = st.radio(
-        "Pilih Kategori Perizinan *",
-        options=["Perizinan", "Perizinan Berusaha", "Non-Perizinan"],
-        index=None,
-        key="kategori"
-    )
-    
-    # Jenis Dokumen - conditional based on kategori
-    jenis_dokumen_options = {
-        'Perizinan': ['', 'Izin', 'Persetujuan'],
-        'Perizinan Berusaha': ['', 'UMKU', 'Sertifikat Standar', 'Izin'],
-        'Non-Perizinan': ['', 'Surat Keterangan', 'Laporan', 'Rekomendasi']
-    }
-    
-    if kategori_perizinan:
-        jenis_dokumen = st.selectbox(
-            "Jenis Dokumen",
-            options=jenis_dokumen_options.get(kategori_perizinan, ['']),
-            key="jenis_dok"
-        )
-    else:
-        jenis_dokumen = ''
+    # Kategori Perizinan dan Jenis Dokumen
+    kategori_dokumen_input()
     
     st.markdown("---")
     
@@ -183,42 +267,14 @@ else:
         submit_button = st.button("Simpan Data", type="primary", width="stretch")
     
     if submit_button:
+        data = collect_form_data()
+        
         # Validasi minimal
-        if not kategori_perizinan:
+        if not data['kategori_perizinan']:
             st.error("Kategori Perizinan harus dipilih.")
-        elif not nama_pengguna:
+        elif not data['nama_pengguna_layanan']:
             st.error("Nama Pengguna Layanan harus diisi.")
         else:
-            # Siapkan data untuk disimpan
-            data = {
-                'sektor': st.session_state.selected_sektor,
-                'kategori_perizinan': kategori_perizinan,
-                'nama_pengguna_layanan': nama_pengguna,
-                'nib': nib,
-                'alamat': alamat,
-                'pemilik_pengurus': pemilik_pengurus,
-                'lokasi_usaha': lokasi_usaha,
-                'luas_lahan_usaha': luas_lahan,
-                'kbli': kbli,
-                'jenis_usaha': jenis_usaha,
-                'resiko': resiko,
-                'kapasitas': kapasitas,
-                'jenis_permohonan': jenis_permohonan,
-                'nomor_permohonan': nomor_permohonan,
-                'tanggal_permohonan': str(tanggal_permohonan) if tanggal_permohonan else '',
-                'nomor_tanggal_permohonan_rekomendasi': nomor_tanggal_permohonan_rekomendasi,
-                'nomor_tanggal_rekomendasi': nomor_tanggal_rekomendasi,
-                'nomor_izin': nomor_izin,
-                'tanggal_izin': str(tanggal_izin) if tanggal_izin else '',
-                'masa_berlaku': masa_berlaku_value,
-                'npwp': npwp,
-                'telepon': telepon,
-                'email': email,
-                'keterangan': keterangan,
-                'jenis_dokumen': jenis_dokumen,
-                'rencana_investasi': rencana_investasi
-            }
-            
             try:
                 insert_perizinan(data)
                 st.success("Data perizinan berhasil disimpan.")
@@ -1,5 +1,5 @@
 import streamlit as st
-from database import get_all_perizinan
+from database import get_all_perizinan, get_snapshot_time
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -41,7 +41,10 @@ st.title("Monitoring Masa Berlaku Izin")
 st.markdown("---")
 
 # Load semua data
-data = get_all_perizinan()
+data = get_all_perizinan(from_snapshot=True)
+snapshot_time = get_snapshot_time()
+if snapshot_time:
+    st.caption(f"Data per {snapshot_time:%d/%m/%Y %H:%M} (salinan analitik, diperbarui berkala)")
 
 if data:
     # Convert to list of dicts
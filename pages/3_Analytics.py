@@ -8,6 +8,8 @@ import plotly.graph_objects as go
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import database as db
+import profiling
+from kbli import KBLI_LEVELS, KBLI_KATEGORI_NAMES
 
 st.set_page_config(page_title="Dashboard Analitik", page_icon="📊", layout="wide")
 
@@ -80,6 +82,9 @@ else:  # monthly
 
 # Get analytics data with period filter
 metrics = db.get_analytics_metrics(period=period_params)
+snapshot_time = db.get_snapshot_time()
+if snapshot_time:
+    st.caption(f"Data per {snapshot_time:%d/%m/%Y %H:%M} (salinan analitik, diperbarui berkala)")
 
 # Metric Cards
 st.subheader("Metrik Utama")
@@ -90,7 +95,7 @@ with col1:
     st.metric(
         label="Jumlah Pelaku Usaha",
         value=metrics['jumlah_pelaku'],
-        help="Jumlah pelaku usaha unik berdasarkan NIK"
+        help="Jumlah pelaku usaha unik; variasi nama / NIB yang terdeteksi duplikat dihitung satu"
     )
 
 with col2:
@@ -126,29 +131,30 @@ with col1:
         
         colors = [color_map.get(label, '#475569') for label in risk_labels]
         
-        fig_risk = go.Figure(data=[
-            go.Bar(
-                x=df_risk['Tingkat Resiko'],
-                y=df_risk['Jumlah'],
-                marker_color=colors,
-                text=df_risk['Jumlah'],
-                textposition='inside',
-                textfont=dict(color='white', size=14, family='Arial Black')
-            )
-        ])
+        with profiling.section('figure'):
+            fig_risk = go.Figure(data=[
+                go.Bar(
+                    x=df_risk['Tingkat Resiko'],
+                    y=df_risk['Jumlah'],
+                    marker_color=colors,
+                    text=df_risk['Jumlah'],
+                    textposition='inside',
+                    textfont=dict(color='white', size=14, family='Arial Black')
+                )
+            ])
         
-        fig_risk.update_layout(
-            title={
-                'text': 'Distribusi Tingkat Risiko',
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-            },
-            xaxis_title="Tingkat Risiko",
-            yaxis_title="Jumlah Usaha",
-            showlegend=False,
-            height=400
-        )
+            fig_risk.update_layout(
+                title={
+                    'text': 'Distribusi Tingkat Risiko',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+                },
+                xaxis_title="Tingkat Risiko",
+                yaxis_title="Jumlah Usaha",
+                showlegend=False,
+                height=400
+            )
         
         st.plotly_chart(fig_risk, width="stretch")
         
@@ -181,31 +187,32 @@ with col2:
             'Non-Perizinan': '#1e3a5f'        # Navy blue
         }
         
-        fig_kategori = px.pie(
-            df_kategori,
-            values='Jumlah',
-            names='Kategori',
-            color='Kategori',
-            color_discrete_map=color_discrete_map,
-            hole=0.4
-        )
+        with profiling.section('figure'):
+            fig_kategori = px.pie(
+                df_kategori,
+                values='Jumlah',
+                names='Kategori',
+                color='Kategori',
+                color_discrete_map=color_discrete_map,
+                hole=0.4
+            )
         
-        fig_kategori.update_traces(
-            textposition='inside',
-            textinfo='value',
-            textfont=dict(size=12)
-        )
+            fig_kategori.update_traces(
+                textposition='inside',
+                textinfo='value',
+                textfont=dict(size=12)
+            )
         
-        fig_kategori.update_layout(
-            title={
-                'text': 'Distribusi Kategori Perizinan',
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-            },
-            showlegend=True,
-            height=400
-        )
+            fig_kategori.update_layout(
+                title={
+                    'text': 'Distribusi Kategori Perizinan',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+                },
+                showlegend=True,
+                height=400
+            )
         
         st.plotly_chart(fig_kategori, width="stretch")
         
@@ -242,29 +249,30 @@ if metrics.get('jenis_dokumen_dist'):
     
     colors = [color_map.get(label, '#475569') for label in jenis_labels]
     
-    fig_jenis_dok = go.Figure(data=[
-        go.Bar(
-            x=df_jenis_dok['Jenis Dokumen'],
-            y=df_jenis_dok['Jumlah'],
-            marker_color=colors,
-            text=df_jenis_dok['Jumlah'],
-            textposition='inside',
-            textfont=dict(color='white', size=14, family='Arial Black')
-        )
-    ])
+    with profiling.section('figure'):
+        fig_jenis_dok = go.Figure(data=[
+            go.Bar(
+                x=df_jenis_dok['Jenis Dokumen'],
+                y=df_jenis_dok['Jumlah'],
+                marker_color=colors,
+                text=df_jenis_dok['Jumlah'],
+                textposition='inside',
+                textfont=dict(color='white', size=14, family='Arial Black')
+            )
+        ])
     
-    fig_jenis_dok.update_layout(
-        title={
-            'text': 'Distribusi Jenis Dokumen',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-        },
-        xaxis_title="Jenis Dokumen",
-        yaxis_title="Jumlah",
-        showlegend=False,
-        height=400
-    )
+        fig_jenis_dok.update_layout(
+            title={
+                'text': 'Distribusi Jenis Dokumen',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+            },
+            xaxis_title="Jenis Dokumen",
+            yaxis_title="Jumlah",
+            showlegend=False,
+            height=400
+        )
     
     st.plotly_chart(fig_jenis_dok, width='stretch')
     
@@ -292,31 +300,32 @@ with col1:
             'Jumlah': counts
         })
         
-        fig_time = go.Figure(data=[
-            go.Scatter(
-                x=df_time['Bulan'],
-                y=df_time['Jumlah'],
-                mode='lines+markers+text',
-                line=dict(color='#0369a1', width=3),
-                marker=dict(size=10, color='#0369a1'),
-                text=df_time['Jumlah'],
-                textposition='top center',
-                textfont=dict(size=12, color='white')
-            )
-        ])
+        with profiling.section('figure'):
+            fig_time = go.Figure(data=[
+                go.Scatter(
+                    x=df_time['Bulan'],
+                    y=df_time['Jumlah'],
+                    mode='lines+markers+text',
+                    line=dict(color='#0369a1', width=3),
+                    marker=dict(size=10, color='#0369a1'),
+                    text=df_time['Jumlah'],
+                    textposition='top center',
+                    textfont=dict(size=12, color='white')
+                )
+            ])
         
-        fig_time.update_layout(
-            title={
-                'text': 'Tren Pendaftaran per Bulan',
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-            },
-            xaxis_title="Bulan",
-            yaxis_title="Jumlah Pendaftaran",
-            showlegend=False,
-            height=400
-        )
+            fig_time.update_layout(
+                title={
+                    'text': 'Tren Pendaftaran per Bulan',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+                },
+                xaxis_title="Bulan",
+                yaxis_title="Jumlah Pendaftaran",
+                showlegend=False,
+                height=400
+            )
         
         st.plotly_chart(fig_time, width="stretch")
     else:
@@ -339,31 +348,32 @@ with col2:
             'Perpanjangan': '#0891b2' # Cyan
         }
         
-        fig_jenis = px.pie(
-            df_jenis,
-            values='Jumlah',
-            names='Jenis',
-            color='Jenis',
-            color_discrete_map=color_map,
-            hole=0.4
-        )
+        with profiling.section('figure'):
+            fig_jenis = px.pie(
+                df_jenis,
+                values='Jumlah',
+                names='Jenis',
+                color='Jenis',
+                color_discrete_map=color_map,
+                hole=0.4
+            )
         
-        fig_jenis.update_traces(
-            textposition='inside',
-            textinfo='value',
-            textfont=dict(size=12)
-        )
+            fig_jenis.update_traces(
+                textposition='inside',
+                textinfo='value',
+                textfont=dict(size=12)
+            )
         
-        fig_jenis.update_layout(
-            title={
-                'text': 'Distribusi Jenis Permohonan',
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-            },
-            showlegend=True,
-            height=400
-        )
+            fig_jenis.update_layout(
+                title={
+                    'text': 'Distribusi Jenis Permohonan',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+                },
+                showlegend=True,
+                height=400
+            )
         
         st.plotly_chart(fig_jenis, width="stretch")
     else:
@@ -380,34 +390,215 @@ if metrics['geo_distribution']:
         'Jumlah': counts
     })
     
-    fig_geo = go.Figure(data=[
-        go.Bar(
-            y=df_geo['Lokasi'],
-            x=df_geo['Jumlah'],
-            orientation='h',
-            marker_color='#0369a1',  # Sky blue
-            text=df_geo['Jumlah'],
-            textposition='inside',
-            textfont=dict(color='white', size=18, family='Arial Black'),
-            textangle=0
-        )
-    ])
+    with profiling.section('figure'):
+        fig_geo = go.Figure(data=[
+            go.Bar(
+                y=df_geo['Lokasi'],
+                x=df_geo['Jumlah'],
+                orientation='h',
+                marker_color='#0369a1',  # Sky blue
+                text=df_geo['Jumlah'],
+                textposition='inside',
+                textfont=dict(color='white', size=18, family='Arial Black'),
+                textangle=0
+            )
+        ])
     
-    fig_geo.update_layout(
-        title={
-            'text': 'Distribusi Geografis',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
-        },
-        xaxis_title="Jumlah Usaha",
-        yaxis_title="Lokasi Usaha",
-        showlegend=False,
-        height=400
-    )
+        fig_geo.update_layout(
+            title={
+                'text': 'Distribusi Geografis',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+            },
+            xaxis_title="Jumlah Usaha",
+            yaxis_title="Kabupaten / Kota",
+            showlegend=False,
+            height=400
+        )
     
     st.plotly_chart(fig_geo, width="stretch")
 else:
     st.info("Belum ada data geografis")
 
+# Row 4: Rencana Investasi (periode terpilih, dari kolom angka hasil parsing)
+st.subheader("Rencana Investasi")
+
+def format_rupiah(value):
+    """Format ringkas gaya Indonesia: Rp 1,5 M / Rp 750 Jt"""
+    value = value or 0
+    for threshold, suffix, digits in ((1e12, ' T', 1), (1e9, ' M', 1), (1e6, ' Jt', 0), (1, '', 0)):
+        if value >= threshold or threshold == 1:
+            text = f"{value / threshold:,.{digits}f}"
+            # Pemisah ribuan '.', desimal ','
+            text = text.replace(',', '_').replace('.', ',').replace('_', '.')
+            return f"Rp {text}{suffix}"
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Total Investasi", format_rupiah(metrics['investasi_total']))
+with col2:
+    st.metric("Median Investasi", format_rupiah(metrics['investasi_median']))
+with col3:
+    st.metric(
+        "Data dengan Nilai Investasi",
+        metrics['investasi_count'],
+        help="Jumlah data dengan rencana investasi dalam rupiah yang terbaca"
+    )
+
+if metrics['investasi_count']:
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        df_inv_sektor = pd.DataFrame(
+            metrics['investasi_by_sektor'], columns=['Sektor', 'Total', 'Median', 'Jumlah']
+        ).head(10)
+        
+        with profiling.section('figure'):
+            fig_inv_sektor = go.Figure(data=[
+                go.Bar(
+                    y=df_inv_sektor['Sektor'],
+                    x=df_inv_sektor['Total'],
+                    orientation='h',
+                    marker_color='#0369a1',
+                    text=[format_rupiah(v) for v in df_inv_sektor['Total']],
+                    textposition='inside',
+                    customdata=[format_rupiah(v) for v in df_inv_sektor['Median']],
+                    hovertemplate='%{y}<br>Total: %{text}<br>Median: %{customdata}<extra></extra>'
+                )
+            ])
+        
+            fig_inv_sektor.update_layout(
+                title={
+                    'text': 'Investasi per Sektor (Top 10)',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+                },
+                xaxis_title="Total Investasi (Rp)",
+                yaxis=dict(autorange='reversed'),
+                showlegend=False,
+                height=400
+            )
+        
+        st.plotly_chart(fig_inv_sektor, width="stretch")
+    
+    with col2:
+        df_inv_resiko = pd.DataFrame(
+            metrics['investasi_by_resiko'], columns=['Resiko', 'Total', 'Median', 'Jumlah']
+        )
+        df_inv_resiko['Total'] = df_inv_resiko['Total'].map(format_rupiah)
+        df_inv_resiko['Median'] = df_inv_resiko['Median'].map(format_rupiah)
+        st.markdown("**Investasi per Tingkat Resiko**")
+        st.dataframe(df_inv_resiko, width='stretch', hide_index=True)
+    
+    df_inv_trend = pd.DataFrame(
+        metrics['investasi_trend'], columns=['Bulan', 'Total', 'Median', 'Jumlah']
+    )
+    
+    with profiling.section('figure'):
+        fig_inv_trend = go.Figure(data=[
+            go.Bar(x=df_inv_trend['Bulan'], y=df_inv_trend['Total'], name='Total', marker_color='#0369a1'),
+            go.Scatter(
+                x=df_inv_trend['Bulan'], y=df_inv_trend['Median'], name='Median',
+                mode='lines+markers', yaxis='y2', line=dict(color='#0891b2', width=3)
+            )
+        ])
+    
+        fig_inv_trend.update_layout(
+            title={
+                'text': 'Tren Rencana Investasi per Bulan',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+            },
+            xaxis_title="Bulan",
+            yaxis=dict(title="Total Investasi (Rp)"),
+            yaxis2=dict(title="Median (Rp)", overlaying='y', side='right'),
+            height=400
+        )
+    
+    st.plotly_chart(fig_inv_trend, width="stretch")
+else:
+    st.info("Belum ada data rencana investasi pada periode ini")
+
+# Row 5: Distribusi KBLI (drill down kategori -> kelompok 5 digit)
+st.subheader("Distribusi KBLI")
+
+KBLI_LEVEL_LABELS = {
+    'kategori': 'Kategori',
+    'golongan_pokok': 'Golongan Pokok',
+    'golongan': 'Golongan',
+    'subgolongan': 'Subgolongan',
+    'kelompok': 'Kelompok',
+}
+
+def format_kbli(kode):
+    if kode in KBLI_KATEGORI_NAMES:
+        return f"{kode} - {KBLI_KATEGORI_NAMES[kode]}"
+    return kode
+
+@st.fragment
+def kbli_drilldown(rollup):
+    """Drill down level KBLI dari satu hasil roll-up (ganti level tidak query ulang)"""
+    levels = [level for level, _ in KBLI_LEVELS]
+    parent = None
+    chart_level = levels[-1]
+    
+    cols = st.columns(len(levels) - 1)
+    for col, level in zip(cols, levels[:-1]):
+        options = [kode for kode, _ in db.get_kbli_children(rollup, level, parent)]
+        with col:
+            selected = st.selectbox(
+                KBLI_LEVEL_LABELS[level],
+                options=['Semua'] + options,
+                format_func=format_kbli,
+                key=f"kbli_{level}"
+            )
+        if selected == 'Semua':
+            chart_level = level
+            break
+        parent = selected
+    
+    df_kbli = pd.DataFrame(
+        db.get_kbli_children(rollup, chart_level, parent), columns=['KBLI', 'Jumlah']
+    ).head(15)
+    df_kbli['KBLI'] = df_kbli['KBLI'].map(format_kbli)
+    
+    with profiling.section('figure'):
+        fig_kbli = go.Figure(data=[
+            go.Bar(
+                y=df_kbli['KBLI'],
+                x=df_kbli['Jumlah'],
+                orientation='h',
+                marker_color='#0369a1',
+                text=df_kbli['Jumlah'],
+                textposition='inside'
+            )
+        ])
+    
+        title = f"Perizinan per {KBLI_LEVEL_LABELS[chart_level]} KBLI"
+        if parent:
+            title += f" ({format_kbli(parent)})"
+        fig_kbli.update_layout(
+            title={
+                'text': title,
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 18, 'color': 'white', 'family': 'Arial'}
+            },
+            xaxis_title="Jumlah Perizinan",
+            yaxis=dict(autorange='reversed'),
+            showlegend=False,
+            height=max(400, 30 * len(df_kbli))
+        )
+    
+    st.plotly_chart(fig_kbli, width="stretch")
+
+kbli_rollup = db.get_kbli_rollup(period=period_params)
+if kbli_rollup['kategori']:
+    kbli_drilldown(kbli_rollup)
+else:
+    st.info("Belum ada data KBLI pada periode ini")
+
 st.caption("Dashboard Analitik DPMPTS Provinsi Lampung")
@@ -1,171 +1,44 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from io import BytesIO
-from database import get_all_perizinan, update_perizinan
+from io import BytesIO, StringIO
+from database import get_all_perizinan, update_perizinan, iter_perizinan, search_perizinan, get_reference_options
+from exporter import (
+    TABLE_COLUMNS, DB_COLUMNS, export_records, write_xlsx, write_csv, write_jsonl,
+    write_xlsx_by_sektor, write_zip_by_sektor
+)
 
 st.set_page_config(
     page_title="Tabel Data Perizinan",
     layout="wide"
 )
 
-# Indonesian month names
-BULAN_INDONESIA = {
-    1: 'Januari', 2: 'Februari', 3: 'Maret', 4: 'April',
-    5: 'Mei', 6: 'Juni', 7: 'Juli', 8: 'Agustus',
-    9: 'September', 10: 'Oktober', 11: 'November', 12: 'Desember'
-}
-
-import os
-
-def load_sektor():
-    # Get standard path relative to this file (pages/...) -> root is parent
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(current_dir)
-    file_path = os.path.join(root_dir, 'a.txt')
-    
-    with open(file_path, 'r') as f:
-        return [line.strip() for line in f if line.strip()]
-
-def get_jenis_dokumen_options(kategori):
-    """Get jenis dokumen options based on kategori perizinan"""
-    options = {
-        'Perizinan': ['', 'Izin', 'Persetujuan'],
-        'Perizinan Berusaha': ['', 'UMKU', 'Sertifikat Standar', 'Izin'],
-        'Non-Perizinan': ['', 'Surat Keterangan', 'Laporan', 'Rekomendasi']
-    }
-    return options.get(kategori, [''])
-
-def format_date(date_str):
-    """Convert YYYY-MM-DD to DD/MM/YY"""
-    if pd.isna(date_str) or not date_str:
-        return ''
-    try:
-        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
-        return dt.strftime('%d/%m/%y')
-    except:
-        return str(date_str)
-
-def format_date_full(date_str):
-    """Convert YYYY-MM-DD to DD/MM/YYYY"""
-    if pd.isna(date_str) or not date_str or str(date_str).strip() == '':
-        return '-'
-    try:
-        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
-        return dt.strftime('%d/%m/%Y')
-    except:
-        return str(date_str) if date_str else '-'
-
-def format_date_indonesian(date_str):
-    """Convert YYYY-MM-DD to 'DD Bulan YYYY' format"""
-    if pd.isna(date_str) or not date_str or str(date_str).strip() == '':
-        return ''
-    try:
-        dt = datetime.strptime(str(date_str).split(' ')[0], '%Y-%m-%d')
-        return f"{dt.day} {BULAN_INDONESIA[dt.month]} {dt.year}"
-    except:
-        return str(date_str) if date_str else ''
-
-def create_export_dataframe(df_source):
-    """Transform database dataframe to export format"""
-    export_data = []
-    
-    for idx, row in df_source.iterrows():
-        # Combine nomor_permohonan + tanggal_permohonan
-        nomor_perm = str(row['No. Permohonan']) if pd.notna(row['No. Permohonan']) and row['No. Permohonan'] else ''
-        tgl_perm = row['Tgl Permohonan']
-        tgl_perm_indo = format_date_indonesian(tgl_perm)
-        
-        if nomor_perm and tgl_perm_indo:
-            nomor_tgl_permohonan = f"{nomor_perm} ({tgl_perm_indo})"
-        elif nomor_perm:
-            nomor_tgl_permohonan = nomor_perm
-        else:
-            nomor_tgl_permohonan = '-'
-        
-        export_row = {
-            'No': idx + 1,
-            'ID': row['ID'],
-            'Sektor': row['Sektor'] if pd.notna(row['Sektor']) else '-',
-            'Jenis Perizinan': row['Kategori'] if pd.notna(row['Kategori']) else '-',
-            'Nama Pengguna Layanan': row['Nama Pengguna'] if pd.notna(row['Nama Pengguna']) else '-',
-            'NIB': row['NIB'] if pd.notna(row['NIB']) else '-',
-            'Alamat': row['Alamat'] if pd.notna(row['Alamat']) else '-',
-            'Pemilik/Pengurus': row['Pemilik/Pengurus'] if pd.notna(row['Pemilik/Pengurus']) else '-',
-            'Gender': '-',  # Not in database
-            'Lokasi Usaha': row['Lokasi Usaha'] if pd.notna(row['Lokasi Usaha']) else '-',
-            'Luas Lahan': row['Luas Lahan'] if pd.notna(row['Luas Lahan']) else '-',
-            'KBLI': row['KBLI'] if pd.notna(row['KBLI']) else '-',
-            'Jenis Usaha': row['Jenis Usaha'] if pd.notna(row['Jenis Usaha']) else '-',
-            'Risiko': row['Resiko'] if pd.notna(row['Resiko']) else '-',
-            'Rencana Nilai Investasi': row['Rencana Investasi'] if pd.notna(row['Rencana Investasi']) else '-',
-            'Kapasitas': row['Kapasitas'] if pd.notna(row['Kapasitas']) else '-',
-            'Jenis Permohonan': row['Jenis Permohonan'] if pd.notna(row['Jenis Permohonan']) else '-',
-            'Nomor & Tanggal Permohonan': nomor_tgl_permohonan,
-            'Nomor & Tanggal Permohonan Rekom': row['No. & Tgl Perm. Rekom'] if pd.notna(row['No. & Tgl Perm. Rekom']) else '-',
-            'Nomor & Tanggal Rekomendasi': row['No. & Tgl Rekomendasi'] if pd.notna(row['No. & Tgl Rekomendasi']) else '-',
-            'Nomor Izin': row['No. Izin'] if pd.notna(row['No. Izin']) else '-',
-            'Tanggal Izin': format_date_full(row['Tgl Izin']),
-            'Masa Berlaku': row['Masa Berlaku'] if str(row.get('Masa Berlaku', '')).lower().startswith('selama') else format_date_full(row['Masa Berlaku']),
-            'NPWP': row['NPWP'] if pd.notna(row['NPWP']) else '-',
-            'Telepon': row['Telepon'] if pd.notna(row['Telepon']) else '-',
-            'Email': row['Email'] if pd.notna(row['Email']) else '-',
-            'Jenis Dokumen': row['Jenis Dokumen'] if pd.notna(row['Jenis Dokumen']) else '-',
-            'Keterangan': row['Keterangan'] if pd.notna(row['Keterangan']) else '-',
-        }
-        export_data.append(export_row)
-    
-    return pd.DataFrame(export_data)
-
-def generate_excel_export(df_export):
-    """Generate Excel file with headers above column names"""
-    output = BytesIO()
-    
-    current_year = datetime.now().year
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Write data starting from row 5 (0-indexed: row 4)
-        # This leaves rows 0-3 for title headers
-        df_export.to_excel(writer, index=False, sheet_name='Data Perizinan', startrow=4)
-        
-        # Get the worksheet
-        worksheet = writer.sheets['Data Perizinan']
-        
-        # Write title headers in rows 1-3
-        worksheet.cell(row=1, column=1, value='DATA PENGGUNA LAYANAN PERIZINAN, PERIZINAN BERUSAHA, DAN NONPERIZINAN')
-        worksheet.cell(row=2, column=1, value='YANG DITERBITKAN DINAS PENANAMAN MODAL DAN PELAYANAN TERPADU SATU PINTU PROVINSI LAMPUNG')
-        worksheet.cell(row=3, column=1, value=f'TAHUN {current_year}')
-        # Row 4 is empty (intentional gap)
-        # Row 5 is column headers (written by to_excel)
-        # Row 6+ is data
-    
-    return output.getvalue()
+# Jumlah maksimum hasil pencarian global yang ditampilkan di tabel
+SEARCH_RESULT_LIMIT = 500
 
 st.title("Tabel Data Perizinan")
 st.markdown("---")
 
+# Pencarian global (nama, NIB, alamat, nomor izin, KBLI, keterangan, dll.)
+search_query = st.text_input(
+    "Cari di semua kolom",
+    placeholder="Contoh: nama usaha, alamat, nomor izin, KBLI, keterangan",
+    key="global_search"
+).strip()
+
 # Load data
-data = get_all_perizinan()
+if search_query:
+    data, search_total = search_perizinan(search_query, limit=SEARCH_RESULT_LIMIT)
+    if search_total > len(data):
+        st.caption(f"Menampilkan {len(data)} dari {search_total} hasil paling relevan. Perjelas kata kunci untuk mempersempit hasil.")
+else:
+    data = get_all_perizinan()
 
 if data:
-    columns = [
-        'ID', 'Sektor', 'Kategori', 'Nama Pengguna', 'NIB', 'Alamat',
-        'Pemilik/Pengurus', 'Lokasi Usaha', 'Luas Lahan', 'KBLI', 'Jenis Usaha',
-        'Resiko', 'Kapasitas', 'Rencana Investasi', 'Jenis Permohonan', 'No. Permohonan', 'Tgl Permohonan',
-        'No. & Tgl Perm. Rekom', 'No. & Tgl Rekomendasi',
-        'No. Izin', 'Tgl Izin', 'Masa Berlaku', 'NPWP',
-        'Telepon', 'Email', 'Keterangan', 'Jenis Dokumen', 'Created At', 'Updated At'
-    ]
+    columns = TABLE_COLUMNS
     
     # Database field names (for update)
-    db_columns = [
-        'id', 'sektor', 'kategori_perizinan', 'nama_pengguna_layanan', 'nib', 'alamat',
-        'pemilik_pengurus', 'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha',
-        'resiko', 'kapasitas', 'rencana_investasi', 'jenis_permohonan', 'nomor_permohonan', 'tanggal_permohonan',
-        'nomor_tanggal_permohonan_rekomendasi', 'nomor_tanggal_rekomendasi',
-        'nomor_izin', 'tanggal_izin', 'masa_berlaku', 'npwp',
-        'telepon', 'email', 'keterangan', 'jenis_dokumen', 'created_at', 'updated_at'
-    ]
+    db_columns = DB_COLUMNS
     
     # Create DataFrame
     df = pd.DataFrame(data, columns=columns)
@@ -178,11 +51,11 @@ if data:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        sektor_list = ['Semua'] + load_sektor()
+        sektor_list = ['Semua'] + get_reference_options('sektor')
         selected_sektor = st.selectbox("Sektor", options=sektor_list)
     
     with col2:
-        kategori_list = ['Semua', 'Perizinan', 'Perizinan Berusaha', 'Non-Perizinan']
+        kategori_list = ['Semua'] + get_reference_options('kategori_perizinan')
         selected_kategori = st.selectbox("Kategori Perizinan", options=kategori_list)
     
     with col3:
@@ -201,10 +74,10 @@ if data:
         df_filtered = df_filtered[df_filtered['Kategori'] == selected_kategori]
     
     if search_nama:
-        df_filtered = df_filtered[df_filtered['Nama Pengguna'].str.contains(search_nama, case=False, na=False)]
+        df_filtered = df_filtered[df_filtered['Nama Pengguna'].str.contains(search_nama, case=False, na=False, regex=False)]
     
     if search_nib:
-        df_filtered = df_filtered[df_filtered['NIB'].str.contains(search_nib, case=False, na=False)]
+        df_filtered = df_filtered[df_filtered['NIB'].str.contains(search_nib, case=False, na=False, regex=False)]
     
     st.markdown("---")
     
@@ -227,7 +100,7 @@ if data:
     # Use data_editor for editable table
     # Note: Jenis Dokumen options depend on Kategori Perizinan
     # All options combined since per-row conditional isn't supported
-    all_jenis_dokumen = ['', 'Izin', 'Persetujuan', 'UMKU', 'Sertifikat Standar', 'Surat Keterangan', 'Laporan', 'Rekomendasi']
+    all_jenis_dokumen = [''] + get_reference_options('jenis_dokumen', seeded=True)
     
     edited_df = st.data_editor(
         df_with_select,
@@ -241,10 +114,10 @@ if data:
             "Pilih": st.column_config.CheckboxColumn("Pilih", default=False),
             "No": st.column_config.NumberColumn("No", disabled=True, width="small"),
             "ID": st.column_config.NumberColumn("ID", disabled=True),
-            "Sektor": st.column_config.SelectboxColumn("Sektor", options=load_sektor()),
-            "Kategori": st.column_config.SelectboxColumn("Kategori", options=['Perizinan', 'Perizinan Berusaha', 'Non-Perizinan']),
-            "Resiko": st.column_config.SelectboxColumn("Resiko", options=['', 'RENDAH', 'MENENGAH RENDAH', 'MENENGAH TINGGI', 'TINGGI', 'UMKU']),
-            "Jenis Permohonan": st.column_config.SelectboxColumn("Jenis Permohonan", options=['', 'Baru', 'Perpanjangan', 'Perubahan']),
+            "Sektor": st.column_config.SelectboxColumn("Sektor", options=get_reference_options('sektor', seeded=True)),
+            "Kategori": st.column_config.SelectboxColumn("Kategori", options=get_reference_options('kategori_perizinan', seeded=True)),
+            "Resiko": st.column_config.SelectboxColumn("Resiko", options=[''] + get_reference_options('resiko', seeded=True)),
+            "Jenis Permohonan": st.column_config.SelectboxColumn("Jenis Permohonan", options=[''] + get_reference_options('jenis_permohonan', seeded=True)),
             "Jenis Dokumen": st.column_config.SelectboxColumn("Jenis Dokumen", options=all_jenis_dokumen),
             "Created At": st.column_config.TextColumn("Created At", disabled=True),
             "Updated At": st.column_config.TextColumn("Updated At", disabled=True),
@@ -317,14 +190,14 @@ if data:
         col_yes, col_no = st.columns(2)
         with col_yes:
             if st.button("Ya, Hapus", type="primary", use_container_width=True):
-                from database import delete_perizinan
-                deleted = 0
-                for row_id in st.session_state.delete_ids:
-                    try:
-                        delete_perizinan(int(row_id))
-                        deleted += 1
-                    except Exception as e:
-                        st.error(f"Gagal menghapus ID {row_id}: {e}")
+                from database import delete_perizinan_many
+                try:
+                    deleted, errors = delete_perizinan_many(st.session_state.delete_ids)
+                except Exception as e:
+                    deleted = 0
+                    errors = [(row_id, str(e)) for row_id in st.session_state.delete_ids]
+                for row_id, message in errors:
+                    st.error(f"Gagal menghapus ID {row_id}: {message}")
                 
                 st.session_state.confirm_delete = False
                 st.session_state.delete_ids = []
@@ -340,21 +213,91 @@ if data:
     
     # Action Buttons Row 2: Export
     st.subheader("Export Data")
+    if search_query:
+        # Tabel urut relevansi (maks. SEARCH_RESULT_LIMIT); export memuat semua hasil, urut terbaru
+        st.caption("Export memuat semua hasil pencarian, diurutkan dari data terbaru (kolom No mengikuti urutan export).")
     col1, col2, col3 = st.columns([2, 1, 2])
     
+    # Filter yang sama dengan tabel, dipakai query export langsung dari database
+    export_filters = {
+        'sektor': selected_sektor if selected_sektor != 'Semua' else None,
+        'kategori': selected_kategori if selected_kategori != 'Semua' else None,
+        'nama': search_nama or None,
+        'nib': search_nib or None,
+        'search': search_query or None,
+        'order': 'newest',
+    }
+    
+    def build_export(writer, text=False, encoding='utf-8'):
+        """Generate file export hanya saat tombol download diklik"""
+        records = export_records(iter_perizinan(**export_filters, from_snapshot=True))
+        if text:
+            output = StringIO()
+            writer(records, output)
+            return output.getvalue().encode(encoding)
+        output = BytesIO()
+        writer(records, output)
+        return output.getvalue()
+    
+    def build_sektor_export(writer):
+        """Satu pass terurut per sektor, satu sheet / file per sektor"""
+        output = BytesIO()
+        writer(iter_perizinan(**dict(export_filters, order='sektor'), from_snapshot=True), output)
+        return output.getvalue()
+    
     with col2:
         if len(df_filtered) > 0:
-            export_df = create_export_dataframe(df_filtered)
-            excel_data = generate_excel_export(export_df)
+            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M')
             
             st.download_button(
                 label="Export ke Excel",
-                data=excel_data,
-                file_name=f"export_perizinan_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.xlsx",
+                data=lambda: build_export(write_xlsx),
+                file_name=f"export_perizinan_{timestamp}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore",
+                use_container_width=True
+            )
+            
+            # Format teks untuk transfer antar instansi (lebih cepat dari Excel)
+            st.download_button(
+                label="Export ke CSV",
+                data=lambda: build_export(write_csv, text=True, encoding='utf-8-sig'),
+                file_name=f"export_perizinan_{timestamp}.csv",
+                mime="text/csv",
+                on_click="ignore",
+                use_container_width=True
+            )
+            
+            st.download_button(
+                label="Export ke JSON Lines",
+                data=lambda: build_export(write_jsonl, text=True),
+                file_name=f"export_perizinan_{timestamp}.jsonl",
+                mime="application/x-ndjson",
+                on_click="ignore",
+                use_container_width=True
+            )
+            
+            # Export terpartisi untuk kantor sektor
+            st.download_button(
+                label="Export per Sektor (Sheet)",
+                data=lambda: build_sektor_export(write_xlsx_by_sektor),
+                file_name=f"export_perizinan_per_sektor_{timestamp}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore",
+                use_container_width=True
+            )
+            
+            st.download_button(
+                label="Export per Sektor (ZIP)",
+                data=lambda: build_sektor_export(write_zip_by_sektor),
+                file_name=f"export_perizinan_per_sektor_{timestamp}.zip",
+                mime="application/zip",
+                on_click="ignore",
                 use_container_width=True
             )
 
+elif search_query:
+    st.info("Tidak ada data yang cocok dengan pencarian.")
 else:
     st.info("Belum ada data perizinan.")
 
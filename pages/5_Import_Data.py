@@ -1,82 +1,18 @@
 import streamlit as st
 import pandas as pd
-import re
+import io
 from datetime import datetime
-from database import insert_perizinan
+from database import import_perizinan, insert_perizinan_many, run_pelaku_dedup, get_reference_options
+from referensi import KATEGORI_OPTIONS
+from importer import (
+    PKL_MAPPING, PKL_HEADER_ROW, PKL_DATA_START_ROW, build_records, default_pkl_sheet,
+    read_csv_records, read_jsonl_records, split_pkl_sheet
+)
 
 # Page config is handled by app.py
 
-import os
-
-def load_sektor():
-    # Get standard path relative to this file (pages/...) -> root is parent
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(current_dir)
-    file_path = os.path.join(root_dir, 'a.txt')
-    
-    with open(file_path, 'r') as f:
-        return [line.strip() for line in f if line.strip()]
-
-def clean_nib(value):
-    """Strip 'NIB.' prefix from NIB values"""
-    if pd.isna(value):
-        return ''
-    text = str(value).strip()
-    # Remove common prefixes
-    text = re.sub(r'^NIB\.?\s*', '', text, flags=re.IGNORECASE)
-    return text
-
-def parse_nomor_tanggal(value):
-    """Parse combined 'Nomor Permohonan : XXX (DD Month YYYY)' format"""
-    if pd.isna(value) or not str(value).strip():
-        return '', ''
-    
-    text = str(value).strip()
-    nomor = ''
-    tanggal = ''
-    
-    # Extract nomor permohonan
-    nomor_match = re.search(r'(?:Nomor\s*Permohonan\s*:\s*)?([A-Z0-9\-]+)', text, re.IGNORECASE)
-    if nomor_match:
-        nomor = nomor_match.group(1)
-    
-    # Extract date in parentheses or after the nomor
-    date_match = re.search(r'\((\d{1,2}\s+\w+\s+\d{4})\)', text)
-    if date_match:
-        tanggal = date_match.group(1)
-    
-    return nomor, tanggal
-
-def parse_indonesian_date(date_str):
-    """Convert Indonesian date format to YYYY-MM-DD"""
-    if pd.isna(date_str) or not str(date_str).strip():
-        return ''
-    
-    text = str(date_str).strip()
-    
-    # Handle "Seumur Hidup" / Berlaku selamanya variations
-    lifetime_terms = ['seumur hidup', 'selamanya', 'selama perusahaan berdiri', 'selama beroperasi', 'selama pelaku usaha']
-    if any(term in text.lower() for term in lifetime_terms):
-        return 'Selama Pelaku Usaha Menjalankan Kegiatan Usaha'
-    
-    # Month mapping
-    months = {
-        'januari': '01', 'februari': '02', 'maret': '03', 'april': '04',
-        'mei': '05', 'juni': '06', 'juli': '07', 'agustus': '08',
-        'september': '09', 'oktober': '10', 'november': '11', 'desember': '12'
-    }
-    
-    # Try to parse "DD Month YYYY" format
-    match = re.search(r'(\d{1,2})\s+(\w+)\s+(\d{4})', text, re.IGNORECASE)
-    if match:
-        day = match.group(1).zfill(2)
-        month_name = match.group(2).lower()
-        year = match.group(3)
-        month = months.get(month_name, '01')
-        return f"{year}-{month}-{day}"
-    
-    return text  # Return as-is if can't parse
-
+# Jumlah baris Excel per transaksi import (progress diupdate per chunk)
+IMPORT_CHUNK_SIZE = 500
 
 # Main UI
 st.title("Import Data Perizinan (Format PKL)")
@@ -88,28 +24,67 @@ st.info("Nilai ini akan diterapkan untuk SEMUA data yang di-import.")
 
 col1, col2 = st.columns(2)
 with col1:
-    sektor_list = load_sektor()
+    sektor_list = get_reference_options('sektor', seeded=True)
     batch_sektor = st.selectbox("Sektor", options=sektor_list)
 with col2:
     batch_kategori = st.selectbox(
         "Kategori Perizinan",
-        options=["Perizinan", "Perizinan Berusaha", "Non-Perizinan"]
+        options=KATEGORI_OPTIONS
     )
 
 st.markdown("---")
 
 # Step 2: File Upload
 st.header("2. Upload File Excel")
-uploaded_file = st.file_uploader("Upload file Excel format PKL", type=['xlsx', 'xls'])
+uploaded_file = st.file_uploader(
+    "Upload file Excel format PKL, atau CSV / JSON Lines (layout export atau PKL)",
+    type=['xlsx', 'xls', 'csv', 'jsonl', 'ndjson']
+)
+
+is_text_format = uploaded_file is not None and uploaded_file.name.lower().endswith(('.csv', '.jsonl', '.ndjson'))
 
-if uploaded_file:
+if is_text_format:
+    # CSV / JSON Lines: header sudah di baris pertama, mapping otomatis
+    uploaded_file.seek(0)
+    text_stream = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        if uploaded_file.name.lower().endswith('.csv'):
+            processed_records = list(read_csv_records(text_stream, batch_sektor, batch_kategori))
+        else:
+            processed_records = list(read_jsonl_records(text_stream, batch_sektor, batch_kategori))
+    except (ValueError, KeyError) as e:
+        processed_records = []
+        st.error(f"Gagal membaca file: {e}")
+    finally:
+        text_stream.detach()
+    
+    if processed_records:
+        st.success(f"Ditemukan {len(processed_records)} baris data")
+        
+        preview_df = pd.DataFrame(processed_records)
+        st.dataframe(preview_df.head(100), width='stretch')
+        
+        st.markdown("---")
+        st.header("3. Import ke Database")
+        
+        col1, col2, col3 = st.columns([2, 1, 2])
+        with col2:
+            if st.button("Import Data", type="primary", width='stretch'):
+                try:
+                    success_count = insert_perizinan_many(processed_records)
+                    st.success(f"Berhasil mengimport {success_count} data!")
+                    # Cek duplikat pelaku usaha untuk batch baru
+                    run_pelaku_dedup()
+                except Exception as e:
+                    st.error(f"Gagal mengimport data: {str(e)}")
+
+elif uploaded_file:
     # Load Excel and select sheet
     xl = pd.ExcelFile(uploaded_file)
     sheet_names = xl.sheet_names
     
     # Try to find PKL sheet
-    pkl_sheets = [s for s in sheet_names if 'PKL' in s.upper()]
-    default_sheet = pkl_sheets[0] if pkl_sheets else sheet_names[0]
+    default_sheet = default_pkl_sheet(sheet_names)
     
     selected_sheet = st.selectbox(
         "Pilih Sheet",
@@ -127,19 +102,12 @@ if uploaded_file:
     
     col1, col2 = st.columns(2)
     with col1:
-        header_row = st.number_input("Baris Header (0-indexed)", min_value=0, max_value=10, value=4)
+        header_row = st.number_input("Baris Header (0-indexed)", min_value=0, max_value=10, value=PKL_HEADER_ROW)
     with col2:
-        data_start_row = st.number_input("Baris Data Pertama", min_value=1, max_value=15, value=5)
-    
-    # Extract headers and data
-    headers = list(df_raw.iloc[header_row])
-    df_data = df_raw.iloc[data_start_row:].copy()
-    df_data.columns = headers
-    df_data = df_data.reset_index(drop=True)
+        data_start_row = st.number_input("Baris Data Pertama", min_value=1, max_value=15, value=PKL_DATA_START_ROW)
     
-    # Filter out empty rows (where NO column is empty or NaN)
-    no_col = headers[0]  # First column is typically NO
-    df_data = df_data[df_data[no_col].notna() & (df_data[no_col].astype(str).str.strip() != '')]
+    # Extract headers and data (baris tanpa NO dibuang)
+    headers, df_data = split_pkl_sheet(df_raw, header_row, data_start_row)
     
     st.success(f"Ditemukan {len(df_data)} baris data")
     
@@ -153,29 +121,7 @@ if uploaded_file:
     st.header("4. Mapping Kolom")
     
     # Define expected PKL columns and their database mappings
-    pkl_mapping = {
-        'NAMA PENGGUNA LAYANAN': 'nama_pengguna_layanan',
-        'NIB': 'nib',
-        'ALAMAT PERUSAHAAN': 'alamat',
-        'PEMILIK / PENGURUS': 'pemilik_pengurus',
-        'LOKASI USAHA': 'lokasi_usaha',
-        'LUAS LAHAN USAHA': 'luas_lahan_usaha',
-        'KBLI': 'kbli',
-        'JENIS USAHA': 'jenis_usaha',
-        'RESIKO': 'resiko',
-        'KAPASITAS': 'kapasitas',
-        'JENIS PERMOHONAN': 'jenis_permohonan',
-        'NOMOR DAN TANGGAL PERMOHONAN': 'nomor_tanggal_permohonan',  # Will be split
-        'NOMOR DAN TANGGAL PERMOHONAN REKOMENDASI': 'nomor_tanggal_permohonan_rekomendasi',
-        'NOMOR DAN TANGGAL REKOMENDASI': 'nomor_tanggal_rekomendasi',
-        'NOMOR IZIN': 'nomor_izin',
-        'TANGGAL IZIN': 'tanggal_izin',
-        'MASA BERLAKU': 'masa_berlaku',
-        'NPWP': 'npwp',
-        'TELPON': 'telepon',
-        'EMAIL': 'email',
-        'KETERANGAN': 'keterangan'
-    }
+    pkl_mapping = PKL_MAPPING
     
     # Auto-match columns
     col_mapping = {}
@@ -207,62 +153,7 @@ if uploaded_file:
     # Step 5: Preview Processed Data
     st.header("5. Preview Data Final")
     
-    processed_records = []
-    
-    for idx, row in df_data.iterrows():
-        record = {
-            'sektor': batch_sektor,
-            'kategori_perizinan': batch_kategori,
-        }
-        
-        for db_field, excel_col in col_mapping.items():
-            value = row.get(excel_col, '')
-            
-            # Special processing
-            if db_field == 'nib':
-                value = clean_nib(value)
-            elif db_field == 'nomor_tanggal_permohonan':
-                nomor, tanggal = parse_nomor_tanggal(value)
-                record['nomor_permohonan'] = nomor
-                record['tanggal_permohonan'] = parse_indonesian_date(tanggal)
-                continue
-            elif db_field == 'nomor_tanggal_permohonan_rekomendasi':
-                # Keep as combined field
-                combined_value = str(value).strip() if pd.notna(value) else ''
-                if combined_value in ['nan', '-', 'NaN']:
-                    combined_value = ''
-                record['nomor_tanggal_permohonan_rekomendasi'] = combined_value
-                continue
-            elif db_field == 'nomor_tanggal_rekomendasi':
-                # Keep as combined field in nomor_tanggal_rekomendasi
-                combined_value = str(value).strip() if pd.notna(value) else ''
-                if combined_value in ['nan', '-', 'NaN']:
-                    combined_value = ''
-                record['nomor_tanggal_rekomendasi'] = combined_value
-                continue
-            elif db_field in ['tanggal_izin', 'masa_berlaku']:
-                value = parse_indonesian_date(value)
-            else:
-                value = str(value).strip() if pd.notna(value) else ''
-                if value in ['nan', '-', 'NaN']:
-                    value = ''
-            
-            record[db_field] = value
-        
-        # Ensure all required fields exist
-        all_fields = [
-            'nama_pengguna_layanan', 'nib', 'alamat', 'pemilik_pengurus',
-            'lokasi_usaha', 'luas_lahan_usaha', 'kbli', 'jenis_usaha', 'resiko',
-            'kapasitas', 'jenis_permohonan', 'nomor_permohonan', 'tanggal_permohonan',
-            'nomor_tanggal_permohonan_rekomendasi',
-            'nomor_tanggal_rekomendasi', 'nomor_izin', 'tanggal_izin',
-            'masa_berlaku', 'npwp', 'telepon', 'email', 'keterangan'
-        ]
-        for field in all_fields:
-            if field not in record:
-                record[field] = ''
-        
-        processed_records.append(record)
+    processed_records = build_records(df_data, col_mapping, batch_sektor, batch_kategori)
     
     # Display preview
     if processed_records:
@@ -294,22 +185,29 @@ if uploaded_file:
                 error_count = 0
                 errors = []
                 
-                for i, record in enumerate(processed_records):
+                # Per chunk satu transaksi; baris yang gagal dilewati dan dilaporkan per baris
+                total = len(processed_records)
+                for offset in range(0, total, IMPORT_CHUNK_SIZE):
+                    chunk = processed_records[offset:offset + IMPORT_CHUNK_SIZE]
                     try:
-                        insert_perizinan(record)
-                        success_count += 1
+                        inserted, failed = import_perizinan(chunk)
                     except Exception as e:
-                        error_count += 1
-                        errors.append(f"Row {i+1}: {str(e)}")
+                        inserted, failed = 0, [(i, str(e)) for i in range(len(chunk))]
+                    success_count += inserted
+                    error_count += len(failed)
+                    errors.extend(f"Row {offset + i + 1}: {message}" for i, message in failed)
                     
-                    progress.progress((i + 1) / len(processed_records))
-                    status.text(f"Processing {i+1}/{len(processed_records)}...")
+                    done = offset + len(chunk)
+                    progress.progress(done / total)
+                    status.text(f"Processing {done}/{total}...")
                 
                 progress.empty()
                 status.empty()
                 
                 if success_count > 0:
                     st.success(f"Berhasil mengimport {success_count} data!")
+                    # Cek duplikat pelaku usaha untuk batch baru
+                    run_pelaku_dedup()
                 
                 if error_count > 0:
                     st.error(f"Gagal mengimport {error_count} data")
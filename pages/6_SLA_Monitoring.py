@@ -1,5 +1,5 @@
 import streamlit as st
-from database import get_all_perizinan
+from database import get_all_perizinan, get_snapshot_time, get_reference_options
 import pandas as pd
 from datetime import datetime
 
@@ -31,23 +31,15 @@ def hitung_sla(tanggal_permohonan, tanggal_izin):
     except:
         return None
 
-import os
-
-def load_sektor():
-    # Get standard path relative to this file (pages/...) -> root is parent
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(current_dir)
-    file_path = os.path.join(root_dir, 'a.txt')
-    
-    with open(file_path, 'r') as f:
-        return [line.strip() for line in f if line.strip()]
-
 # Header
 st.title("Monitoring SLA Perizinan")
 st.markdown("---")
 
 # Load semua data
-data = get_all_perizinan()
+data = get_all_perizinan(from_snapshot=True)
+snapshot_time = get_snapshot_time()
+if snapshot_time:
+    st.caption(f"Data per {snapshot_time:%d/%m/%Y %H:%M} (salinan analitik, diperbarui berkala)")
 
 if data:
     columns = [
@@ -71,11 +63,11 @@ if data:
     col1, col2 = st.columns(2)
     
     with col1:
-        sektor_list = ['Semua'] + load_sektor()
+        sektor_list = ['Semua'] + get_reference_options('sektor')
         selected_sektor = st.selectbox("Sektor", options=sektor_list)
     
     with col2:
-        kategori_list = ['Semua', 'Perizinan', 'Perizinan Berusaha', 'Non-Perizinan']
+        kategori_list = ['Semua'] + get_reference_options('kategori_perizinan')
         selected_kategori = st.selectbox("Kategori Perizinan", options=kategori_list)
     
     # Apply filters
@@ -0,0 +1,55 @@
+import streamlit as st
+import pandas as pd
+from database import run_pelaku_dedup, get_pelaku_clusters, count_pelaku_usaha
+
+st.set_page_config(
+    page_title="Duplikat Pelaku Usaha",
+    layout="wide"
+)
+
+CLUSTERS_PER_PAGE = 20
+
+st.title("Duplikat Pelaku Usaha")
+st.markdown("---")
+
+st.write("""
+Data perizinan yang kemungkinan milik pelaku usaha yang sama (variasi penulisan nama
+seperti "PT. X" / "PT X Tbk", atau NIB dengan / tanpa prefix "NIB.") dikelompokkan
+di sini untuk direview. Jumlah Pelaku Usaha di Dashboard menghitung satu per kelompok.
+""")
+
+col1, col2, col3 = st.columns([1, 1, 3])
+with col1:
+    if st.button("Deteksi Data Baru", type="primary", width='stretch'):
+        with st.spinner("Mendeteksi duplikat..."):
+            processed = run_pelaku_dedup()
+        st.success(f"{processed} data baru diproses.")
+with col2:
+    if st.button("Hitung Ulang Semua", width='stretch'):
+        with st.spinner("Menghitung ulang seluruh data..."):
+            processed = run_pelaku_dedup(rebuild=True)
+        st.success(f"{processed} data diproses ulang.")
+
+_, total_clusters = get_pelaku_clusters(limit=0)
+
+col1, col2 = st.columns(2)
+with col1:
+    st.metric("Jumlah Pelaku Usaha", count_pelaku_usaha(), help="Setelah penggabungan duplikat")
+with col2:
+    st.metric("Kelompok Duplikat", total_clusters, help="Kelompok dengan lebih dari satu variasi nama / NIB")
+
+st.markdown("---")
+
+if total_clusters == 0:
+    st.info("Tidak ada kelompok duplikat. Klik Deteksi Data Baru setelah input / import data.")
+else:
+    total_pages = (total_clusters - 1) // CLUSTERS_PER_PAGE + 1
+    page = st.number_input("Halaman", min_value=1, max_value=total_pages, value=1)
+    clusters, _ = get_pelaku_clusters(limit=CLUSTERS_PER_PAGE, offset=(page - 1) * CLUSTERS_PER_PAGE)
+    st.caption(f"Halaman {page} dari {total_pages} ({total_clusters} kelompok)")
+
+    for cluster_id, rows in clusters:
+        df = pd.DataFrame(rows, columns=['ID', 'Sektor', 'Nama Pengguna', 'NIB', 'Tgl Permohonan'])
+        variants = df[['Nama Pengguna', 'NIB']].drop_duplicates()
+        with st.expander(f"{rows[0][2] or rows[0][3]} — {len(rows)} data, {len(variants)} variasi"):
+            st.dataframe(df, width='stretch', hide_index=True)
@@ -1,8 +1,8 @@
 import streamlit as st
-from database import init_database
+from database import ensure_database
 
 # Inisialisasi database (idempotent, safe to call)
-init_database()
+ensure_database()
 
 # Custom CSS
 st.markdown("""
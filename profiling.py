@@ -0,0 +1,159 @@
+"""
+Mode profiling per halaman: waktu script run, waktu query database, waktu
+membangun grafik (section 'figure') dan puncak memori Python.
+
+Aktif lewat environment variable PERIZINAN_PROFILE=1 atau query parameter
+?profile=1 di URL (per sesi browser). app.py menjalankan halaman di dalam
+run_page(); hasil tampil di panel sidebar dan ditambahkan sebagai satu baris
+JSON ke PERIZINAN_PROFILE_LOG (default page_profile.jsonl) untuk analisis tren.
+
+Waktu database diambil dari instrumentation.collect(). Puncak memori memakai
+tracemalloc, yang memperlambat script run; set PERIZINAN_PROFILE_MEMORY=0
+untuk mengukur waktu tanpa tracemalloc.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+import instrumentation
+
+PROFILE_ENV = os.environ.get('PERIZINAN_PROFILE', '').lower() not in ('', '0', 'false', 'no')
+PROFILE_MEMORY = os.environ.get('PERIZINAN_PROFILE_MEMORY', '1').lower() not in ('0', 'false', 'no')
+PROFILE_LOG = os.environ.get('PERIZINAN_PROFILE_LOG', 'page_profile.jsonl')
+
+# Jumlah profil terakhir per sesi yang ditampilkan di sidebar
+HISTORY_SIZE = 10
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class PageProfile:
+    """Hasil profiling satu script run halaman"""
+
+    def __init__(self, page):
+        self.page = page
+        self.timestamp = datetime.now().isoformat(timespec='seconds')
+        self.wall_ms = 0.0
+        self.db_ms = 0.0
+        self.db_statements = 0
+        self.db_rows = 0
+        self.sections = {}
+        self.peak_mb = None
+        self.status = 'ok'
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'page': self.page,
+            'status': self.status,
+            'wall_ms': round(self.wall_ms, 2),
+            'db_ms': round(self.db_ms, 2),
+            'db_statements': self.db_statements,
+            'db_rows': self.db_rows,
+            'sections_ms': {name: round(ms, 2) for name, ms in self.sections.items()},
+            'peak_mb': None if self.peak_mb is None else round(self.peak_mb, 2),
+        }
+
+
+def is_enabled():
+    """Profiling aktif untuk script run ini (env var atau ?profile=1)"""
+    if PROFILE_ENV:
+        return True
+    try:
+        return st.query_params.get('profile', '').lower() in ('1', 'true', 'yes')
+    except Exception:
+        return False
+
+
+@contextmanager
+def section(name):
+    """Tambahkan waktu blok with ke section name dari profil yang sedang berjalan"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        profile.sections[name] = profile.sections.get(name, 0.0) + elapsed_ms
+
+
+def _append_log(profile):
+    try:
+        with _log_lock, open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(profile.to_dict()) + '\n')
+    except OSError:
+        pass
+
+
+def _profile_run(page, fn):
+    """Jalankan fn dengan profiling, return PageProfile (exception diteruskan)"""
+    profile = PageProfile(page)
+    # tracemalloc global per proses: sesi lain yang sedang diprofil tidak diganggu
+    own_tracing = PROFILE_MEMORY and not tracemalloc.is_tracing()
+    if own_tracing:
+        tracemalloc.start()
+    _local.profile = profile
+    start = time.perf_counter()
+    with instrumentation.collect() as totals:
+        try:
+            fn()
+        except BaseException as e:
+            # st.rerun / st.stop juga lewat sini; profil tetap dicatat
+            profile.status = type(e).__name__
+            raise
+        finally:
+            profile.wall_ms = (time.perf_counter() - start) * 1000
+            _local.profile = None
+            profile.db_ms = totals.ms
+            profile.db_statements = totals.statements
+            profile.db_rows = totals.rows
+            if own_tracing:
+                profile.peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            _append_log(profile)
+            history = st.session_state.setdefault('_page_profiles', [])
+            history.append(profile.to_dict())
+            del history[:-HISTORY_SIZE]
+    return profile
+
+
+def render_sidebar():
+    """Panel profiling di sidebar: script run terakhir + riwayat sesi ini"""
+    history = st.session_state.get('_page_profiles', [])
+    if not history:
+        return
+    last = history[-1]
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.caption(f"{last['page']} ({last['timestamp']}, {last['status']})")
+        col1, col2 = st.columns(2)
+        col1.metric("Total", f"{last['wall_ms']:,.0f} ms")
+        col2.metric("Database", f"{last['db_ms']:,.0f} ms", help=f"{last['db_statements']} statement, {last['db_rows']:,} baris")
+        for name, ms in last['sections_ms'].items():
+            st.write(f"{name}: {ms:,.0f} ms")
+        if last['peak_mb'] is not None:
+            st.write(f"Puncak memori: {last['peak_mb']:,.1f} MB")
+        st.dataframe(
+            [{'halaman': p['page'], 'total ms': p['wall_ms'], 'db ms': p['db_ms'], 'MB': p['peak_mb']}
+             for p in reversed(history)],
+            hide_index=True,
+        )
+        st.caption(f"Log: {PROFILE_LOG}")
+
+
+def run_page(pg):
+    """pg.run(), dengan profiling dan panel sidebar jika mode profiling aktif"""
+    if not is_enabled():
+        pg.run()
+        return
+    _profile_run(pg.title, pg.run)
+    render_sidebar()
@@ -0,0 +1,132 @@
+"""
+Pool koneksi baca-saja + thread pool untuk query yang saling independen
+(agregat Dashboard).
+
+SQLite melepas GIL selama query berjalan, jadi beberapa query di koneksi
+terpisah benar-benar berjalan paralel; dengan journal_mode=WAL pembaca tidak
+saling menunggu maupun menunggu thread penulis (writer.py). Latensi
+sekumpulan query mendekati query yang paling lambat, bukan jumlahnya.
+
+Koneksi dibuat lewat connect(key) dan disimpan per key untuk dipakai ulang
+(maksimum satu koneksi idle per worker, untuk MAX_IDLE_KEYS key terakhir). run_all() menjalankan {nama: fn(cursor)}
+dan mengembalikan {nama: hasil}. Setiap query punya batas waktu sendiri sejak
+mulai berjalan; progress handler SQLite menghentikan statement yang melewatinya
+dan pemanggil menerima QueryTimeout.
+
+    PERIZINAN_READ_WORKERS=...       jumlah thread / koneksi paralel (default
+                                     jumlah CPU, maks. 4; 1 = berurutan di
+                                     thread pemanggil)
+    PERIZINAN_QUERY_TIMEOUT=30       batas waktu per query (detik)
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+READ_WORKERS = int(os.environ.get('PERIZINAN_READ_WORKERS', '0')) or min(4, os.cpu_count() or 1)
+QUERY_TIMEOUT = float(os.environ.get('PERIZINAN_QUERY_TIMEOUT', '30'))
+
+# Maksimum key (mis. generasi file snapshot) yang koneksi idle-nya disimpan
+MAX_IDLE_KEYS = 4
+
+# Progress handler SQLite dipanggil setiap sekian instruksi VM (cek timeout / batal)
+PROGRESS_STEPS = 10000
+
+
+class QueryTimeout(TimeoutError):
+    """Query di run_all() tidak selesai dalam batas waktu"""
+
+
+class ReadPool:
+    """
+    connect(key) membuat koneksi baca-saja (check_same_thread=False, karena
+    koneksi berpindah antar thread worker). key mis. path database, sehingga
+    koneksi ke file lain tidak tercampur.
+    """
+
+    def __init__(self, connect, workers=READ_WORKERS):
+        self._connect = connect
+        self.workers = workers
+        self._idle = OrderedDict()  # key -> [koneksi idle], key terakhir dipakai di akhir
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def run_all(self, key, tasks, timeout=QUERY_TIMEOUT):
+        """Jalankan {nama: fn(cursor)} di koneksi pool, return {nama: hasil} (urutan sama)"""
+        cancelled = threading.Event()
+        if self.workers <= 1 or len(tasks) <= 1:
+            return {name: self._run_task(key, name, fn, timeout, cancelled) for name, fn in tasks.items()}
+
+        executor = self._ensure_executor()
+        futures = {
+            name: executor.submit(self._run_task, key, name, fn, timeout, cancelled)
+            for name, fn in tasks.items()
+        }
+        try:
+            # Berhenti menunggu begitu satu query gagal
+            wait(futures.values(), return_when=FIRST_EXCEPTION)
+            for future in futures.values():
+                if future.done() and future.exception() is not None:
+                    future.result()
+            return {name: future.result() for name, future in futures.items()}
+        except BaseException:
+            # Satu query gagal: hentikan sisanya, hasil parsial tidak dipakai
+            cancelled.set()
+            for future in futures.values():
+                future.cancel()
+            raise
+
+    def close(self, match=None):
+        """Tutup koneksi idle (untuk key yang match(key) True), mis. sebelum file database dihapus / diganti"""
+        with self._lock:
+            keys = [key for key in self._idle if match is None or match(key)]
+            closing = [self._idle.pop(key) for key in keys]
+        for conns in closing:
+            for conn in conns:
+                conn.close()
+
+    def _run_task(self, key, name, fn, timeout, cancelled):
+        """fn(cursor) dengan batas waktu sejak query mulai (progress handler membatalkan statement)"""
+        conn = self._acquire(key)
+        deadline = time.monotonic() + timeout
+        conn.set_progress_handler(lambda: cancelled.is_set() or time.monotonic() > deadline, PROGRESS_STEPS)
+        cursor = conn.cursor()
+        try:
+            return fn(cursor)
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise QueryTimeout(f"Query '{name}' tidak selesai dalam {timeout:g} detik") from e
+            raise
+        finally:
+            cursor.close()
+            conn.set_progress_handler(None, 0)
+            self._release(key, conn)
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='perizinan-read')
+        return self._executor
+
+    def _acquire(self, key):
+        with self._lock:
+            conns = self._idle.get(key)
+            if conns:
+                return conns.pop()
+        return self._connect(key)
+
+    def _release(self, key, conn):
+        closing = [conn]
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(conns) < max(self.workers, 1):
+                conns.append(conn)
+                closing.pop()
+            while len(self._idle) > MAX_IDLE_KEYS:
+                closing.extend(self._idle.popitem(last=False)[1])
+        for conn in closing:
+            conn.close()
@@ -0,0 +1,45 @@
+"""
+Data referensi untuk kolom kategori perizinan.
+
+Sektor, kategori perizinan, resiko, jenis permohonan dan jenis dokumen
+disimpan di tabel referensi kecil (kode integer) dan perizinan hanya
+menyimpan kodenya. Daftar di sini adalah seed awal tabel-tabel tersebut;
+nilai lain yang muncul dari import / edit tabel ikut ditambahkan otomatis
+(seeded = 0: dipakai filter dan agregat, tidak ditawarkan di form / editor).
+"""
+import os
+
+SEKTOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'a.txt')
+
+KATEGORI_OPTIONS = ['Perizinan', 'Perizinan Berusaha', 'Non-Perizinan']
+
+RESIKO_OPTIONS = ['RENDAH', 'MENENGAH RENDAH', 'MENENGAH TINGGI', 'TINGGI', 'UMKU']
+
+JENIS_PERMOHONAN_OPTIONS = ['Baru', 'Perpanjangan', 'Perubahan']
+
+# Jenis dokumen yang berlaku per kategori perizinan
+JENIS_DOKUMEN_BY_KATEGORI = {
+    'Perizinan': ['Izin', 'Persetujuan'],
+    'Perizinan Berusaha': ['UMKU', 'Sertifikat Standar', 'Izin'],
+    'Non-Perizinan': ['Surat Keterangan', 'Laporan', 'Rekomendasi'],
+}
+
+JENIS_DOKUMEN_OPTIONS = list(dict.fromkeys(
+    jenis for options in JENIS_DOKUMEN_BY_KATEGORI.values() for jenis in options
+))
+
+
+def read_sektor_file():
+    """Daftar sektor dari a.txt"""
+    with open(SEKTOR_FILE, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+# Kolom perizinan -> (tabel referensi, kolom kode di perizinan, seed)
+REFERENCE_COLUMNS = {
+    'sektor': ('ref_sektor', 'sektor_id', read_sektor_file),
+    'kategori_perizinan': ('ref_kategori', 'kategori_id', lambda: KATEGORI_OPTIONS),
+    'resiko': ('ref_resiko', 'resiko_id', lambda: RESIKO_OPTIONS),
+    'jenis_permohonan': ('ref_jenis_permohonan', 'jenis_permohonan_id', lambda: JENIS_PERMOHONAN_OPTIONS),
+    'jenis_dokumen': ('ref_jenis_dokumen', 'jenis_dokumen_id', lambda: JENIS_DOKUMEN_OPTIONS),
+}
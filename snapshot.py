@@ -0,0 +1,256 @@
+"""
+Salinan baca-saja (snapshot) database untuk pembacaan berat: Analytics,
+export dan monitoring Masa Berlaku / SLA. Input, Tabel Data dan semua
+penulisan tetap memakai database utama.
+
+Salinan dibuat thread latar dengan online backup API SQLite
+(Connection.backup) per langkah PERIZINAN_SNAPSHOT_PAGES halaman, jadi
+database utama hanya dibaca sebentar per langkah. Setiap refresh menulis
+file generasi baru ({db}.snapshot-<pid>-<n>); file yang sudah dipakai tidak
+pernah berubah sehingga dibuka dengan mode=ro&immutable=1 (tanpa lock,
+tidak pernah membuat file kosong). Generasi lama baru dihapus satu siklus
+refresh setelah diganti, jadi sesi yang mengambil path-nya sesaat sebelum
+diganti masih bisa membukanya; koneksi yang sudah terbuka tetap membaca
+file itu sampai ditutup (di Windows penghapusan dicoba lagi sampai koneksi
+terakhirnya ditutup).
+
+current() hanya mengembalikan salinan yang umurnya tidak melebihi
+PERIZINAN_SNAPSHOT_MAX_AGE; jika belum ada atau refresh tertinggal,
+pemanggil membaca database utama. Batas basi tidak pernah dilanggar dan
+pembaca tidak pernah menunggu backup. Refresh dilewati jika database utama
+tidak berubah (PRAGMA data_version) atau salinan tidak dibaca sejak refresh
+terakhir.
+
+    PERIZINAN_SNAPSHOT=0                 nonaktif, semua baca dari database utama
+    PERIZINAN_SNAPSHOT_MAX_AGE=300       batas umur salinan (detik); refresh tiap setengahnya
+    PERIZINAN_SNAPSHOT_PAGES=1024        halaman per langkah backup
+    PERIZINAN_SNAPSHOT_SLEEP=0.005       jeda antar langkah (detik)
+"""
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.request import pathname2url
+
+ENABLED = os.environ.get('PERIZINAN_SNAPSHOT', '1').lower() not in ('0', 'false', 'no')
+MAX_AGE = float(os.environ.get('PERIZINAN_SNAPSHOT_MAX_AGE', '300'))
+PAGES = int(os.environ.get('PERIZINAN_SNAPSHOT_PAGES', '1024'))
+SLEEP = float(os.environ.get('PERIZINAN_SNAPSHOT_SLEEP', '0.005'))
+
+# Backup bertahap mulai ulang dari awal jika database utama berubah di tengah
+# jalan; setelah sekian kali salin dalam satu langkah (satu transaksi baca,
+# dengan WAL tidak memblokir penulis)
+MAX_RESTARTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def uri(path):
+    """URI SQLite baca-saja tanpa lock untuk file salinan; gagal dibuka jika file sudah dihapus"""
+    return f"file:{pathname2url(os.path.abspath(path))}?mode=ro&immutable=1"
+
+
+def _pid_alive(pid):
+    if os.name != 'posix':
+        # os.kill di Windows menghentikan proses; anggap masih berjalan
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class _Restarted(Exception):
+    pass
+
+
+class _Generation:
+    __slots__ = ('path', 'as_of')
+
+    def __init__(self, path, as_of):
+        self.path = path
+        self.as_of = as_of
+
+
+class Snapshot:
+    """
+    Salinan berkala satu database sumber. on_retire(path) dipanggil sebelum
+    file generasi lama dihapus (mis. untuk menutup koneksi idle ke file itu),
+    paling cepat max_age / 2 detik setelah generasi itu diganti.
+    """
+
+    def __init__(self, max_age=MAX_AGE, pages=PAGES, sleep=SLEEP, on_retire=None):
+        self.max_age = max_age
+        self.pages = pages
+        self.sleep = sleep
+        self._on_retire = on_retire
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._source = None
+        self._current = None
+        self._retired = []
+        self._used = False
+        self._seq = 0
+        self.refreshes = 0
+
+    def current(self, source):
+        """Path salinan source yang umurnya dalam batas, None jika harus membaca source langsung"""
+        if not ENABLED:
+            return None
+        with self._lock:
+            if source != self._source:
+                self._reset(source)
+            self._used = True
+            generation = self._current
+        self._ensure_thread()
+        if generation is not None and time.time() - generation.as_of <= self.max_age:
+            return generation.path
+        self._wake.set()
+        return None
+
+    def as_of(self, source):
+        """Waktu (unix) data salinan source yang dipakai current(), None jika tidak ada"""
+        with self._lock:
+            generation = self._current if source == self._source else None
+        if generation is None or time.time() - generation.as_of > self.max_age:
+            return None
+        return generation.as_of
+
+    def close(self):
+        """Lepas salinan (mis. sebelum file sumber dihapus / diganti); dibuat lagi saat current() berikutnya"""
+        with self._lock:
+            self._reset(None)
+        self._cleanup(force=True)
+        self._wake.set()
+
+    def _reset(self, source):
+        # Dipanggil dengan _lock
+        if self._current is not None:
+            self._retire(self._current.path)
+        self._current = None
+        self._source = source
+        if source is not None:
+            # Sisa proses lain yang sudah berhenti
+            for path in glob.glob(glob.escape(source) + '.snapshot-*-*'):
+                pid = path.rsplit('.snapshot-', 1)[1].split('-')[0]
+                if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                    # Tidak ada pembaca lagi; langsung dihapus
+                    self._retire(path, retired_at=0)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._loop, name='perizinan-snapshot', daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _loop(self):
+        conn = conn_source = version = None
+        while True:
+            self._wake.wait(self.max_age / 2)
+            self._wake.clear()
+            with self._lock:
+                source, used, generation = self._source, self._used, self._current
+                self._used = False
+            if conn is not None and conn_source != source:
+                conn.close()
+                conn = conn_source = None
+            if source is not None and used:
+                try:
+                    if conn is None:
+                        conn, conn_source, version = sqlite3.connect(source), source, None
+                    started = time.time()
+                    # data_version berubah jika koneksi lain commit sejak pembacaan sebelumnya
+                    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if generation is not None and data_version == version:
+                        self._publish(source, generation.path, started)
+                    else:
+                        path = self._backup(conn, source)
+                        version = data_version
+                        self._publish(source, path, started)
+                except Exception:
+                    logger.exception("Gagal memperbarui snapshot %s", source)
+            self._cleanup()
+
+    def _backup(self, conn, source):
+        """Salin source ke file generasi baru, return path-nya"""
+        with self._lock:
+            self._seq += 1
+            path = f"{source}.snapshot-{os.getpid()}-{self._seq}"
+        last_remaining = None
+        restarts = 0
+
+        def progress(status, remaining, total):
+            nonlocal last_remaining, restarts
+            # remaining naik lagi = backup mulai ulang karena sumber berubah
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > MAX_RESTARTS:
+                    raise _Restarted()
+            last_remaining = remaining
+
+        dest = sqlite3.connect(path)
+        try:
+            try:
+                conn.backup(dest, pages=self.pages, progress=progress, sleep=self.sleep)
+            except _Restarted:
+                conn.backup(dest)
+            # File salinan berdiri sendiri (tanpa -wal / -shm) untuk immutable=1
+            dest.execute("PRAGMA journal_mode=DELETE")
+        except BaseException:
+            dest.close()
+            self._remove(path)
+            raise
+        dest.close()
+        self.refreshes += 1
+        return path
+
+    def _publish(self, source, path, as_of):
+        with self._lock:
+            if source != self._source:
+                # Sumber diganti / close() selama backup
+                self._retire(path)
+                return
+            if self._current is not None and self._current.path != path:
+                self._retire(self._current.path)
+            self._current = _Generation(path, as_of)
+
+    def _retire(self, path, retired_at=None):
+        # Dipanggil dengan _lock
+        self._retired.append((path, time.time() if retired_at is None else retired_at))
+
+    def _cleanup(self, force=False):
+        """Hapus generasi yang sudah diganti minimal satu siklus refresh (semua jika force)"""
+        with self._lock:
+            retired, self._retired = self._retired, []
+        due = time.time() - self.max_age / 2
+        keep = []
+        for path, retired_at in retired:
+            if not force and retired_at > due:
+                keep.append((path, retired_at))
+                continue
+            if self._on_retire is not None:
+                self._on_retire(path)
+            if not self._remove(path):
+                keep.append((path, retired_at))
+        if keep:
+            with self._lock:
+                self._retired.extend(keep)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        return True
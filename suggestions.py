@@ -0,0 +1,136 @@
+"""
+Index autocomplete in-memory untuk form input.
+
+Setiap field punya satu SuggestionIndex: nilai distinct beserta frekuensinya,
+disimpan sebagai satu string lowercase yang diurutkan dari nilai paling
+sering muncul. Pencarian prefix / substring memakai str.find (C) dan berhenti
+begitu top-k ketemu, jadi tidak perlu scan + sort tabel per ketikan.
+"""
+import threading
+from bisect import bisect_right
+
+SEPARATOR = '\x00'
+
+
+class SuggestionIndex:
+    """Index nilai distinct satu field, diupdate in-place oleh insert/update/delete"""
+
+    # Rebuild urutan frekuensi jika perubahan sejak build > 10% jumlah nilai
+    REBUILD_RATIO = 0.1
+
+    def __init__(self, value_counts):
+        self._lock = threading.Lock()
+        self._counts = {}
+        for value, count in value_counts:
+            if value:
+                self._counts[value] = self._counts.get(value, 0) + count
+        self._rebuild()
+
+    def _rebuild(self):
+        ordered = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        self._values = [value for value, _ in ordered]
+        self._position = {value: idx for idx, value in enumerate(self._values)}
+        # _starts[i] = posisi SEPARATOR sebelum nilai ke-i di blob
+        self._starts = []
+        parts = []
+        pos = 0
+        for value in self._values:
+            self._starts.append(pos)
+            lowered = SEPARATOR + value.lower()
+            parts.append(lowered)
+            pos += len(lowered)
+        self._blob = ''.join(parts) + SEPARATOR
+        # Nilai baru yang belum digabung ke blob (digabung sekali saat search)
+        self._tail = []
+        self._tail_len = 0
+        self._changes = 0
+
+    def _touch(self, changes=1):
+        self._changes += changes
+        if self._changes > max(100, len(self._values) * self.REBUILD_RATIO):
+            self._rebuild()
+
+    def _flush(self):
+        if self._tail:
+            self._blob += ''.join(self._tail)
+            self._tail = []
+            self._tail_len = 0
+
+    def _add(self, value, count):
+        self._counts[value] = self._counts.get(value, 0) + count
+        if value not in self._position:
+            # Nilai baru ditaruh di akhir blob (frekuensi terendah); blob tidak
+            # disalin per nilai, potongannya dikumpulkan di _tail
+            self._position[value] = len(self._values)
+            self._starts.append(len(self._blob) - 1 + self._tail_len)
+            self._values.append(value)
+            chunk = value.lower() + SEPARATOR
+            self._tail.append(chunk)
+            self._tail_len += len(chunk)
+
+    def add(self, value, count=1):
+        if not value:
+            return
+        with self._lock:
+            self._add(value, count)
+            self._touch()
+
+    def add_many(self, value_counts):
+        """Tambah banyak nilai sekaligus ({nilai: jumlah}), rebuild paling banyak sekali"""
+        with self._lock:
+            changes = 0
+            for value, count in value_counts.items():
+                if value:
+                    self._add(value, count)
+                    changes += 1
+            if changes:
+                self._touch(changes)
+
+    def remove(self, value, count=1):
+        if not value:
+            return
+        with self._lock:
+            if value not in self._counts:
+                return
+            remaining = self._counts[value] - count
+            if remaining > 0:
+                self._counts[value] = remaining
+            else:
+                # Entri di blob dibiarkan, difilter saat search sampai rebuild
+                del self._counts[value]
+            self._touch()
+
+    def _scan(self, needle, limit, seen, results):
+        blob, starts, values, counts = self._blob, self._starts, self._values, self._counts
+        pos = blob.find(needle)
+        while pos >= 0 and len(results) < limit:
+            idx = bisect_right(starts, pos) - 1
+            value = values[idx]
+            if idx not in seen and value in counts:
+                seen.add(idx)
+                results.append(value)
+            # Lanjut dari nilai berikutnya, satu nilai cukup ditemukan sekali
+            if idx + 1 >= len(starts):
+                break
+            pos = blob.find(needle, starts[idx + 1])
+
+    def search(self, term, limit=3):
+        """Top-k: prefix match dulu, lalu substring match, masing-masing urut frekuensi"""
+        term = (term or '').lower()
+        if not term or SEPARATOR in term:
+            return []
+        with self._lock:
+            self._flush()
+            results = []
+            seen = set()
+            self._scan(SEPARATOR + term, limit, seen, results)
+            prefix_count = len(results)
+            if prefix_count < limit:
+                self._scan(term, limit, seen, results)
+            # Frekuensi terbaru (urutan blob bisa sedikit basi sebelum rebuild)
+            head = sorted(results[:prefix_count], key=lambda v: -self._counts[v])
+            tail = sorted(results[prefix_count:], key=lambda v: -self._counts[v])
+            return head + tail
+
+    def __len__(self):
+        return len(self._counts)
@@ -0,0 +1,165 @@
+"""
+Transfer data perizinan antar instansi dalam format CSV / JSON Lines
+(export juga bisa ke XLSX streaming).
+
+Export dan import berjalan streaming (memori konstan), sehingga bisa
+dipakai untuk memindahkan seluruh registry sekaligus.
+
+Contoh:
+    python transfer.py export registry.csv
+    python transfer.py export registry.jsonl --sektor "DINAS PERKEBUNAN PROVINSI LAMPUNG"
+    python transfer.py export-sektor per_sektor.xlsx   # satu sheet per sektor
+    python transfer.py export-sektor per_sektor.zip    # satu file per sektor
+    python transfer.py export-delta sync.jsonl --consumer bps   # hanya perubahan sejak export terakhir
+    python transfer.py import registry.csv
+    python transfer.py import pkl.csv --sektor "..." --kategori "Perizinan Berusaha"
+    python transfer.py dedup            # deteksi duplikat pelaku usaha untuk data baru
+    python transfer.py dedup --rebuild  # hitung ulang seluruh cluster duplikat
+"""
+import argparse
+import os
+from itertools import islice
+
+import database
+from exporter import (
+    export_records, write_csv, write_jsonl, write_xlsx,
+    write_xlsx_by_sektor, write_zip_by_sektor, write_delta_jsonl
+)
+from importer import read_csv_records, read_jsonl_records
+
+BATCH_SIZE = 1000
+
+def detect_format(path, fmt=None):
+    """Tentukan format dari argumen --format atau ekstensi file"""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.xlsx':
+        return 'xlsx'
+    return 'csv'
+
+def export_file(path, fmt=None, sektor=None):
+    """Export registry ke file CSV / JSON Lines / XLSX, return jumlah baris"""
+    fmt = detect_format(path, fmt)
+    records = export_records(database.iter_perizinan(sektor=sektor, batch_size=BATCH_SIZE))
+
+    if fmt == 'jsonl':
+        with open(path, 'w', encoding='utf-8') as f:
+            return write_jsonl(records, f)
+    if fmt == 'xlsx':
+        with open(path, 'wb') as f:
+            return write_xlsx(records, f)
+    # utf-8-sig supaya file langsung terbaca benar di Excel
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        return write_csv(records, f)
+
+def export_sektor_file(path, kategori=None):
+    """Export satu pass terurut sektor ke XLSX multi-sheet atau ZIP, return {sektor: jumlah}"""
+    rows = database.iter_perizinan(kategori=kategori, order='sektor', batch_size=BATCH_SIZE)
+    writer = write_zip_by_sektor if path.lower().endswith('.zip') else write_xlsx_by_sektor
+    with open(path, 'wb') as f:
+        return writer(rows, f)
+
+def export_delta_file(path, consumer):
+    """
+    Export perubahan sejak watermark consumer (upsert + tombstone) ke JSON Lines.
+    Watermark baru disimpan setelah file selesai ditulis. Return (upsert, delete).
+    """
+    watermark = database.get_export_watermark(consumer)
+    new_watermark = dict(watermark)
+    deleted = database.get_deleted_since(watermark['deleted_seq'])
+    if deleted:
+        new_watermark['deleted_seq'] = deleted[-1][0]
+
+    def tracked_rows():
+        # Baris terurut (updated_at, id), baris terakhir = watermark baru
+        for row in database.iter_perizinan_changes(watermark, batch_size=BATCH_SIZE):
+            new_watermark['updated_at'] = row[-1]
+            new_watermark['last_id'] = row[0]
+            yield row
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        counts = write_delta_jsonl(export_records(tracked_rows()), [d[1] for d in deleted], f)
+    os.replace(tmp_path, path)
+
+    database.save_export_watermark(consumer, new_watermark)
+    return counts
+
+def import_file(path, fmt=None, sektor=None, kategori=None):
+    """Import file CSV / JSON Lines ke database per batch, return jumlah baris"""
+    fmt = detect_format(path, fmt)
+    total = 0
+
+    if fmt == 'jsonl':
+        f = open(path, 'r', encoding='utf-8')
+        records = read_jsonl_records(f, sektor, kategori)
+    else:
+        f = open(path, 'r', encoding='utf-8-sig', newline='')
+        records = read_csv_records(f, sektor, kategori)
+
+    with f:
+        while True:
+            batch = list(islice(records, BATCH_SIZE))
+            if not batch:
+                break
+            total += database.insert_perizinan_many(batch)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Transfer data perizinan (CSV / JSON Lines)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_export = sub.add_parser('export', help="Export registry ke file")
+    p_export.add_argument('path')
+    p_export.add_argument('--format', choices=['csv', 'jsonl', 'xlsx'])
+    p_export.add_argument('--sektor')
+
+    p_sektor = sub.add_parser('export-sektor', help="Export per sektor (.xlsx multi-sheet atau .zip)")
+    p_sektor.add_argument('path')
+    p_sektor.add_argument('--kategori')
+
+    p_delta = sub.add_parser('export-delta', help="Export perubahan sejak export terakhir consumer (JSON Lines)")
+    p_delta.add_argument('path')
+    p_delta.add_argument('--consumer', required=True, help="Nama consumer / instansi penerima")
+
+    p_import = sub.add_parser('import', help="Import file ke registry")
+    p_import.add_argument('path')
+    p_import.add_argument('--format', choices=['csv', 'jsonl'])
+    p_import.add_argument('--sektor', help="Sektor batch (wajib untuk file format PKL)")
+    p_import.add_argument('--kategori', help="Kategori batch (wajib untuk file format PKL)")
+    p_import.add_argument('--no-dedup', action='store_true', help="Lewati deteksi duplikat pelaku usaha setelah import")
+
+    p_dedup = sub.add_parser('dedup', help="Deteksi duplikat pelaku usaha")
+    p_dedup.add_argument('--rebuild', action='store_true', help="Hitung ulang seluruh tabel, bukan hanya data baru")
+
+    args = parser.parse_args()
+    database.init_database()
+
+    if args.command == 'export':
+        count = export_file(args.path, args.format, args.sektor)
+        print(f"Berhasil mengexport {count} data ke {args.path}")
+    elif args.command == 'export-sektor':
+        counts = export_sektor_file(args.path, args.kategori)
+        for sektor, count in counts.items():
+            print(f"  {sektor}: {count} data")
+        print(f"Berhasil mengexport {sum(counts.values())} data ({len(counts)} sektor) ke {args.path}")
+    elif args.command == 'export-delta':
+        upserts, deletes = export_delta_file(args.path, args.consumer)
+        print(f"Delta untuk '{args.consumer}': {upserts} data baru/berubah, {deletes} data terhapus -> {args.path}")
+    elif args.command == 'import':
+        count = import_file(args.path, args.format, args.sektor, args.kategori)
+        print(f"Berhasil mengimport {count} data dari {args.path}")
+        if not args.no_dedup:
+            database.run_pelaku_dedup()
+            print(f"Jumlah pelaku usaha (setelah penggabungan duplikat): {database.count_pelaku_usaha()}")
+    elif args.command == 'dedup':
+        processed = database.run_pelaku_dedup(rebuild=args.rebuild)
+        clusters, total = database.get_pelaku_clusters(limit=0)
+        print(f"Diproses {processed} data, {total} kelompok duplikat untuk direview")
+        print(f"Jumlah pelaku usaha (setelah penggabungan duplikat): {database.count_pelaku_usaha()}")
+
+if __name__ == "__main__":
+    main()
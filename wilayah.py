@@ -0,0 +1,76 @@
+"""
+Kanonikalisasi lokasi usaha ke kode kabupaten / kota (Kemendagri) Provinsi Lampung.
+
+lokasi_usaha diisi bebas ("Kab. Lampung Selatan", "LAMPUNG SELATAN",
+"Natar, Lamsel"); kodenya (mis. '18.03') disimpan di perizinan.lokasi_kode
+supaya distribusi geografis cukup GROUP BY kode pendek.
+
+Gazetteer ada di wilayah.csv: nama / singkatan kabupaten-kota (alias) dan
+nama kecamatan / kota kecil. Jika teks menyebut beberapa wilayah, nama
+kabupaten-kota menang atas kecamatan, lalu yang disebut paling akhir
+(alamat biasanya ditulis dari wilayah kecil ke besar).
+"""
+import csv
+import os
+import re
+from functools import lru_cache
+
+WILAYAH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wilayah.csv')
+
+# Kode untuk lokasi yang terisi tapi tidak dikenali gazetteer (lokasi kosong = NULL)
+KODE_TIDAK_DIKENALI = ''
+
+
+def _normalize(text):
+    """Uppercase, tanda baca jadi spasi"""
+    return ' '.join(re.sub(r'[^0-9A-Z]+', ' ', (text or '').upper()).split())
+
+
+def load_gazetteer(path=WILAYAH_FILE):
+    """
+    Baca wilayah.csv.
+    Return (nama per kode, {frasa ternormalisasi: (kode, frasa nama kab/kota?)}).
+    """
+    names = {}
+    phrases = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            kode = row['kode'].strip()
+            names[kode] = row['nama'].strip()
+            for phrase in [row['nama']] + row['alias'].split('|'):
+                if phrase.strip():
+                    phrases[_normalize(phrase)] = (kode, True)
+            for phrase in row['kecamatan'].split('|'):
+                if phrase.strip():
+                    phrases.setdefault(_normalize(phrase), (kode, False))
+    return names, phrases
+
+
+WILAYAH_NAMES, _PHRASES = load_gazetteer()
+
+# Frasa terpanjang dicoba lebih dulu ("TULANG BAWANG BARAT" sebelum "TULANG BAWANG")
+_PHRASE_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(p) for p in sorted(_PHRASES, key=len, reverse=True)) + r')\b'
+)
+
+
+@lru_cache(maxsize=4096)
+def lokasi_kode(text):
+    """Kode kabupaten / kota untuk teks lokasi; None jika kosong, '' jika tidak dikenali"""
+    normalized = _normalize(text)
+    if not normalized:
+        return None
+    best = None
+    for match in _PHRASE_PATTERN.finditer(normalized):
+        kode, is_name = _PHRASES[match.group(1)]
+        # Nama kab/kota > kecamatan; untuk jenis yang sama, yang terakhir disebut
+        if best is None or is_name >= best[1]:
+            best = (kode, is_name)
+    return best[0] if best else KODE_TIDAK_DIKENALI
+
+
+def lokasi_nama(kode):
+    """Nama kabupaten / kota untuk kode (label chart)"""
+    if kode == KODE_TIDAK_DIKENALI:
+        return 'Tidak Dikenali'
+    return WILAYAH_NAMES.get(kode, kode)
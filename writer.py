@@ -0,0 +1,216 @@
+"""
+Single writer per proses untuk database.py.
+
+Semua mutasi (insert / update / delete / import / dedup / watermark) dikirim
+ke satu thread penulis yang memegang satu koneksi. Job yang mengantre dari
+banyak sesi Streamlit dijalankan dalam satu transaksi bersama (group commit):
+BEGIN IMMEDIATE, tiap job di SAVEPOINT sendiri (job yang gagal di-rollback
+tanpa membatalkan job lain), lalu satu COMMIT. Hasil / exception dikembalikan
+ke pemanggil lewat concurrent.futures.Future, setelah COMMIT berhasil.
+
+Dengan journal_mode=WAL (diset init_database) pembaca tetap jalan selama
+transaksi tulis; antar proses penguncian tetap lewat SQLite (busy_timeout).
+
+PERIZINAN_SINGLE_WRITER=0 menjalankan job langsung di thread pemanggil
+(satu transaksi per panggilan, perilaku lama), mis. untuk perbandingan
+dengan benchmarks/load_test.py.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+ENABLED = os.environ.get('PERIZINAN_SINGLE_WRITER', '1').lower() not in ('0', 'false', 'no')
+
+# Maksimum job per transaksi bersama
+WRITE_BATCH_MAX = 100
+
+
+class _Job:
+    __slots__ = ('path', 'fn', 'args', 'future')
+
+    def __init__(self, path, fn, args):
+        self.path = path
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+
+
+class WriteCoordinator:
+    """
+    Antrean tulis + thread penulis. connect(path) membuat koneksi penulis
+    (isolation_level=None; transaksi diatur di sini). fn job dipanggil
+    sebagai fn(cursor, *args) dan tidak boleh commit sendiri.
+    """
+
+    def __init__(self, connect, batch_max=WRITE_BATCH_MAX):
+        self._connect = connect
+        self.batch_max = batch_max
+        self._queue = queue.SimpleQueue()
+        self._pending = deque()  # job path lain yang ditunda ke batch berikutnya
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._conn = None
+        self._path = None
+        self.batches = 0
+        self.jobs = 0
+
+    def submit(self, path, fn, *args):
+        """Antrekan fn(cursor, *args) untuk database path, return Future"""
+        job = _Job(path, fn, args)
+        self._ensure_thread()
+        self._queue.put(job)
+        return job.future
+
+    def run(self, path, fn, *args):
+        """Jalankan fn(cursor, *args) di transaksi penulis dan tunggu hasilnya"""
+        if threading.current_thread() is self._thread:
+            # Dipanggil dari job lain: ikut transaksi yang sedang berjalan
+            return fn(self._conn.cursor(), *args)
+        if not ENABLED:
+            return self._run_inline(path, fn, args)
+        return self.submit(path, fn, *args).result()
+
+    def close(self):
+        """Tutup koneksi penulis (mis. sebelum file database dihapus / diganti); dibuka lagi saat job berikutnya"""
+        if self._thread is None or threading.current_thread() is self._thread:
+            self._reset_connection()
+            return
+        self.submit(None, None).result()
+
+    def _run_inline(self, path, fn, args):
+        conn = self._connect(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cursor, *args)
+                cursor.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+            return result
+        finally:
+            conn.close()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._loop, name='perizinan-writer', daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _next_batch(self):
+        """Job pertama (blocking) + job lain yang sudah mengantre untuk path yang sama"""
+        first = self._pending.popleft() if self._pending else self._queue.get()
+        batch = [first]
+        deferred = []
+        while len(batch) < self.batch_max:
+            if self._pending:
+                job = self._pending.popleft()
+            else:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            (batch if job.path == first.path else deferred).append(job)
+        self._pending.extendleft(reversed(deferred))
+        return batch
+
+    def _connection(self, path):
+        if self._conn is None or self._path != path:
+            self._reset_connection()
+            self._conn = self._connect(path)
+            self._path = path
+        return self._conn
+
+    def _loop(self):
+        while True:
+            # Job yang diantrekan ulang (_requeue) sudah berstatus running
+            batch = [
+                job for job in self._next_batch()
+                if job.future.running() or job.future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            if batch[0].fn is None:
+                # Job close()
+                self._reset_connection()
+                for job in batch:
+                    job.future.set_result(None)
+                continue
+            try:
+                self._execute(batch)
+            except BaseException as e:
+                # Kesalahan tak terduga (mis. ROLLBACK TO gagal): jangan biarkan pemanggil menunggu
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                self._reset_connection()
+
+    def _execute(self, batch):
+        try:
+            conn = self._connection(batch[0].path)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+        except BaseException as e:
+            for job in batch:
+                job.future.set_exception(e)
+            self._reset_connection()
+            return
+
+        done = []
+        for i, job in enumerate(batch):
+            cursor.execute("SAVEPOINT job")
+            try:
+                result = job.fn(cursor, *job.args)
+                cursor.execute("RELEASE job")
+            except BaseException as e:
+                if not conn.in_transaction:
+                    # SQLite membatalkan seluruh transaksi (mis. disk penuh):
+                    # job yang sudah jalan ikut gagal, sisanya dicoba di batch baru
+                    job.future.set_exception(e)
+                    for finished, _ in done:
+                        finished.future.set_exception(e)
+                    self._requeue(batch[i + 1:])
+                    return
+                cursor.execute("ROLLBACK TO job")
+                cursor.execute("RELEASE job")
+                job.future.set_exception(e)
+                continue
+            done.append((job, result))
+
+        try:
+            cursor.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                try:
+                    cursor.execute("ROLLBACK")
+                except sqlite3.Error:
+                    self._reset_connection()
+            for job, _ in done:
+                job.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.jobs += len(batch)
+        for job, result in done:
+            job.future.set_result(result)
+
+    def _requeue(self, jobs):
+        """Job yang belum dijalankan kembali ke depan antrean"""
+        self._pending.extendleft(reversed(jobs))
+
+    def _reset_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._path = None